@@ -2,6 +2,8 @@
 ASGI config for signvision project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests are served by Django; WebSocket connections (live camera
+stream on /ws/camera/) are routed to translator.websocket.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -9,8 +11,24 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'signvision.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from translator.websocket import websocket_application  # noqa: E402  (après django.setup)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
+
+
+# Préchargement optionnel du modèle au démarrage du worker
+if getattr(settings, 'SIGNVISION_WARMUP_MODEL', False):
+    from translator.ai_model import detector
+    detector.warmup()
@@ -50,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'translator.profiling.ProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'signvision.urls'
@@ -84,6 +85,19 @@ DATABASES = {
 }
 
 
+# Cache
+# Sert l'historique et son numéro de version. Avec plusieurs processus
+# (gunicorn...), utiliser un backend partagé (Redis, Memcached, base de données)
+# pour que l'invalidation soit vue par tous les workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'signvision',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -136,9 +150,152 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
+# L'empreinte SHA-256 des fichiers est calculée pendant la réception
+FILE_UPLOAD_HANDLERS = [
+    'translator.uploadhandler.HashingMemoryFileUploadHandler',
+    'translator.uploadhandler.HashingTemporaryFileUploadHandler',
+]
+FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB, au-delà les fichiers passent par le disque
+DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB ; les gros fichiers passent par /api/uploads/
 
 # CSRF settings for AJAX
 CSRF_COOKIE_HTTPONLY = False
 CSRF_USE_SESSIONS = False
+
+# SignVision - Inférence
+# Le modèle est chargé à la première inférence ; SIGNVISION_WARMUP_MODEL
+# le précharge au démarrage des workers WSGI/ASGI.
+SIGNVISION_MODEL_PATH = BASE_DIR / 'translator' / 'best.pt'
+SIGNVISION_WARMUP_MODEL = False
+
+# Backend d'inférence : 'torch' (best.pt), 'onnx' (ONNX Runtime) ou
+# 'openvino'. Exporter les poids avec python manage.py export_model [--int8]
+SIGNVISION_INFERENCE_BACKEND = 'torch'
+SIGNVISION_INFERENCE_INT8 = False
+
+# Serveur d'inférence partagé (python manage.py runinferenceserver).
+# Si un socket est défini, les workers Django ne chargent pas le modèle et
+# lui envoient les frames via la mémoire partagée.
+SIGNVISION_INFERENCE_SOCKET = None
+SIGNVISION_INFERENCE_REPLICAS = 1
+
+# Micro-batching des requêtes concurrentes vers le modèle YOLOv8
+SIGNVISION_BATCH_MAX_SIZE = 8
+SIGNVISION_BATCH_MAX_WAIT_MS = 10
+
+# Vidéo : nombre de frames par passe du modèle et échantillonnage.
+# SIGNVISION_VIDEO_TARGET_FPS, s'il est défini, remplace le pas fixe.
+SIGNVISION_VIDEO_BATCH_SIZE = 8
+SIGNVISION_VIDEO_FRAME_STRIDE = 1
+SIGNVISION_VIDEO_TARGET_FPS = 5
+
+# Uploads traités en arrière-plan par un pool de threads local ;
+# le client suit la progression via /api/jobs/<id>/
+SIGNVISION_ASYNC_UPLOADS = True
+SIGNVISION_JOB_WORKERS = 2
+
+# Cache des résultats par empreinte du contenu et version du modèle
+SIGNVISION_RESULT_CACHE_SIZE = 256
+
+# Persistance des détections : 'rows' (une ligne SignDetection par boîte),
+# 'packed' (tableaux compacts) ou 'auto' (compact au-delà du seuil)
+SIGNVISION_DETECTION_STORAGE = 'auto'
+SIGNVISION_PACKED_DETECTIONS_THRESHOLD = 2000
+SIGNVISION_DB_BATCH_SIZE = 500
+
+# Sessions caméra : une frame dont la différence moyenne (niveaux de gris
+# réduits, 0-255) avec la dernière frame analysée reste sous le seuil
+# réutilise les détections précédentes, au plus MAX_SKIPPED fois de suite.
+SIGNVISION_MOTION_THRESHOLD = 4.0
+SIGNVISION_MOTION_MAX_SKIPPED = 15
+SIGNVISION_SMOOTHING_WINDOW = 5
+SIGNVISION_CAMERA_SESSION_TTL = 120
+
+# Suivi de la région des mains : après une détection sur la frame complète,
+# les frames suivantes sont analysées sur un recadrage (marge PADDING) réduit
+# à INPUT_SIZE pixels. Retour à la frame complète toutes les REFRESH_INTERVAL
+# frames ou dès que la confiance passe sous MIN_CONFIDENCE.
+SIGNVISION_ROI_ENABLED = True
+SIGNVISION_ROI_INPUT_SIZE = 320
+SIGNVISION_ROI_PADDING = 0.5
+SIGNVISION_ROI_REFRESH_INTERVAL = 10
+SIGNVISION_ROI_MIN_CONFIDENCE = 0.5
+
+# Consignes de capture renvoyées par process_camera : résolution, qualité
+# JPEG et intervalle d'envoi s'adaptent au temps de traitement mesuré
+# (visé : TARGET_LATENCY_MS) et à la file d'inférence.
+SIGNVISION_CAPTURE_TARGET_LATENCY_MS = 250
+SIGNVISION_CAPTURE_MIN_INTERVAL_MS = 200
+SIGNVISION_CAPTURE_MAX_INTERVAL_MS = 2000
+
+# Métriques par étape (décodage, file, inférence, post-traitement,
+# traduction, base) et par vue, exposées sur /api/metrics/ au format
+# Prometheus. Désactivées, les chronomètres ne coûtent qu'un appel.
+SIGNVISION_METRICS_ENABLED = True
+
+# Profilage : une fraction SAMPLE_RATE des requêtes vers les vues listées
+# est profilée si ENABLED est vrai ; une requête portant l'en-tête
+# X-SignVision-Profile égal à TOKEN l'est toujours (jeton vide : en-tête
+# ignoré). Profils consultables sur /api/profiles/ (personnel ou DEBUG).
+SIGNVISION_PROFILING_ENABLED = False
+SIGNVISION_PROFILING_SAMPLE_RATE = 0.01
+SIGNVISION_PROFILING_TOKEN = os.environ.get('SIGNVISION_PROFILING_TOKEN', '')
+SIGNVISION_PROFILING_VIEWS = ['process_camera', 'upload_file', 'process_url', 'process_batch']
+SIGNVISION_PROFILING_SAMPLE_INTERVAL_MS = 5
+
+# Vidéos distantes (process_url) : téléchargement en flux borné en taille
+# et en durée, décodé pendant qu'il arrive
+SIGNVISION_URL_MAX_BYTES = 200 * 1024 * 1024
+SIGNVISION_URL_TIMEOUT = 120
+SIGNVISION_URL_CONNECT_TIMEOUT = 10
+SIGNVISION_URL_READ_TIMEOUT = 30
+SIGNVISION_URL_CHUNK_SIZE = 64 * 1024
+# Protection SSRF : les hôtes qui résolvent vers une adresse non publique
+# (localhost, réseaux privés, 169.254.0.0/16...) sont refusés, à chaque
+# redirection. ALLOWED_HOSTS restreint en plus les hôtes acceptés (et leurs
+# sous-domaines) ; ALLOW_PRIVATE_NETWORKS lève la vérification d'adresse.
+SIGNVISION_URL_ALLOWED_HOSTS = []
+SIGNVISION_URL_ALLOW_PRIVATE_NETWORKS = False
+SIGNVISION_URL_MAX_REDIRECTS = 5
+
+# Uploads en morceaux avec reprise (/api/uploads/) : les morceaux sont
+# écrits directement sur le disque, la mémoire des workers reste bornée
+SIGNVISION_CHUNKED_UPLOAD_DIR = None  # Par défaut MEDIA_ROOT/chunked
+SIGNVISION_CHUNKED_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # Taille conseillée aux clients
+SIGNVISION_CHUNKED_UPLOAD_MAX_CHUNK = 8 * 1024 * 1024
+SIGNVISION_CHUNKED_UPLOAD_MAX_BYTES = 2 * 1024 * 1024 * 1024
+SIGNVISION_CHUNKED_UPLOAD_EXPIRY = 24 * 3600  # Sessions inactives supprimées (s)
+
+# Dérivés des images uploadées : une version à la taille d'entrée du modèle
+# (lue lors des retraitements) et une vignette pour l'historique
+SIGNVISION_DERIVATIVE_SIZE = 640
+SIGNVISION_DERIVATIVE_QUALITY = 92
+SIGNVISION_THUMBNAIL_SIZE = 160
+
+# Vidéos longues : découpage en segments analysés en parallèle par un pool
+# de processus. Chaque processus charge sa propre copie du modèle : garder
+# un petit nombre fixe. WORKERS = 0 : un processus par groupe de
+# THREADS_PER_WORKER cœurs ; 1 : pas de découpage. Une vidéo de moins de
+# deux segments de MIN_SEGMENT_FRAMES frames est analysée sans découpage.
+SIGNVISION_VIDEO_WORKERS = 2
+SIGNVISION_VIDEO_THREADS_PER_WORKER = 1
+SIGNVISION_VIDEO_MIN_SEGMENT_FRAMES = 300
+
+# Analyse vidéo en pipeline : décodage, prétraitement, inférence et
+# traduction dans des threads reliés par des files bornées.
+# Les statistiques par étape sont exposées par /api/inference_stats/.
+SIGNVISION_VIDEO_PIPELINE = True
+SIGNVISION_VIDEO_PIPELINE_QUEUE_SIZE = 4
+SIGNVISION_VIDEO_PREPROCESS_SIZE = 640  # Plus grand côté des frames envoyées au modèle
+
+# Lots d'images (/api/batch/) : images en multipart ou archives ZIP,
+# résultats en NDJSON puis enregistrement en une transaction
+SIGNVISION_BATCH_MAX_FILES = 500
+SIGNVISION_BATCH_MAX_IMAGE_BYTES = 20 * 1024 * 1024  # Taille décompressée d'une image
+SIGNVISION_BATCH_MAX_TOTAL_BYTES = 512 * 1024 * 1024  # Taille décompressée du lot entier
+SIGNVISION_BATCH_IN_FLIGHT = 32  # Images soumises au micro-batching en même temps
+
+# Chargement du modèle : après un échec, nouvel essai après RETRY_DELAY
+# secondes, délai doublé à chaque échec jusqu'à RETRY_MAX_DELAY
+SIGNVISION_MODEL_RETRY_DELAY = 5
+SIGNVISION_MODEL_RETRY_MAX_DELAY = 300
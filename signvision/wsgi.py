@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'signvision.settings')
 
 application = get_wsgi_application()
+
+# Préchargement optionnel du modèle au démarrage du worker
+if getattr(settings, 'SIGNVISION_WARMUP_MODEL', False):
+    from translator.ai_model import detector
+    detector.warmup()
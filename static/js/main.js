@@ -7,6 +7,13 @@ Projet créé par Marino ATOHOUN
 let currentStream = null;
 let isProcessing = false;
 let detectionInterval = null;
+let cameraSocket = null;
+let useHttpFallback = false;
+let cameraSessionId = null;
+
+// Consignes de capture renvoyées par le serveur selon sa charge
+// (interval_ms nul : intervalle par défaut du mode de transport)
+let captureHints = { max_dimension: null, jpeg_quality: 0.8, interval_ms: null };
 
 // DOM Elements
 const startCameraBtn = document.getElementById('startCamera');
@@ -98,6 +105,7 @@ async function startCamera() {
 }
 
 function stopCamera() {
+    cameraSessionId = null;
     if (currentStream) {
         currentStream.getTracks().forEach(track => track.stop());
         currentStream = null;
@@ -116,51 +124,150 @@ function stopCamera() {
 function startRealTimeDetection() {
     if (detectionInterval) return;
     
-    detectionInterval = setInterval(() => {
+    // Identifiant de session : le serveur lisse les détections et construit
+    // la transcription d'une frame à l'autre
+    if (!cameraSessionId) {
+        cameraSessionId = window.crypto && crypto.randomUUID
+            ? crypto.randomUUID()
+            : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+    }
+    
+    // Canal WebSocket persistant si le serveur le permet (ASGI),
+    // sinon envoi des frames en HTTP
+    if (!useHttpFallback && 'WebSocket' in window) {
+        startSocketDetection();
+        return;
+    }
+    
+    // Par défaut une frame toutes les 2 secondes, puis selon les consignes
+    runCaptureLoop(async () => {
         if (liveCamera.videoWidth > 0 && liveCamera.videoHeight > 0) {
-            captureAndProcess();
+            await captureAndProcess();
         }
-    }, 2000); // Traitement toutes les 2 secondes
+    }, 2000);
 }
 
-function stopRealTimeDetection() {
+function runCaptureLoop(task, defaultInterval) {
+    // Boucle à délai variable : l'intervalle est relu à chaque tour
+    const loop = {};
+    detectionInterval = loop;
+    
+    const tick = async () => {
+        if (detectionInterval !== loop) return;
+        await task();
+        if (detectionInterval === loop) {
+            loop.timer = setTimeout(tick, captureHints.interval_ms || defaultInterval);
+        }
+    };
+    loop.timer = setTimeout(tick, captureHints.interval_ms || defaultInterval);
+}
+
+function stopCaptureLoop() {
     if (detectionInterval) {
-        clearInterval(detectionInterval);
+        clearTimeout(detectionInterval.timer);
         detectionInterval = null;
     }
 }
 
+function applyCaptureHints(hints) {
+    if (hints) {
+        captureHints = Object.assign({}, captureHints, hints);
+    }
+}
+
+function startSocketDetection() {
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${protocol}//${window.location.host}/ws/camera/`);
+    let opened = false;
+    cameraSocket = socket;
+    
+    socket.addEventListener('open', () => {
+        opened = true;
+        runCaptureLoop(async () => {
+            // Le serveur ne garde que la frame la plus récente ; côté client
+            // on n'en envoie pas de nouvelle tant que la précédente est en transit
+            if (socket.readyState === WebSocket.OPEN && socket.bufferedAmount === 0
+                    && liveCamera.videoWidth > 0 && liveCamera.videoHeight > 0) {
+                const blob = await captureFrame();
+                if (blob && socket.readyState === WebSocket.OPEN) {
+                    socket.send(blob);
+                }
+            }
+        }, 300);
+    });
+    
+    socket.addEventListener('message', (event) => {
+        const result = JSON.parse(event.data);
+        if (result.success) {
+            applyCaptureHints(result.data.capture_hints);
+            displayResults(result.data);
+        }
+    });
+    
+    socket.addEventListener('close', () => {
+        if (cameraSocket !== socket) return;
+        cameraSocket = null;
+        stopCaptureLoop();
+        // Pas de support WebSocket côté serveur : repli sur HTTP
+        if (!opened) {
+            useHttpFallback = true;
+            startRealTimeDetection();
+        }
+    });
+}
+
+function stopRealTimeDetection() {
+    stopCaptureLoop();
+    if (cameraSocket) {
+        const socket = cameraSocket;
+        cameraSocket = null;
+        socket.close();
+    }
+}
+
+function captureFrame() {
+    // Réduction selon la dimension maximale recommandée par le serveur
+    const width = liveCamera.videoWidth;
+    const height = liveCamera.videoHeight;
+    const scale = captureHints.max_dimension
+        ? Math.min(1, captureHints.max_dimension / Math.max(width, height))
+        : 1;
+    
+    const canvas = document.createElement('canvas');
+    const ctx = canvas.getContext('2d');
+    canvas.width = Math.round(width * scale);
+    canvas.height = Math.round(height * scale);
+    ctx.drawImage(liveCamera, 0, 0, canvas.width, canvas.height);
+    
+    return new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', captureHints.jpeg_quality));
+}
+
 async function captureAndProcess() {
     if (!liveCamera.srcObject || isProcessing) return;
     
     try {
-        // Capture de l'image depuis la caméra
-        const canvas = document.createElement('canvas');
-        const ctx = canvas.getContext('2d');
-        canvas.width = liveCamera.videoWidth;
-        canvas.height = liveCamera.videoHeight;
-        ctx.drawImage(liveCamera, 0, 0);
+        // Capture de l'image depuis la caméra et conversion en blob
+        const blob = await captureFrame();
         
-        // Conversion en blob
-        canvas.toBlob(async (blob) => {
-            const formData = new FormData();
-            formData.append('camera_frame', blob, 'camera_frame.jpg');
-            formData.append('csrfmiddlewaretoken', getCookie('csrftoken'));
+        const formData = new FormData();
+        formData.append('camera_frame', blob, 'camera_frame.jpg');
+        formData.append('camera_session', cameraSessionId || '');
+        formData.append('csrfmiddlewaretoken', getCookie('csrftoken'));
+        
+        try {
+            const response = await fetch('/process_camera/', {
+                method: 'POST',
+                body: formData
+            });
             
-            try {
-                const response = await fetch('/process_camera/', {
-                    method: 'POST',
-                    body: formData
-                });
-                
-                const result = await response.json();
-                if (result.success) {
-                    displayResults(result.data);
-                }
-            } catch (error) {
-                console.error('Erreur lors du traitement:', error);
+            const result = await response.json();
+            if (result.success) {
+                applyCaptureHints(result.data.capture_hints);
+                displayResults(result.data);
             }
-        }, 'image/jpeg', 0.8);
+        } catch (error) {
+            console.error('Erreur lors du traitement:', error);
+        }
         
     } catch (error) {
         console.error('Erreur lors de la capture:', error);
@@ -183,22 +290,36 @@ function handleFileUpload() {
 }
 
 async function uploadFile(file) {
-    const formData = new FormData();
-    formData.append('media_file', file);
-    formData.append('csrfmiddlewaretoken', getCookie('csrftoken'));
-    
     try {
         showLoading(startProcessingBtn);
         updateStatus("Upload et traitement en cours...");
         
-        const response = await fetch('/upload/', {
-            method: 'POST',
-            body: formData
-        });
-        
-        const result = await response.json();
+        let result;
+        if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+            // Gros fichier : envoi en morceaux, repris en cas de coupure
+            result = await uploadFileInChunks(file);
+        } else {
+            const formData = new FormData();
+            formData.append('media_file', file);
+            formData.append('csrfmiddlewaretoken', getCookie('csrftoken'));
+            
+            const response = await fetch('/upload/', {
+                method: 'POST',
+                body: formData
+            });
+            result = await response.json();
+        }
         
-        if (result.success) {
+        if (result.success && result.data.job_id) {
+            // Traitement asynchrone : on suit la progression du job
+            const job = await pollJob(result.data.status_url);
+            if (job.status === 'done') {
+                displayResults(job.result);
+                updateStatus("Traitement terminé avec succès", 'success');
+            } else {
+                updateStatus(`Erreur: ${job.error || 'traitement échoué'}`, 'error');
+            }
+        } else if (result.success) {
             displayResults(result.data);
             updateStatus("Traitement terminé avec succès", 'success');
         } else {
@@ -213,6 +334,88 @@ async function uploadFile(file) {
     }
 }
 
+// Upload en morceaux avec reprise (/api/uploads/)
+const CHUNKED_UPLOAD_THRESHOLD = 5 * 1024 * 1024;
+const CHUNKED_UPLOAD_RETRIES = 5;
+
+async function uploadFileInChunks(file) {
+    const headers = { 'X-CSRFToken': getCookie('csrftoken') };
+    
+    const created = await fetch('/api/uploads/', {
+        method: 'POST',
+        headers: { ...headers, 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size })
+    }).then(response => response.json());
+    if (!created.success) return created;
+    
+    const upload = created.data;
+    let offset = 0;
+    let failures = 0;
+    
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + upload.chunk_size);
+        try {
+            const response = await fetch(upload.upload_url, {
+                method: 'PATCH',
+                headers: { ...headers, 'Upload-Offset': String(offset) },
+                body: chunk
+            });
+            const result = await response.json();
+            
+            if (result.success) {
+                offset = result.data.offset;
+                failures = 0;
+                const percent = Math.round(offset / file.size * 100);
+                updateStatus(`Upload en cours... ${percent}%`);
+                continue;
+            }
+            if (response.status !== 409 || result.offset === null) {
+                return result;
+            }
+            // Décalage avec le serveur : reprise à l'offset qu'il indique
+            offset = result.offset;
+        } catch (error) {
+            // Coupure réseau : on relit l'offset du serveur avant de reprendre
+            if (++failures > CHUNKED_UPLOAD_RETRIES) throw error;
+            await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+            try {
+                const status = await fetch(upload.upload_url).then(response => response.json());
+                if (status.success) offset = status.data.offset;
+            } catch (statusError) {
+                console.error('Serveur injoignable:', statusError);
+            }
+        }
+    }
+    
+    updateStatus("Upload terminé, traitement en cours...");
+    const response = await fetch(upload.commit_url, { method: 'POST', headers });
+    return response.json();
+}
+
+// Suivi d'un traitement asynchrone jusqu'à sa fin
+async function pollJob(statusUrl, interval = 1000) {
+    while (true) {
+        const response = await fetch(statusUrl);
+        const result = await response.json();
+        
+        if (!result.success) {
+            return { status: 'failed', error: result.error };
+        }
+        
+        const job = result.data;
+        if (job.status === 'done' || job.status === 'failed') {
+            return job;
+        }
+        
+        const progress = job.progress.frames_total
+            ? ` (${job.progress.frames_done}/${job.progress.frames_total} frames)`
+            : '';
+        updateStatus(`Traitement en cours... ${job.progress.percent}%${progress}`);
+        
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+}
+
 // Gestion de l'URL de vidéo
 async function loadVideoFromUrl() {
     const url = videoUrl.value.trim();
@@ -234,16 +437,34 @@ async function loadVideoFromUrl() {
             body: formData
         });
         
-        const result = await response.json();
-        
-        if (result.success) {
-            displayResults(result.data);
-            updateStatus("Vidéo chargée et traitée avec succès", 'success');
-            startProcessingBtn.disabled = false;
-        } else {
+        // Erreur de validation : réponse JSON classique
+        if (!(response.headers.get('Content-Type') || '').startsWith('application/x-ndjson')) {
+            const result = await response.json();
             updateStatus(`Erreur: ${result.error}`, 'error');
+            return;
         }
         
+        // Flux NDJSON : un événement par ligne, affiché au fil du traitement
+        let detectionsCount = 0;
+        let recentDetections = [];
+        await readNdjson(response, event => {
+            if (event.type === 'detections') {
+                detectionsCount += event.detections.length;
+                recentDetections = recentDetections.concat(event.detections).slice(-10);
+                displayResults({
+                    translated_text: event.partial_text || '...',
+                    detections: recentDetections
+                });
+                updateStatus(`Analyse en cours : ${event.frames_done} frames, ${detectionsCount} détections...`);
+            } else if (event.type === 'result') {
+                displayResults({ ...event, detections: recentDetections });
+                updateStatus(`Vidéo traitée avec succès (${event.detections_count} détections)`, 'success');
+                startProcessingBtn.disabled = false;
+            } else if (event.type === 'error') {
+                updateStatus(`Erreur: ${event.error}`, 'error');
+            }
+        });
+        
     } catch (error) {
         console.error('Erreur lors du chargement:', error);
         updateStatus("Erreur lors du chargement de la vidéo", 'error');
@@ -252,6 +473,26 @@ async function loadVideoFromUrl() {
     }
 }
 
+// Lecture d'une réponse NDJSON ligne par ligne
+async function readNdjson(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+    }
+    if (buffer.trim()) {
+        onEvent(JSON.parse(buffer));
+    }
+}
+
 // Affichage des résultats
 function displayResults(data) {
     if (!data) return;
@@ -5,11 +5,196 @@ Projet créé par Marino ATOHOUN
 
 import os
 import time
-import random
-from typing import List, Dict, Tuple
+import hashlib
+import threading
+from typing import List, Dict, NamedTuple, Optional, Tuple, Union
 from PIL import Image
 import json
-from ultralytics import YOLO
+import numpy as np
+import cv2
+from django.conf import settings
+
+from .backends import get_backend
+from .metrics import metrics
+from .translation import SignVocabulary, StreamingTranslator
+from .video import VideoInferenceEngine
+
+
+# Poids livrés avec l'application
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'best.pt')
+
+
+# Types d'entrée acceptés par le détecteur pour une image
+ImageSource = Union[str, bytes, bytearray, memoryview, np.ndarray, Image.Image]
+
+
+def decode_image(source: ImageSource) -> Union[str, np.ndarray]:
+    """
+    Convertit une source d'image en entrée directement exploitable par YOLOv8
+
+    Les chemins sont transmis tels quels, les octets encodés (JPEG, PNG...)
+    sont décodés en mémoire sans passer par le disque.
+
+    Args:
+        source: Chemin, octets encodés, tableau NumPy (BGR) ou image PIL
+
+    Returns:
+        Chemin du fichier ou tableau NumPy BGR (H, W, 3)
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+
+    if isinstance(source, np.ndarray):
+        return source
+
+    if isinstance(source, Image.Image):
+        # PIL fournit du RGB, YOLOv8 attend du BGR pour les tableaux NumPy
+        with metrics.timer('decode'):
+            return cv2.cvtColor(np.asarray(source.convert('RGB')), cv2.COLOR_RGB2BGR)
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        with metrics.timer('decode'):
+            buffer = np.frombuffer(source, dtype=np.uint8)
+            image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Impossible de décoder l'image fournie")
+        return image
+
+    raise TypeError(f"Type d'image non supporté: {type(source).__name__}")
+
+
+def load_image(source: ImageSource) -> np.ndarray:
+    """
+    Comme decode_image, mais lit aussi les chemins pour toujours
+    retourner un tableau NumPy BGR
+    """
+    image = decode_image(source)
+    if isinstance(image, str):
+        path = image
+        with metrics.timer('decode'):
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Impossible de lire l'image: {path}")
+    return image
+
+
+# Traduction française de chaque classe de signe
+TRANSLATION_MAP = {
+    "bonjour": "Bonjour",
+    "merci": "Merci",
+    "au_revoir": "Au revoir",
+    "oui": "Oui",
+    "non": "Non",
+    "s_il_vous_plait": "S'il vous plaît",
+    "excusez_moi": "Excusez-moi",
+    "comment": "Comment",
+    "ou": "Où",
+    "quand": "Quand",
+    "pourquoi": "Pourquoi",
+    "qui": "Qui",
+    "eau": "Eau",
+    "manger": "Manger",
+    "boire": "Boire",
+    "dormir": "Dormir",
+    "travail": "Travail",
+    "maison": "Maison",
+    "famille": "Famille",
+    "ami": "Ami",
+    "amour": "Amour",
+    "heureux": "Heureux",
+    "triste": "Triste",
+    "colere": "Colère",
+    "peur": "Peur",
+    "surprise": "Surprise",
+    "aide": "Aide",
+    "stop": "Stop",
+    "attention": "Attention",
+    "danger": "Danger"
+}
+
+
+def _to_numpy(values) -> np.ndarray:
+    """Convertit un tenseur (éventuellement sur GPU) ou une séquence en tableau NumPy"""
+    if hasattr(values, 'cpu'):
+        values = values.cpu()
+    if hasattr(values, 'numpy'):
+        return values.numpy()
+    return np.asarray(values)
+
+
+class DetectionArrays(NamedTuple):
+    """
+    Détections d'un lot sous forme de colonnes NumPy
+    
+    Attributes:
+        frames: Indice de l'image dans le lot, ou numéro de frame (int32, N)
+        boxes: Boîtes au format xyxy (float32, N x 4)
+        confidences: Scores de confiance (float32, N)
+        class_ids: Indices de classe (int32, N)
+    """
+    
+    frames: np.ndarray
+    boxes: np.ndarray
+    confidences: np.ndarray
+    class_ids: np.ndarray
+    
+    @classmethod
+    def empty(cls) -> 'DetectionArrays':
+        return cls(
+            np.empty(0, dtype=np.int32), np.empty((0, 4), dtype=np.float32),
+            np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int32)
+        )
+    
+    def with_frames(self, frames: np.ndarray) -> 'DetectionArrays':
+        """Retourne une copie avec d'autres numéros de frame"""
+        return self._replace(frames=np.asarray(frames, dtype=np.int32))
+    
+    def class_names(self, class_lookup: np.ndarray) -> np.ndarray:
+        """Noms des classes ; les indices hors table deviennent leur représentation texte"""
+        known = (self.class_ids >= 0) & (self.class_ids < len(class_lookup))
+        names = np.empty(len(self.class_ids), dtype=object)
+        names[known] = class_lookup[self.class_ids[known]]
+        for i in np.flatnonzero(~known):
+            names[i] = str(self.class_ids[i])
+        return names
+    
+    def to_dicts(self, class_lookup: np.ndarray, num_images: int = None):
+        """
+        Convertit les colonnes au format dict historique du détecteur
+        
+        Args:
+            class_lookup: Table indice de classe -> nom
+            num_images: Si fourni, retourne une liste de détections par image
+                (frames étant alors l'indice de l'image dans le lot)
+        
+        Returns:
+            Liste de détections, ou liste de listes si num_images est fourni
+        """
+        x1, y1, x2, y2 = self.boxes.T.astype(np.float64)
+        columns = zip(
+            self.class_names(class_lookup).tolist(),
+            self.confidences.astype(np.float64).tolist(),
+            x1.tolist(), y1.tolist(), (x2 - x1).tolist(), (y2 - y1).tolist(),
+            self.frames.tolist()
+        )
+        detections = [
+            {
+                'class': name,
+                'confidence': confidence,
+                'bbox': {'x': x, 'y': y, 'width': width, 'height': height},
+                'frame': frame
+            }
+            for name, confidence, x, y, width, height, frame in columns
+        ]
+        if num_images is None:
+            return detections
+        
+        per_image = [[] for _ in range(num_images)]
+        for detection in detections:
+            per_image[detection['frame']].append(detection)
+        for detection in detections:
+            detection['frame'] = 0
+        return per_image
 
 
 class YOLOv8SignDetector:
@@ -18,15 +203,27 @@ class YOLOv8SignDetector:
     Dans un environnement réel, cette classe chargerait le fichier best.pt
     """
     
-    def __init__(self, model_path: str = "/home/rinogeek/RINO/partition 1/all_project/signvision_project/translator/best.pt"):
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, backend: str = 'torch', int8: bool = False):
         """
         Initialise le détecteur de signes
         
+        Le modèle n'est pas chargé ici : torch et ultralytics ne sont importés
+        qu'à la première inférence ou lors d'un appel explicite à warmup().
+        
         Args:
             model_path: Chemin vers le fichier de modèle YOLOv8
+            backend: Backend d'inférence ('torch', 'onnx' ou 'openvino')
+            int8: Utiliser la variante quantifiée INT8 du backend
         """
-        self.model_path = model_path
+        self.model_path = os.fspath(model_path)
+        self.backend = get_backend(backend, self.model_path, int8=int8)
+        self.model = None
         self.model_loaded = False
+        self._model_version = None
+        self._load_lock = threading.Lock()
+        # Échecs de chargement consécutifs et prochain essai autorisé (time.monotonic)
+        self._load_failures = 0
+        self._next_load_at = 0.0
         self.sign_classes = [
             "bonjour", "merci", "au_revoir", "oui", "non", "s_il_vous_plait",
             "excusez_moi", "comment", "ou", "quand", "pourquoi", "qui",
@@ -34,142 +231,216 @@ class YOLOv8SignDetector:
             "famille", "ami", "amour", "heureux", "triste", "colere",
             "peur", "surprise", "aide", "stop", "attention", "danger"
         ]
-        self.load_model()
+        # Table indice de classe -> nom, utilisée par le post-traitement vectorisé
+        self.class_lookup = np.array(self.sign_classes, dtype=object)
+        # Table précalculée classe -> traduction, partagée par les traducteurs
+        self.vocabulary = SignVocabulary(self.sign_classes, self.translate_sign)
     
     def load_model(self):
         """Charge le modèle YOLOv8"""
         try:
-            # Simulation du chargement du modèle
-            # Dans un environnement réel, on utiliserait:
-            # from ultralytics import YOLO
-            print(f"Chargement du modèle depuis {self.model_path}...")
-            self.model = YOLO(self.model_path)
-            
-            
-            # time.sleep(1)  # Simulation du temps de chargement
-            # self.model_loaded = True
+            # Import différé de torch/ultralytics dans le backend
+            print(f"Chargement du modèle ({self.backend.label}) depuis {self.backend.weights_path()}...")
+            self.model = self.backend.load()
+            self.model_loaded = True
             print("Modèle YOLOv8 chargé avec succès!")
             
         except Exception as e:
             print(f"Erreur lors du chargement du modèle: {e}")
-            print("Utilisation du mode simulation...")
+            self.model = None
             self.model_loaded = False
     
-    def detect_signs_image(self, image_path: str) -> List[Dict]:
+    def get_model(self):
+        """
+        Retourne le modèle, en le chargeant au premier appel
+        
+        Après un échec (poids absents, erreur d'E/S passagère), un nouvel
+        essai est fait au premier appel suivant l'attente :
+        SIGNVISION_MODEL_RETRY_DELAY secondes, doublées à chaque échec
+        jusqu'à SIGNVISION_MODEL_RETRY_MAX_DELAY.
+        
+        Raises:
+            Exception: Si le modèle n'a pas pu être chargé
+        """
+        if self.model is None and time.monotonic() >= self._next_load_at:
+            with self._load_lock:
+                if self.model is None and time.monotonic() >= self._next_load_at:
+                    self.load_model()
+                    if self.model is None:
+                        self._load_failures += 1
+                        delay = min(
+                            getattr(settings, 'SIGNVISION_MODEL_RETRY_DELAY', 5) * 2 ** (self._load_failures - 1),
+                            getattr(settings, 'SIGNVISION_MODEL_RETRY_MAX_DELAY', 300)
+                        )
+                        self._next_load_at = time.monotonic() + delay
+                    else:
+                        self._load_failures = 0
+        
+        if self.model is None:
+            raise Exception("Modèle non chargé")
+        return self.model
+    
+    def warmup(self):
+        """
+        Charge le modèle et exécute une inférence à blanc
+        
+        Permet de payer le coût de chargement au démarrage du serveur
+        plutôt qu'à la première requête.
+        """
+        self.get_model()
+        self.detect_signs_batch([np.zeros((640, 640, 3), dtype=np.uint8)])
+    
+    def detect_signs_image(self, image: ImageSource, imgsz: Optional[int] = None) -> List[Dict]:
         """
         Détecte les signes dans une image
         
         Args:
-            image_path: Chemin vers l'image
+            image: Chemin vers l'image, octets encodés (JPEG/PNG),
+                tableau NumPy BGR ou image PIL
+            imgsz: Taille d'entrée du modèle (par défaut celle de l'entraînement)
             
         Returns:
             Liste des détections avec coordonnées et classes
         """
-        if not self.model:
-            raise Exception("Modèle non chargé")
-        
-        # Simulation de la détection
-        # Dans un environnement réel:
-        results = self.model(image_path)
-        return self._process_results(results)
-        
-        #return self._simulate_detection(image_path)
+        return self.detect_signs_batch([image], imgsz=imgsz)[0]
 
-    def _process_results(self, results) -> List[Dict]:
+    def detect_signs_batch(self, images: List[ImageSource], imgsz: Optional[int] = None) -> List[List[Dict]]:
         """
-        Transforme les résultats du modèle YOLOv8 en liste de détections au format attendu
+        Détecte les signes dans plusieurs images en une seule passe du modèle
+        
+        Args:
+            images: Liste d'images (chemins, octets, tableaux NumPy ou PIL)
+            imgsz: Taille d'entrée du modèle (par défaut celle de l'entraînement)
+            
+        Returns:
+            Liste des détections pour chaque image, dans l'ordre d'entrée
         """
-        detections = []
-        # results.boxes.xyxy, results.boxes.conf, results.boxes.cls
-        # On suppose que results est un objet ultralytics YOLO avec .boxes
-        if hasattr(results, 'boxes'):
-            boxes = results.boxes
-            for i in range(len(boxes)):
-                # Extraction des coordonnées et scores
-                xyxy = boxes.xyxy[i].tolist() if hasattr(boxes.xyxy[i], 'tolist') else list(boxes.xyxy[i])
-                conf = float(boxes.conf[i]) if hasattr(boxes.conf[i], 'item') else boxes.conf[i]
-                cls_idx = int(boxes.cls[i]) if hasattr(boxes.cls[i], 'item') else boxes.cls[i]
-                sign_class = self.sign_classes[cls_idx] if cls_idx < len(self.sign_classes) else str(cls_idx)
-                detection = {
-                    'class': sign_class,
-                    'confidence': conf,
-                    'bbox': {
-                        'x': xyxy[0],
-                        'y': xyxy[1],
-                        'width': xyxy[2] - xyxy[0],
-                        'height': xyxy[3] - xyxy[1]
-                    },
-                    'frame': 0
-                }
-                detections.append(detection)
-        return detections
+        if not images:
+            return []
+        
+        results = self._infer(images, imgsz)
+        with metrics.timer('postprocess'):
+            arrays = self._results_to_arrays(results)
+            return arrays.to_dicts(self.class_lookup, num_images=len(images))
     
-    def detect_signs_video(self, video_path: str) -> List[Dict]:
+    def detect_arrays(self, images: List[ImageSource], imgsz: Optional[int] = None) -> 'DetectionArrays':
         """
-        Détecte les signes dans une vidéo
+        Détecte les signes dans plusieurs images et retourne des tableaux NumPy
         
         Args:
-            video_path: Chemin vers la vidéo
+            images: Liste d'images (chemins, octets, tableaux NumPy ou PIL)
+            imgsz: Taille d'entrée du modèle ; une valeur plus petite que celle
+                de l'entraînement accélère l'inférence sur les recadrages ROI
             
         Returns:
-            Liste des détections par frame
+            DetectionArrays dont `frames` contient l'indice de l'image dans le lot
         """
-        if not self.model:
-            raise Exception("Modèle non chargé")
-        
-        # Simulation de la détection vidéo
-        return self._simulate_video_detection(video_path)
+        results = self._infer(images, imgsz)
+        with metrics.timer('postprocess'):
+            return self._results_to_arrays(results)
+
+    def _infer(self, images: List[ImageSource], imgsz: Optional[int] = None):
+        """Décode les images et exécute une passe du modèle"""
+        model = self.get_model()
+        options = {'imgsz': imgsz} if imgsz else {}
+        decoded = [decode_image(image) for image in images]
+        with metrics.timer('inference'):
+            return model(decoded, **options)
+
+    def detect_signs_roi(self, image: ImageSource, tracker) -> List[Dict]:
+        """
+        Détecte les signes en limitant l'inférence à la région des mains
+
+        Args:
+            image: Image à analyser
+            tracker: ROITracker propre au flux (voir translator.roi)
+
+        Returns:
+            Détections en coordonnées de l'image complète
+        """
+        return tracker.detect(load_image(image), self.detect_signs_image)
     
-    def _simulate_detection(self, file_path: str) -> List[Dict]:
-        """Simule la détection de signes pour une image"""
-        detections = []
+    @staticmethod
+    def _results_to_arrays(results) -> 'DetectionArrays':
+        """
+        Convertit un ou plusieurs objets Results d'ultralytics en tableaux
         
-        # Génère 1-3 détections aléatoirement
-        num_detections = random.randint(1, 3)
+        Les tenseurs xyxy, conf et cls de chaque résultat sont transférés une
+        seule fois vers NumPy puis concaténés pour tout le lot.
+        """
+        if hasattr(results, 'boxes'):
+            results = [results]
         
-        for i in range(num_detections):
-            detection = {
-                'class': random.choice(self.sign_classes),
-                'confidence': round(random.uniform(0.6, 0.95), 3),
-                'bbox': {
-                    'x': random.randint(50, 300),
-                    'y': random.randint(50, 200),
-                    'width': random.randint(80, 150),
-                    'height': random.randint(80, 150)
-                },
-                'frame': 0
-            }
-            detections.append(detection)
+        frames, boxes, confidences, class_ids = [], [], [], []
+        for index, result in enumerate(results):
+            result_boxes = getattr(result, 'boxes', None)
+            if result_boxes is None or len(result_boxes) == 0:
+                continue
+            xyxy = _to_numpy(result_boxes.xyxy).reshape(-1, 4)
+            frames.append(np.full(len(xyxy), index, dtype=np.int32))
+            boxes.append(xyxy.astype(np.float32, copy=False))
+            confidences.append(_to_numpy(result_boxes.conf).reshape(-1).astype(np.float32, copy=False))
+            class_ids.append(_to_numpy(result_boxes.cls).reshape(-1).astype(np.int32))
         
-        return detections
+        if not frames:
+            return DetectionArrays.empty()
+        return DetectionArrays(
+            np.concatenate(frames), np.concatenate(boxes),
+            np.concatenate(confidences), np.concatenate(class_ids)
+        )
     
-    def _simulate_video_detection(self, video_path: str) -> List[Dict]:
-        """Simule la détection de signes pour une vidéo"""
-        detections = []
+    def _process_results(self, results) -> List[Dict]:
+        """
+        Transforme les résultats du modèle YOLOv8 en liste de détections au format attendu
         
-        # Simule 10-30 frames
-        num_frames = random.randint(10, 30)
+        Accepte un objet Results ou la liste retournée par self.model(...) ;
+        toutes les détections sont rattachées à la frame 0.
+        """
+        arrays = self._results_to_arrays(results)
+        return arrays.with_frames(np.zeros(len(arrays.frames), dtype=np.int32)).to_dicts(self.class_lookup)
+    
+    def worker_spec(self) -> Optional[Tuple[str, str, str, bool]]:
+        """
+        Arguments permettant de recréer ce détecteur dans un autre processus
         
-        for frame_num in range(num_frames):
-            # Probabilité de détection par frame
-            if random.random() > 0.3:  # 70% de chance de détection
-                num_detections = random.randint(1, 2)
-                
-                for i in range(num_detections):
-                    detection = {
-                        'class': random.choice(self.sign_classes),
-                        'confidence': round(random.uniform(0.5, 0.9), 3),
-                        'bbox': {
-                            'x': random.randint(50, 300),
-                            'y': random.randint(50, 200),
-                            'width': random.randint(80, 150),
-                            'height': random.randint(80, 150)
-                        },
-                        'frame': frame_num
-                    }
-                    detections.append(detection)
+        Returns:
+            (classe du détecteur, chemin des poids, backend, int8), ou None si
+            le détecteur ne peut pas être dupliqué
+        """
+        detector_class = type(self)
+        return (
+            f"{detector_class.__module__}.{detector_class.__qualname__}",
+            self.model_path, self.backend.name, self.backend.int8
+        )
+    
+    def detect_signs_video(self, video_path: str, progress_callback=None) -> List[Dict]:
+        """
+        Détecte les signes dans une vidéo
         
-        return detections
+        Les vidéos longues sont découpées en segments analysés en parallèle
+        (SIGNVISION_VIDEO_WORKERS processus).
+        
+        Args:
+            video_path: Chemin vers la vidéo
+            progress_callback: Appelé avec (frames parcourues, frames totales)
+            
+        Returns:
+            Liste des détections par frame
+        """
+        return VideoInferenceEngine.from_settings(self).detect(video_path, progress_callback)
+
+    def analyze_video(self, video_path: str, progress_callback=None) -> Dict:
+        """
+        Détecte et traduit les signes d'une vidéo
+
+        En mode pipeline (SIGNVISION_VIDEO_PIPELINE), la traduction est faite
+        par une étape du pipeline pendant que le modèle traite la suite.
+
+        Returns:
+            dict: 'detections', 'translated_text' et, en mode pipeline,
+                'pipeline' (statistiques par étape)
+        """
+        return VideoInferenceEngine.from_settings(self).analyze(video_path, progress_callback)
     
     def translate_signs_to_text(self, detections: List[Dict]) -> str:
         """
@@ -184,74 +455,76 @@ class YOLOv8SignDetector:
         if not detections:
             return "Aucun signe détecté"
         
-        # Groupe les détections par frame et prend la plus confiante
-        frame_signs = {}
-        for detection in detections:
-            frame = detection['frame']
-            if frame not in frame_signs:
-                frame_signs[frame] = []
-            frame_signs[frame].append(detection)
-        
-        # Prend le signe le plus confiant par frame
-        signs_sequence = []
-        for frame in sorted(frame_signs.keys()):
-            best_detection = max(frame_signs[frame], key=lambda x: x['confidence'])
-            if best_detection['confidence'] > 0.6:  # Seuil de confiance
-                signs_sequence.append(best_detection['class'])
-        
-        # Supprime les doublons consécutifs
-        filtered_signs = []
-        for sign in signs_sequence:
-            if not filtered_signs or sign != filtered_signs[-1]:
-                filtered_signs.append(sign)
+        with metrics.timer('translate'):
+            translator = self.streaming_translator()
+            translator.feed(detections)
+            return translator.finish()
+    
+    def streaming_translator(self) -> StreamingTranslator:
+        """
+        Crée un traducteur incrémental (détections fournies morceau par morceau)
         
-        # Traduit en français
-        translation_map = {
-            "bonjour": "Bonjour",
-            "merci": "Merci",
-            "au_revoir": "Au revoir",
-            "oui": "Oui",
-            "non": "Non",
-            "s_il_vous_plait": "S'il vous plaît",
-            "excusez_moi": "Excusez-moi",
-            "comment": "Comment",
-            "ou": "Où",
-            "quand": "Quand",
-            "pourquoi": "Pourquoi",
-            "qui": "Qui",
-            "eau": "Eau",
-            "manger": "Manger",
-            "boire": "Boire",
-            "dormir": "Dormir",
-            "travail": "Travail",
-            "maison": "Maison",
-            "famille": "Famille",
-            "ami": "Ami",
-            "amour": "Amour",
-            "heureux": "Heureux",
-            "triste": "Triste",
-            "colere": "Colère",
-            "peur": "Peur",
-            "surprise": "Surprise",
-            "aide": "Aide",
-            "stop": "Stop",
-            "attention": "Attention",
-            "danger": "Danger"
-        }
+        Pour chaque frame, le signe le plus confiant est retenu au-delà de
+        0,6 de confiance ; les doublons consécutifs sont fusionnés.
+        """
+        return StreamingTranslator(self.vocabulary, threshold=0.6)
+    
+    def translate_sign(self, sign_class: str) -> str:
+        """Traduit une classe de signe en français"""
+        return TRANSLATION_MAP.get(sign_class, sign_class)
+    
+    @property
+    def model_version(self) -> str:
+        """
+        Version du modèle, dérivée de l'empreinte SHA-256 des poids
         
-        translated_words = [translation_map.get(sign, sign) for sign in filtered_signs]
-        return " ".join(translated_words)
+        Sert de clé de cache : un nouveau fichier best.pt invalide
+        automatiquement les résultats calculés avec l'ancien. Les backends
+        autres que PyTorch ajoutent leur nom (résultats proches, pas identiques).
+        """
+        if self._model_version is None:
+            try:
+                sha256 = hashlib.sha256()
+                with open(self.model_path, 'rb') as weights:
+                    for chunk in iter(lambda: weights.read(1024 * 1024), b''):
+                        sha256.update(chunk)
+                self._model_version = sha256.hexdigest()[:16]
+            except OSError:
+                self._model_version = 'unknown'
+            if self.backend.label != 'torch':
+                self._model_version += f"-{self.backend.label}"
+        return self._model_version
     
     def get_model_info(self) -> Dict:
         """Retourne les informations sur le modèle"""
         return {
             'model_path': self.model_path,
-            'loaded': self.model,
+            'model_version': self.model_version,
+            'backend': self.backend.label,
+            'loaded': self.model_loaded,
             'classes_count': len(self.sign_classes),
             'classes': self.sign_classes
         }
 
 
-# Instance globale du détecteur
-detector = YOLOv8SignDetector()
+def create_detector() -> YOLOv8SignDetector:
+    """
+    Crée le détecteur du processus
+    
+    Si SIGNVISION_INFERENCE_SOCKET est défini, l'inférence est déléguée au
+    serveur d'inférence (voir la commande runinferenceserver) ; sinon le
+    modèle est chargé dans ce processus.
+    """
+    model_path = getattr(settings, 'SIGNVISION_MODEL_PATH', DEFAULT_MODEL_PATH)
+    backend = getattr(settings, 'SIGNVISION_INFERENCE_BACKEND', 'torch')
+    int8 = getattr(settings, 'SIGNVISION_INFERENCE_INT8', False)
+    socket_path = getattr(settings, 'SIGNVISION_INFERENCE_SOCKET', None)
+    if socket_path:
+        from .inference_server import RemoteSignDetector
+        return RemoteSignDetector(os.fspath(socket_path), model_path, backend=backend, int8=int8)
+    return YOLOv8SignDetector(model_path, backend=backend, int8=int8)
+
+
+# Instance globale du détecteur (le modèle est chargé à la demande)
+detector = create_detector()
 
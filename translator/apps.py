@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TranslatorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'translator'
+
+    def ready(self):
+        # Enregistre les signaux (invalidation du cache d'historique)
+        from . import signals  # noqa: F401
@@ -0,0 +1,199 @@
+"""
+Backends d'inférence CPU pour le modèle YOLOv8
+Projet créé par Marino ATOHOUN
+
+Chaque backend sait où se trouvent ses poids (dérivés de best.pt), comment
+les exporter et comment les charger. Le chargement passe toujours par
+ultralytics.YOLO, qui délègue à PyTorch, ONNX Runtime ou OpenVINO selon le
+format : le post-traitement et le format des résultats restent identiques.
+
+ONNX Runtime et OpenVINO sont des dépendances optionnelles :
+    pip install onnx onnxruntime        # backend 'onnx'
+    pip install openvino nncf           # backend 'openvino' (nncf pour l'INT8)
+"""
+
+import os
+import shutil
+from typing import Dict, List, Optional
+
+
+# Tolérances garanties entre un backend et la référence PyTorch : chaque boîte
+# de référence doit avoir une boîte de même classe avec un IoU au moins égal
+# à `min_iou` et un écart de confiance au plus égal à `max_confidence_delta`.
+TOLERANCES = {
+    'fp32': {'min_iou': 0.9, 'max_confidence_delta': 0.02},
+    'int8': {'min_iou': 0.75, 'max_confidence_delta': 0.1},
+}
+
+
+class InferenceBackend:
+    """Backend PyTorch (poids best.pt d'origine)"""
+
+    name = 'torch'
+    supports_int8 = False
+
+    def __init__(self, model_path: str, int8: bool = False):
+        """
+        Args:
+            model_path: Chemin des poids PyTorch (best.pt)
+            int8: Utiliser la variante quantifiée INT8
+        """
+        if int8 and not self.supports_int8:
+            raise ValueError(f"Le backend {self.name} n'a pas de variante INT8")
+        self.model_path = os.fspath(model_path)
+        self.int8 = int8
+
+    @property
+    def label(self) -> str:
+        """Nom du backend et de sa précision, utilisé dans la version du modèle"""
+        return f"{self.name}-int8" if self.int8 else self.name
+
+    @property
+    def tolerance(self) -> Dict:
+        return TOLERANCES['int8' if self.int8 else 'fp32']
+
+    def weights_path(self) -> str:
+        return self.model_path
+
+    def is_available(self) -> bool:
+        return os.path.exists(self.weights_path())
+
+    def load(self):
+        """Charge le modèle avec ultralytics"""
+        from ultralytics import YOLO
+
+        if not self.is_available():
+            raise FileNotFoundError(
+                f"Poids introuvables pour le backend {self.label}: {self.weights_path()} "
+                f"(voir python manage.py export_model)"
+            )
+        return YOLO(self.weights_path(), task='detect')
+
+    def export(self, imgsz: int = 640, data: Optional[str] = None) -> str:
+        """Exporte best.pt vers le format du backend et retourne le chemin produit"""
+        return self.weights_path()
+
+    def _base_path(self) -> str:
+        return os.path.splitext(self.model_path)[0]
+
+
+class OnnxBackend(InferenceBackend):
+    """Backend ONNX Runtime (INT8 par quantification dynamique des poids)"""
+
+    name = 'onnx'
+    supports_int8 = True
+
+    def weights_path(self) -> str:
+        return self._base_path() + ('_int8.onnx' if self.int8 else '.onnx')
+
+    def export(self, imgsz: int = 640, data: Optional[str] = None) -> str:
+        from ultralytics import YOLO
+
+        fp32_path = self._base_path() + '.onnx'
+        if not os.path.exists(fp32_path) or not self.int8:
+            fp32_path = YOLO(self.model_path).export(format='onnx', imgsz=imgsz, dynamic=True)
+
+        if self.int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(fp32_path, self.weights_path(), weight_type=QuantType.QUInt8)
+        return self.weights_path()
+
+
+class OpenVINOBackend(InferenceBackend):
+    """Backend OpenVINO (INT8 par quantification post-entraînement NNCF)"""
+
+    name = 'openvino'
+    supports_int8 = True
+
+    def weights_path(self) -> str:
+        return self._base_path() + ('_int8_openvino_model' if self.int8 else '_openvino_model')
+
+    def export(self, imgsz: int = 640, data: Optional[str] = None) -> str:
+        from ultralytics import YOLO
+
+        options = {'format': 'openvino', 'imgsz': imgsz, 'dynamic': True, 'int8': self.int8}
+        if self.int8 and data:
+            # Jeu de calibration (fichier YAML au format ultralytics)
+            options['data'] = data
+        exported = YOLO(self.model_path).export(**options)
+
+        if os.path.abspath(exported) != os.path.abspath(self.weights_path()):
+            if os.path.exists(self.weights_path()):
+                shutil.rmtree(self.weights_path())
+            shutil.move(exported, self.weights_path())
+        return self.weights_path()
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (InferenceBackend, OnnxBackend, OpenVINOBackend)
+}
+
+
+def get_backend(name: str, model_path: str, int8: bool = False) -> InferenceBackend:
+    """
+    Retourne le backend demandé
+
+    Raises:
+        ValueError: Si le backend est inconnu
+    """
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Backend d'inférence inconnu: {name} (choix : {', '.join(BACKENDS)})")
+    return backend_class(model_path, int8=int8)
+
+
+def box_iou(a: Dict, b: Dict) -> float:
+    """IoU de deux bbox au format {'x', 'y', 'width', 'height'}"""
+    left = max(a['x'], b['x'])
+    top = max(a['y'], b['y'])
+    right = min(a['x'] + a['width'], b['x'] + b['width'])
+    bottom = min(a['y'] + a['height'], b['y'] + b['height'])
+    intersection = max(0.0, right - left) * max(0.0, bottom - top)
+    union = a['width'] * a['height'] + b['width'] * b['height'] - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def compare_detections(reference: List[Dict], candidate: List[Dict], tolerance: Dict) -> Dict:
+    """
+    Compare les détections d'un backend à celles de la référence
+
+    Chaque détection de référence est associée à la détection candidate de
+    même classe ayant le meilleur IoU.
+
+    Returns:
+        dict avec le nombre de détections appariées, le pire IoU, le plus
+        grand écart de confiance et `within_tolerance`
+    """
+    matched = 0
+    worst_iou = 1.0
+    worst_confidence_delta = 0.0
+    unused = list(candidate)
+
+    for expected in reference:
+        same_class = [d for d in unused if d['class'] == expected['class']]
+        if not same_class:
+            worst_iou = 0.0
+            continue
+        best = max(same_class, key=lambda d: box_iou(expected['bbox'], d['bbox']))
+        unused.remove(best)
+        matched += 1
+        worst_iou = min(worst_iou, box_iou(expected['bbox'], best['bbox']))
+        worst_confidence_delta = max(worst_confidence_delta, abs(expected['confidence'] - best['confidence']))
+
+    within_tolerance = (
+        matched == len(reference)
+        and not unused
+        and worst_iou >= tolerance['min_iou']
+        and worst_confidence_delta <= tolerance['max_confidence_delta']
+    )
+    return {
+        'reference_count': len(reference),
+        'candidate_count': len(candidate),
+        'matched': matched,
+        'worst_iou': round(worst_iou, 4),
+        'worst_confidence_delta': round(worst_confidence_delta, 4),
+        'within_tolerance': within_tolerance,
+    }
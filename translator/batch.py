@@ -0,0 +1,292 @@
+"""
+Traitement par lots d'images (/api/batch/)
+Projet créé par Marino ATOHOUN
+
+Un lot est un ensemble d'images envoyées en multipart (champ `images`)
+et/ou une ou plusieurs archives ZIP (champ `archive`). Les images sont
+soumises au micro-batching par fenêtres de SIGNVISION_BATCH_IN_FLIGHT : les
+passes du modèle sont pleines, et la mémoire reste bornée quelle que soit
+la taille du lot (une entrée d'archive n'est lue qu'au moment de sa
+soumission).
+
+Chaque résultat est renvoyé dès qu'il est prêt (une ligne NDJSON par
+image) ; l'enregistrement en base se fait à la fin, en une transaction.
+Un lot interrompu ne laisse pas de fichiers orphelins.
+"""
+
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from .ai_model import detector
+from .batching import scheduler
+from .cache import result_cache
+from .chunked import IMAGE_EXTENSIONS
+from .processing import delete_unsaved_files, save_translation_results, store_uploaded_file
+from .uploadhandler import compute_content_hash
+
+
+class BatchError(Exception):
+    """Lot refusé ; `status` est le code HTTP à renvoyer"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class BatchItem:
+    """Image d'un lot : fichier uploadé ou entrée d'une archive ZIP"""
+
+    def __init__(self, index: int, name: str, uploaded_file=None, archive=None, entry=None):
+        self.index = index
+        self.name = name
+        self.archive = archive
+        self._uploaded_file = uploaded_file
+        self._entry = entry
+
+    def open(self):
+        """Retourne le fichier de l'image (lecture de l'entrée pour une archive)"""
+        if self._uploaded_file is not None:
+            return self._uploaded_file
+        return ContentFile(self.archive.read(self._entry), name=self.name)
+
+
+def _is_image(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def collect_batch_items(images: List, archives: List) -> List[BatchItem]:
+    """
+    Liste les images d'un lot
+
+    Les entrées d'archive qui ne sont pas des images (dossiers, fichiers
+    cachés, métadonnées macOS...) sont ignorées. Les archives restent
+    ouvertes pour la lecture des entrées : close_batch_items les ferme.
+
+    Args:
+        images: Fichiers du champ `images`
+        archives: Fichiers ZIP du champ `archive`
+
+    Raises:
+        BatchError: Fichier non supporté, archive invalide, lot ou image
+            trop volumineux
+    """
+    max_files = getattr(settings, 'SIGNVISION_BATCH_MAX_FILES', 500)
+    max_image_bytes = getattr(settings, 'SIGNVISION_BATCH_MAX_IMAGE_BYTES', 20 * 1024 * 1024)
+    max_total_bytes = getattr(settings, 'SIGNVISION_BATCH_MAX_TOTAL_BYTES', 512 * 1024 * 1024)
+    items = []
+    opened = []
+    total_bytes = 0
+
+    try:
+        for uploaded_file in images:
+            if not _is_image(uploaded_file.name):
+                raise BatchError(f'Type de fichier non supporté: {uploaded_file.name}')
+            total_bytes += uploaded_file.size
+            items.append(BatchItem(len(items), uploaded_file.name, uploaded_file=uploaded_file))
+
+        for uploaded_archive in archives:
+            try:
+                archive = zipfile.ZipFile(uploaded_archive)
+            except zipfile.BadZipFile:
+                raise BatchError(f'Archive ZIP invalide: {uploaded_archive.name}')
+            opened.append(archive)
+
+            for entry in archive.infolist():
+                name = os.path.basename(entry.filename)
+                if entry.is_dir() or name.startswith('.') or '__MACOSX/' in entry.filename or not _is_image(name):
+                    continue
+                # Taille décompressée annoncée ; zipfile ne lit jamais au-delà
+                if entry.file_size > max_image_bytes:
+                    raise BatchError(f'Image trop volumineuse: {entry.filename}', status=413)
+                total_bytes += entry.file_size
+                if total_bytes > max_total_bytes:
+                    break
+                items.append(BatchItem(len(items), name, archive=archive, entry=entry))
+
+        if total_bytes > max_total_bytes:
+            raise BatchError(f'Lot trop volumineux (maximum {max_total_bytes} octets décompressés)', status=413)
+        if len(items) > max_files:
+            raise BatchError(f'Trop d\'images ({len(items)}, maximum {max_files})', status=413)
+    except BatchError:
+        for archive in opened:
+            archive.close()
+        raise
+
+    # Archives sans image : rien ne les fermerait plus tard
+    used = {id(item.archive) for item in items}
+    for archive in opened:
+        if id(archive) not in used:
+            archive.close()
+    return items
+
+
+def close_batch_items(items: List[BatchItem]):
+    """Ferme les archives ZIP ouvertes par collect_batch_items"""
+    archives = {id(item.archive): item.archive for item in items if item.archive is not None}
+    for archive in archives.values():
+        archive.close()
+
+
+def _result_data(detections: List[Dict], processing_time: float) -> Dict:
+    confidence_score = 0
+    if detections:
+        confidence_score = sum(d['confidence'] for d in detections) / len(detections) * 100
+    return {
+        'detections': detections,
+        'translated_text': detector.translate_signs_to_text(detections),
+        'confidence_score': round(confidence_score, 2),
+        'processing_time': round(processing_time, 2),
+    }
+
+
+def _error_data(error: Exception, processing_time: float) -> Dict:
+    return {
+        'detections': [],
+        'translated_text': f'Erreur lors du traitement: {str(error)}',
+        'confidence_score': 0,
+        'processing_time': round(processing_time, 2),
+        'error': str(error),
+    }
+
+
+def _result_event(item: BatchItem, result_data: Dict) -> Dict:
+    if result_data.get('error'):
+        return {'type': 'error', 'index': item.index, 'name': item.name,
+                'success': False, 'error': result_data['error']}
+    return dict(result_data, type='result', index=item.index, name=item.name, success=True, cached=False)
+
+
+def analyze_image_batch(items: List[BatchItem]) -> Iterator[Dict]:
+    """
+    Analyse les images d'un lot et enregistre les résultats à la fin
+
+    Un contenu déjà traité par la même version du modèle est servi par le
+    cache de résultats sans être ré-enregistré ; un contenu répété dans le
+    lot n'est stocké et analysé qu'une fois. Si le lot est interrompu
+    (client déconnecté) ou si l'enregistrement échoue, les fichiers écrits
+    pour le lot sont supprimés. Les archives sont fermées à la fin.
+
+    Yields:
+        dict: 'start', puis un 'result' (ou 'error') par image dans l'ordre
+            de fin d'analyse, puis 'done' avec les identifiants des résultats
+            enregistrés (ou 'error' sans index si l'enregistrement échoue)
+    """
+    start_time = time.time()
+    in_flight = max(1, getattr(settings, 'SIGNVISION_BATCH_IN_FLIGHT', 32))
+
+    pending = {}  # futur -> [(image, UploadedFile, instant de soumission)], doublons compris
+    stored = {}  # empreinte -> premier UploadedFile du lot de ce contenu
+    outcomes = {}  # empreinte -> futur en cours ou résultats
+    completed = []  # (image, UploadedFile, résultats) à enregistrer
+    cached = 0
+    saved = False
+    remaining = iter(items)
+    exhausted = False
+
+    try:
+        yield {'type': 'start', 'files': len(items)}
+
+        while pending or not exhausted:
+            # Remplit la fenêtre : le micro-batching regroupe les images soumises
+            while not exhausted and len(pending) < in_flight:
+                item = next(remaining, None)
+                if item is None:
+                    exhausted = True
+                    break
+
+                submitted_at = time.time()
+                try:
+                    uploaded_file = item.open()
+                    content_hash = compute_content_hash(uploaded_file)
+                    cached_result = result_cache.get(content_hash, detector.model_version)
+                    if cached_result is not None:
+                        cached += 1
+                        yield dict(cached_result, type='result', index=item.index, name=item.name,
+                                   success=True, cached=True)
+                        continue
+                    file_instance = store_uploaded_file(
+                        uploaded_file, 'image', content_hash, commit=False, duplicate=stored.get(content_hash)
+                    )
+                except Exception as e:
+                    yield {'type': 'error', 'index': item.index, 'name': item.name, 'success': False, 'error': str(e)}
+                    continue
+
+                # Contenu déjà vu dans le lot : son résultat est partagé
+                outcome = outcomes.get(content_hash)
+                if isinstance(outcome, dict):
+                    completed.append((item, file_instance, outcome))
+                    yield _result_event(item, outcome)
+                    continue
+                if outcome is not None:
+                    pending[outcome].append((item, file_instance, submitted_at))
+                    continue
+                stored[content_hash] = file_instance
+
+                try:
+                    # Première analyse sur l'original, comme pour upload_file
+                    future = scheduler.submit(file_instance.file.path)
+                except Exception as e:
+                    # Image illisible : le résultat en erreur est enregistré comme pour upload_file
+                    result_data = _error_data(e, time.time() - submitted_at)
+                    outcomes[content_hash] = result_data
+                    completed.append((item, file_instance, result_data))
+                    yield _result_event(item, result_data)
+                    continue
+                pending[future] = [(item, file_instance, submitted_at)]
+                outcomes[content_hash] = future
+
+            if not pending:
+                continue
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: pending[f][0][0].index):
+                entries = pending.pop(future)
+                _, first_instance, submitted_at = entries[0]
+                try:
+                    result_data = _result_data(future.result(), time.time() - submitted_at)
+                except Exception as e:
+                    result_data = _error_data(e, time.time() - submitted_at)
+                outcomes[first_instance.content_hash] = result_data
+                for item, file_instance, _ in entries:
+                    completed.append((item, file_instance, result_data))
+                    yield _result_event(item, result_data)
+
+        try:
+            translation_results = save_translation_results(
+                [(file_instance, result_data) for _, file_instance, result_data in completed]
+            )
+        except Exception as e:
+            yield {'type': 'error', 'success': False, 'error': f'Erreur lors de l\'enregistrement: {str(e)}'}
+            return
+        saved = True
+
+        failed = sum(1 for _, _, result_data in completed if result_data.get('error'))
+        yield {
+            'type': 'done',
+            'success': True,
+            'files': len(items),
+            'processed': len(completed) - failed,
+            'cached': cached,
+            'failed': len(items) - len(completed) - cached + failed,
+            'results': [
+                {'index': item.index, 'result_id': translation_result.id}
+                for (item, _, _), translation_result in zip(completed, translation_results)
+            ],
+            'processing_time': round(time.time() - start_time, 2),
+        }
+    finally:
+        if not saved:
+            # Lot interrompu ou enregistrement en échec : aucune ligne ne
+            # référence les fichiers écrits (les analyses en cours les lisent)
+            wait(pending)
+            delete_unsaved_files(
+                [file_instance for _, file_instance, _ in completed]
+                + [file_instance for entries in pending.values() for _, file_instance, _ in entries]
+            )
+        close_batch_items(items)
@@ -0,0 +1,186 @@
+"""
+Ordonnanceur de micro-batchs pour l'inférence YOLOv8
+Projet créé par Marino ATOHOUN
+
+Les requêtes concurrentes (caméra, upload) déposent leurs images dans une file
+commune. Un thread unique les regroupe en lots bornés par une taille maximale
+et un délai d'attente maximal, exécute une seule passe du modèle par lot puis
+rend à chaque appelant ses propres détections.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from .ai_model import ImageSource, decode_image, detector
+from .metrics import metrics
+
+
+class _PendingImage:
+    """Image en attente d'inférence et futur associé"""
+
+    __slots__ = ('image', 'imgsz', 'future', 'enqueued_at')
+
+    def __init__(self, image, imgsz=None):
+        self.image = image
+        self.imgsz = imgsz
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class MicroBatchScheduler:
+    """
+    Regroupe les appels concurrents à detect_signs_image en lots
+    """
+
+    def __init__(self, detector, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        """
+        Initialise l'ordonnanceur
+
+        Args:
+            detector: Détecteur exposant detect_signs_batch
+            max_batch_size: Nombre maximal d'images par passe du modèle
+            max_wait_ms: Délai maximal d'attente pour compléter un lot
+        """
+        self.detector = detector
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._images = 0
+        self._errors = 0
+        self._largest_batch = 0
+        self._total_wait = 0.0
+        self._batch_sizes = {}
+
+    def submit(self, image: ImageSource, imgsz: Optional[int] = None) -> Future:
+        """
+        Place une image dans la file d'inférence
+
+        Le décodage est fait dans le thread appelant pour ne pas
+        sérialiser ce travail dans le thread d'inférence.
+
+        Args:
+            image: Image à analyser
+            imgsz: Taille d'entrée du modèle ; les images de tailles
+                différentes d'un même lot passent dans des passes séparées
+
+        Returns:
+            Futur résolu avec la liste des détections de l'image
+        """
+        pending = _PendingImage(decode_image(image), imgsz)
+        self._ensure_worker()
+        self._queue.put(pending)
+        return pending.future
+
+    def detect_signs_image(self, image: ImageSource, imgsz: Optional[int] = None) -> List[Dict]:
+        """Détecte les signes dans une image en passant par un lot partagé"""
+        return self.submit(image, imgsz).result()
+
+    def queue_depth(self) -> int:
+        """Nombre d'images en attente d'inférence"""
+        return self._queue.qsize()
+
+    def get_stats(self) -> Dict:
+        """Retourne la profondeur de file et les statistiques de lots"""
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+                'batches_processed': self._batches,
+                'images_processed': self._images,
+                'errors': self._errors,
+                'average_batch_size': round(self._images / self._batches, 3) if self._batches else 0,
+                'largest_batch': self._largest_batch,
+                'average_wait_ms': round(self._total_wait / self._images * 1000, 3) if self._images else 0,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+            }
+
+    def _ensure_worker(self):
+        """Démarre le thread d'inférence au premier appel"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name='signvision-batcher', daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self) -> List[_PendingImage]:
+        """Attend une première image puis complète le lot jusqu'aux limites"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Le délai est écoulé : on prend ce qui est déjà en file
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        """Boucle du thread d'inférence"""
+        while True:
+            collected = self._collect_batch()
+
+            # Une passe du modèle par taille d'entrée
+            groups = {}
+            for item in collected:
+                groups.setdefault(item.imgsz, []).append(item)
+
+            for imgsz, batch in groups.items():
+                self._run_batch(batch, imgsz)
+
+    def _run_batch(self, batch: List[_PendingImage], imgsz: Optional[int]):
+        """Exécute une passe du modèle et résout les futurs du lot"""
+        started_at = time.monotonic()
+        options = {'imgsz': imgsz} if imgsz else {}
+
+        try:
+            results = self.detector.detect_signs_batch([item.image for item in batch], **options)
+        except Exception as e:
+            with self._stats_lock:
+                self._errors += len(batch)
+            for item in batch:
+                item.future.set_exception(e)
+            return
+
+        for item in batch:
+            metrics.observe('queue_wait', started_at - item.enqueued_at)
+
+        with self._stats_lock:
+            size = len(batch)
+            self._batches += 1
+            self._images += size
+            self._largest_batch = max(self._largest_batch, size)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._total_wait += sum(started_at - item.enqueued_at for item in batch)
+
+        for item, detections in zip(batch, results):
+            item.future.set_result(detections)
+
+
+# Instance globale de l'ordonnanceur
+scheduler = MicroBatchScheduler(
+    detector,
+    max_batch_size=getattr(settings, 'SIGNVISION_BATCH_MAX_SIZE', 8),
+    max_wait_ms=getattr(settings, 'SIGNVISION_BATCH_MAX_WAIT_MS', 10),
+)
+metrics.register_gauge('inference_queue_depth', "Images en attente d'inférence", scheduler.queue_depth)
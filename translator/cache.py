@@ -0,0 +1,103 @@
+"""
+Cache des résultats indexé par le contenu des fichiers
+Projet créé par Marino ATOHOUN
+
+Un résultat est identifié par l'empreinte SHA-256 du fichier et la version du
+modèle. Le cache a deux niveaux : un LRU borné en mémoire, puis une
+recherche indexée dans la table des TranslationResult.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from .models import TranslationResult
+
+
+class ResultCache:
+    """
+    Cache à deux niveaux des résultats de traduction
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Initialise le cache
+
+        Args:
+            max_entries: Nombre maximal de résultats gardés en mémoire
+        """
+        self.max_entries = max(0, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, content_hash: str, model_version: str) -> Optional[Dict]:
+        """
+        Cherche un résultat pour un contenu et une version du modèle
+
+        Returns:
+            Données du résultat (format serialize_result) ou None
+        """
+        if not content_hash:
+            return None
+
+        key = (content_hash, model_version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        translation_result = (
+            TranslationResult.objects
+            .filter(uploaded_file__content_hash=content_hash, model_version=model_version)
+            .order_by('-created_at')
+            .first()
+        )
+        if translation_result is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        from .processing import serialize_result
+
+        data = serialize_result(translation_result)
+        with self._lock:
+            self.db_hits += 1
+        self.put(content_hash, model_version, data)
+        return data
+
+    def put(self, content_hash: str, model_version: str, data: Dict):
+        """Ajoute un résultat au niveau mémoire"""
+        if not content_hash or not self.max_entries:
+            return
+
+        with self._lock:
+            self._entries[(content_hash, model_version)] = data
+            self._entries.move_to_end((content_hash, model_version))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Vide le niveau mémoire"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Retourne les compteurs du cache"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'memory_hits': self.hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+            }
+
+
+# Instance globale du cache de résultats
+result_cache = ResultCache(max_entries=getattr(settings, 'SIGNVISION_RESULT_CACHE_SIZE', 256))
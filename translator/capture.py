@@ -0,0 +1,89 @@
+"""
+Consignes de capture pour les clients caméra
+Projet créé par Marino ATOHOUN
+
+Le serveur mesure le temps de traitement des frames caméra (moyenne mobile
+exponentielle) et la profondeur de la file d'inférence, puis renvoie au
+client la résolution, la qualité JPEG et l'intervalle d'envoi recommandés.
+Sous charge, les clients envoient des frames plus petites et moins souvent.
+"""
+
+import threading
+from typing import Dict, Optional, Sequence
+
+
+class CaptureAdvisor:
+    """
+    Calcule les consignes de capture à partir de la charge mesurée
+    """
+
+    def __init__(self, target_latency_ms: float = 250.0, min_interval_ms: int = 200,
+                 max_interval_ms: int = 2000, headroom: float = 2.0, batch_size: int = 8,
+                 dimensions: Sequence[int] = (960, 640, 480, 320),
+                 qualities: Sequence[float] = (0.85, 0.75, 0.65, 0.5),
+                 smoothing: float = 0.2):
+        """
+        Args:
+            target_latency_ms: Temps de traitement visé pour une frame
+            min_interval_ms: Intervalle minimal entre deux envois d'un client
+            max_interval_ms: Intervalle maximal entre deux envois d'un client
+            headroom: Rapport entre l'intervalle recommandé et le temps de
+                traitement (2 : un client occupe au plus la moitié du temps)
+            batch_size: Taille des lots d'inférence, pour normaliser la file
+            dimensions: Plus grand côté recommandé, du plus léger niveau de
+                charge au plus élevé
+            qualities: Qualité JPEG associée à chaque niveau de charge
+            smoothing: Poids de la dernière mesure dans la moyenne mobile
+        """
+        self.target_latency = target_latency_ms / 1000.0
+        self.min_interval_ms = int(min_interval_ms)
+        self.max_interval_ms = int(max_interval_ms)
+        self.headroom = headroom
+        self.batch_size = max(1, int(batch_size))
+        self.dimensions = tuple(dimensions)
+        self.qualities = tuple(qualities)
+        self.smoothing = smoothing
+
+        self._lock = threading.Lock()
+        self._latency = None
+
+    def observe(self, processing_time: float):
+        """Ajoute le temps de traitement (s) d'une frame à la moyenne mobile"""
+        with self._lock:
+            if self._latency is None:
+                self._latency = processing_time
+            else:
+                self._latency += self.smoothing * (processing_time - self._latency)
+
+    @property
+    def latency(self) -> Optional[float]:
+        return self._latency
+
+    def hints(self, queue_depth: int = 0) -> Dict:
+        """
+        Consignes de capture pour la charge actuelle
+
+        Args:
+            queue_depth: Nombre d'images en attente d'inférence
+
+        Returns:
+            dict: max_dimension (px), jpeg_quality (0-1), interval_ms et
+                load (niveau de charge, 0 = faible)
+        """
+        latency = self._latency or 0.0
+        pressure = latency / self.target_latency + queue_depth / float(self.batch_size)
+
+        # Niveau 0 sous la cible, puis un niveau par doublement de la charge
+        level = 0
+        while level < len(self.dimensions) - 1 and pressure >= 2 ** level:
+            level += 1
+
+        interval = latency * 1000 * self.headroom * (1 + queue_depth / float(self.batch_size))
+        interval = min(self.max_interval_ms, max(self.min_interval_ms, int(round(interval))))
+
+        return {
+            'max_dimension': self.dimensions[level],
+            'jpeg_quality': self.qualities[min(level, len(self.qualities) - 1)],
+            'interval_ms': interval,
+            'load': level,
+        }
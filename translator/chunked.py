@@ -0,0 +1,295 @@
+"""
+Uploads découpés en morceaux, avec reprise
+Projet créé par Marino ATOHOUN
+
+Protocole :
+1. création d'une session (nom et taille du fichier) ;
+2. envoi des morceaux dans l'ordre, chacun avec l'en-tête Upload-Offset
+   (position du premier octet). Le corps brut est écrit directement dans
+   un fichier partiel, sans passer par la mémoire du worker ;
+3. après une coupure, le client relit l'offset de la session et reprend
+   à partir de celui-ci ;
+4. la validation crée l'UploadedFile et lance le traitement. La session
+   est réservée (statut COMMITTING) avant le traitement : une validation
+   concurrente ou répétée ne traite pas le fichier une seconde fois.
+
+L'empreinte SHA-256 est mise à jour à chaque morceau. L'état du hachage vit
+dans le processus : si la session est reprise par un autre worker (ou
+après un redémarrage), il est reconstruit en relisant le fichier partiel.
+"""
+
+import hashlib
+import os
+import threading
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UploadSession
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov')
+
+# Taille des lectures du corps de la requête et du fichier partiel
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class ChunkedUploadError(Exception):
+    """Requête refusée ; `status` est le code HTTP à renvoyer"""
+
+    def __init__(self, message: str, status: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class _HashState:
+    """Empreinte en cours d'une session et offset correspondant"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sha256 = None
+        self.offset = -1
+
+
+_hash_states = {}
+_hash_states_lock = threading.Lock()
+
+
+def _hash_state(upload_id) -> _HashState:
+    with _hash_states_lock:
+        state = _hash_states.get(upload_id)
+        if state is None:
+            state = _hash_states[upload_id] = _HashState()
+        return state
+
+
+def _forget_hash_state(upload_id):
+    with _hash_states_lock:
+        _hash_states.pop(upload_id, None)
+
+
+def upload_directory() -> str:
+    return getattr(settings, 'SIGNVISION_CHUNKED_UPLOAD_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'chunked')
+
+
+def partial_path(session: UploadSession) -> str:
+    """Chemin du fichier partiel d'une session"""
+    return os.path.join(upload_directory(), f'{session.pk}.part')
+
+
+def _sync_hash(state: _HashState, session: UploadSession):
+    """Amène l'empreinte en mémoire à l'offset de la session"""
+    if state.sha256 is not None and state.offset == session.offset:
+        return
+
+    # Hachage absent ou désynchronisé : relecture du fichier partiel
+    sha256 = hashlib.sha256()
+    remaining = session.offset
+    with open(partial_path(session), 'rb') as partial:
+        while remaining > 0:
+            data = partial.read(min(COPY_BUFFER_SIZE, remaining))
+            if not data:
+                raise ChunkedUploadError("Fichier partiel incomplet, upload à recommencer", status=409, offset=0)
+            sha256.update(data)
+            remaining -= len(data)
+    state.sha256 = sha256
+    state.offset = session.offset
+
+
+def create_session(filename: str, size: int) -> UploadSession:
+    """
+    Crée une session d'upload après validation du nom et de la taille
+
+    Raises:
+        ChunkedUploadError: Extension non supportée ou taille invalide
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in IMAGE_EXTENSIONS + VIDEO_EXTENSIONS:
+        raise ChunkedUploadError(f'Type de fichier non supporté: {extension}')
+
+    max_bytes = getattr(settings, 'SIGNVISION_CHUNKED_UPLOAD_MAX_BYTES', 2 * 1024 * 1024 * 1024)
+    if size <= 0 or size > max_bytes:
+        raise ChunkedUploadError(f'Taille invalide (maximum {max_bytes} octets)', status=413)
+
+    purge_expired_sessions()
+
+    session = UploadSession.objects.create(
+        original_name=os.path.basename(filename)[:255],
+        file_type='image' if extension in IMAGE_EXTENSIONS else 'video',
+        size=size,
+    )
+    os.makedirs(upload_directory(), exist_ok=True)
+    open(partial_path(session), 'wb').close()
+    return session
+
+
+def append_chunk(session: UploadSession, offset: int, stream, length: int) -> UploadSession:
+    """
+    Écrit un morceau à la fin du fichier partiel
+
+    Le corps est copié par blocs de COPY_BUFFER_SIZE octets et haché au
+    passage. Un morceau interrompu n'est pas validé : l'offset de la session
+    ne change pas et le client renvoie le morceau entier.
+
+    Args:
+        session: Session ouverte
+        offset: Position annoncée par le client (en-tête Upload-Offset)
+        stream: Flux du corps de la requête
+        length: Taille du morceau (Content-Length)
+
+    Raises:
+        ChunkedUploadError: Offset inattendu (409), morceau trop grand (413)
+            ou session déjà validée
+    """
+    max_chunk = getattr(settings, 'SIGNVISION_CHUNKED_UPLOAD_MAX_CHUNK', 8 * 1024 * 1024)
+    if length <= 0:
+        raise ChunkedUploadError('Morceau vide')
+    if length > max_chunk:
+        raise ChunkedUploadError(f'Morceau trop grand (maximum {max_chunk} octets)', status=413)
+
+    state = _hash_state(session.pk)
+    with state.lock:
+        # Relecture sous le verrou : un envoi concurrent a pu avancer l'offset
+        session.refresh_from_db()
+        if session.status != UploadSession.OPEN:
+            raise ChunkedUploadError('Upload déjà validé', status=409, offset=session.offset)
+        if offset != session.offset:
+            raise ChunkedUploadError(
+                f'Offset inattendu ({offset}, attendu {session.offset})', status=409, offset=session.offset
+            )
+        if session.offset + length > session.size:
+            raise ChunkedUploadError('Le morceau dépasse la taille annoncée', status=413, offset=session.offset)
+
+        _sync_hash(state, session)
+        sha256 = state.sha256.copy()
+        written = 0
+        with open(partial_path(session), 'r+b') as partial:
+            # Écrase les restes d'un morceau précédent interrompu
+            partial.seek(session.offset)
+            partial.truncate()
+            while written < length:
+                data = stream.read(min(COPY_BUFFER_SIZE, length - written))
+                if not data:
+                    break
+                partial.write(data)
+                sha256.update(data)
+                written += len(data)
+
+        if written != length:
+            raise ChunkedUploadError('Morceau incomplet', offset=session.offset)
+
+        UploadSession.objects.filter(pk=session.pk).update(
+            offset=session.offset + written, updated_at=timezone.now()
+        )
+        session.offset += written
+        state.sha256 = sha256
+        state.offset = session.offset
+    return session
+
+
+class _PartialFile(File):
+    """Fichier partiel terminé, déplacé (et non copié) par le stockage"""
+
+    def __init__(self, path: str, name: str):
+        super().__init__(open(path, 'rb'), name=name)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def finish_session(session: UploadSession):
+    """
+    Termine l'upload : réserve la session et retourne le fichier complet
+
+    La session passe à COMMITTING par une mise à jour conditionnelle : une
+    seule validation l'obtient, même depuis un autre worker. Elle doit
+    ensuite être close (close_session) ou annulée (abort_session).
+
+    Returns:
+        tuple: (fichier à passer à store_uploaded_file, empreinte SHA-256)
+
+    Raises:
+        ChunkedUploadError: Upload incomplet, déjà validé ou en cours de
+            validation
+    """
+    state = _hash_state(session.pk)
+    with state.lock:
+        session.refresh_from_db()
+        if session.status == UploadSession.OPEN and session.offset != session.size:
+            raise ChunkedUploadError(
+                f'Upload incomplet ({session.offset}/{session.size} octets)', status=409, offset=session.offset
+            )
+        if session.status == UploadSession.OPEN:
+            _sync_hash(state, session)
+            content_hash = state.sha256.hexdigest()
+            claimed = UploadSession.objects.filter(
+                pk=session.pk, status=UploadSession.OPEN, offset=session.size
+            ).update(status=UploadSession.COMMITTING, content_hash=content_hash, updated_at=timezone.now())
+            if claimed:
+                session.status = UploadSession.COMMITTING
+                session.content_hash = content_hash
+                return _PartialFile(partial_path(session), session.original_name), content_hash
+            session.refresh_from_db()
+
+    if session.status == UploadSession.COMMITTING:
+        raise ChunkedUploadError('Validation déjà en cours', status=409, offset=session.offset)
+    raise ChunkedUploadError('Upload déjà validé', status=409, offset=session.offset)
+
+
+def close_session(session: UploadSession, uploaded_file=None):
+    """Marque la session comme validée et supprime le fichier partiel restant"""
+    session.status = UploadSession.COMMITTED
+    session.uploaded_file = uploaded_file
+    session.save(update_fields=['status', 'uploaded_file', 'updated_at'])
+    _forget_hash_state(session.pk)
+    _remove(partial_path(session))
+
+
+def abort_session(session: UploadSession):
+    """
+    Annule une validation en échec
+
+    Si le fichier partiel est intact, la session est rouverte et la
+    validation peut être relancée. S'il a déjà été déplacé par le stockage,
+    la session est supprimée : l'upload est à recommencer.
+    """
+    path = partial_path(session)
+    if os.path.exists(path) and os.path.getsize(path) == session.size:
+        UploadSession.objects.filter(pk=session.pk).update(status=UploadSession.OPEN, updated_at=timezone.now())
+        session.status = UploadSession.OPEN
+        return
+
+    _forget_hash_state(session.pk)
+    _remove(path)
+    UploadSession.objects.filter(pk=session.pk).delete()
+
+
+def purge_expired_sessions():
+    """
+    Supprime les sessions ouvertes inactives depuis SIGNVISION_CHUNKED_UPLOAD_EXPIRY
+    secondes, et les validations interrompues (worker arrêté) depuis aussi longtemps
+    """
+    expiry = getattr(settings, 'SIGNVISION_CHUNKED_UPLOAD_EXPIRY', 24 * 3600)
+    expired = UploadSession.objects.filter(
+        status__in=[UploadSession.OPEN, UploadSession.COMMITTING],
+        updated_at__lt=timezone.now() - timedelta(seconds=expiry)
+    )
+    for session in expired:
+        _forget_hash_state(session.pk)
+        _remove(partial_path(session))
+    with transaction.atomic():
+        expired.delete()
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,111 @@
+"""
+Dérivés des images uploadées : entrée du modèle et vignette
+Projet créé par Marino ATOHOUN
+
+À l'ingestion, l'image originale est décodée une seule fois pour produire :
+- un dérivé à la taille d'entrée du modèle (plus grand côté
+  SIGNVISION_DERIVATIVE_SIZE), que YOLOv8 aurait de toute façon réduit à
+  cette taille ;
+- une vignette pour l'historique, calculée à partir du dérivé.
+
+L'orientation EXIF est appliquée, et les JPEG sont décodés directement à
+une résolution réduite (draft). Les retraitements lisent ensuite le dérivé
+au lieu de l'original ; les boîtes détectées sont remises à l'échelle de
+l'original avec le facteur `scale`.
+"""
+
+import io
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+EXIF_ORIENTATION = 0x0112
+
+
+class ImageDerivatives:
+    """Dérivé et vignette encodés en JPEG, et facteur d'échelle vers l'original"""
+
+    def __init__(self, derivative: bytes, thumbnail: bytes, scale: float, original_size):
+        self.derivative = derivative
+        self.thumbnail = thumbnail
+        self.scale = scale
+        self.original_size = original_size
+
+
+def _encode_jpeg(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def build_derivatives(source, max_size: int = 640, thumbnail_size: int = 160,
+                      quality: int = 92) -> ImageDerivatives:
+    """
+    Produit le dérivé et la vignette d'une image en un seul décodage
+
+    Args:
+        source: Chemin ou fichier (objet lisible) de l'image originale
+        max_size: Plus grand côté du dérivé
+        thumbnail_size: Plus grand côté de la vignette
+        quality: Qualité JPEG du dérivé
+
+    Returns:
+        ImageDerivatives
+    """
+    with Image.open(source) as original:
+        # Taille de l'original une fois l'orientation EXIF appliquée
+        width, height = original.size
+        if original.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8):
+            width, height = height, width
+
+        # Décodage JPEG à une résolution réduite (facteur 1/2, 1/4 ou 1/8)
+        original.draft('RGB', (max_size, max_size))
+        image = ImageOps.exif_transpose(original).convert('RGB')
+
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    derivative = _encode_jpeg(image, quality)
+    scale = max(width, height) / max(image.size)
+
+    image.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
+    thumbnail = _encode_jpeg(image, 80)
+
+    return ImageDerivatives(derivative, thumbnail, scale, (width, height))
+
+
+def attach_derivatives(file_instance, source):
+    """
+    Calcule et associe le dérivé et la vignette d'un UploadedFile image
+
+    Les fichiers sont écrits dans le stockage ; l'instance n'est pas
+    enregistrée en base. En cas d'échec (image illisible), l'instance reste
+    sans dérivé et l'original est utilisé.
+    """
+    try:
+        derivatives = build_derivatives(
+            source,
+            max_size=getattr(settings, 'SIGNVISION_DERIVATIVE_SIZE', 640),
+            thumbnail_size=getattr(settings, 'SIGNVISION_THUMBNAIL_SIZE', 160),
+            quality=getattr(settings, 'SIGNVISION_DERIVATIVE_QUALITY', 92),
+        )
+    except Exception as e:
+        print(f"Dérivés non générés pour {file_instance.original_name}: {e}")
+        return
+
+    name = f'{file_instance.content_hash or "image"}.jpg'
+    file_instance.derivative.save(name, ContentFile(derivatives.derivative), save=False)
+    file_instance.thumbnail.save(name, ContentFile(derivatives.thumbnail), save=False)
+    file_instance.derivative_scale = derivatives.scale
+
+
+def scale_detections(detections: List[Dict], scale: float) -> List[Dict]:
+    """Ramène les boîtes détectées sur le dérivé aux coordonnées de l'original"""
+    if scale == 1.0:
+        return detections
+    for detection in detections:
+        bbox = detection['bbox']
+        for key in ('x', 'y', 'width', 'height'):
+            bbox[key] = bbox[key] * scale
+    return detections
@@ -0,0 +1,278 @@
+"""
+Téléchargement en flux des vidéos distantes
+Projet créé par Marino ATOHOUN
+
+La vidéo est téléchargée morceau par morceau avec requests dans un fichier
+temporaire, depuis un thread dédié. Un lecteur bloquant lit ce fichier au
+fur et à mesure de son remplissage : OpenCV commence à décoder les
+premières frames pendant que la suite du fichier arrive. La mémoire reste
+bornée à un morceau, quelle que soit la taille de la vidéo.
+
+Le téléchargement est interrompu au-delà d'une taille ou d'une durée
+maximale ; le lecteur voit alors une fin de fichier et l'erreur est
+conservée pour être signalée au client.
+
+L'URL vient du client : avant chaque requête (y compris après une
+redirection), le nom d'hôte est résolu et les adresses de boucle locale,
+privées, link-local (métadonnées cloud 169.254.169.254), réservées ou
+multicast sont refusées.
+"""
+
+import io
+import ipaddress
+import os
+import socket
+import tempfile
+import threading
+import time
+from typing import Iterable, Optional
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+
+class DownloadError(Exception):
+    """Téléchargement refusé, interrompu ou en échec"""
+
+
+def check_url(url: str, allowed_hosts: Iterable[str] = (), allow_private: bool = False):
+    """
+    Vérifie qu'une URL fournie par un client peut être téléchargée
+
+    Args:
+        url: Adresse à vérifier
+        allowed_hosts: Si non vide, seuls ces hôtes (et leurs sous-domaines)
+            sont acceptés
+        allow_private: Accepte les adresses non publiques (réseau interne)
+
+    Raises:
+        DownloadError: URL invalide, hôte non autorisé ou adresse non publique
+    """
+    parts = urlsplit(url)
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+    except ValueError:
+        raise DownloadError("URL invalide")
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise DownloadError("URL invalide")
+
+    host = parts.hostname.lower().rstrip('.')
+    allowed_hosts = [allowed.lower() for allowed in allowed_hosts]
+    if allowed_hosts and not any(host == allowed or host.endswith('.' + allowed) for allowed in allowed_hosts):
+        raise DownloadError(f"Hôte non autorisé: {host}")
+    if allow_private:
+        return
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)}
+    except (socket.gaierror, UnicodeError):
+        raise DownloadError(f"Hôte introuvable: {host}")
+
+    for raw_address in addresses:
+        address = ipaddress.ip_address(raw_address.split('%')[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise DownloadError(f"Adresse non autorisée pour {host}: {address}")
+
+
+class SpooledDownload:
+    """
+    Télécharge une URL dans un fichier temporaire depuis un thread
+    """
+
+    def __init__(self, url: str, max_bytes: int = 200 * 1024 * 1024, timeout: float = 120.0,
+                 connect_timeout: float = 10.0, read_timeout: float = 30.0,
+                 chunk_size: int = 64 * 1024, session: Optional[requests.Session] = None,
+                 allowed_hosts: Iterable[str] = (), allow_private: bool = False, max_redirects: int = 5):
+        """
+        Args:
+            url: Adresse http(s) de la vidéo
+            max_bytes: Taille maximale acceptée
+            timeout: Durée maximale du téléchargement complet (s)
+            connect_timeout: Délai de connexion (s)
+            read_timeout: Délai maximal sans recevoir de données (s)
+            chunk_size: Taille des morceaux lus sur le réseau
+            session: Session requests à réutiliser
+            allowed_hosts: Hôtes acceptés (tous les hôtes publics si vide)
+            allow_private: Accepte les adresses non publiques
+            max_redirects: Nombre maximal de redirections suivies
+        """
+        self.url = url
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.chunk_size = chunk_size
+        self.session = session or requests.Session()
+        self.allowed_hosts = tuple(allowed_hosts)
+        self.allow_private = allow_private
+        self.max_redirects = max_redirects
+
+        self.content_length = None
+        self.size = 0
+        self.done = False
+        self.error = None
+        self.started_at = None
+
+        self._changed = threading.Condition()
+        self._cancelled = threading.Event()
+        self._thread = None
+        fd, self.path = tempfile.mkstemp(prefix='signvision-url-', suffix='.part')
+        self._writer = os.fdopen(fd, 'wb')
+
+    def start(self) -> 'SpooledDownload':
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='signvision-download', daemon=True)
+        self._thread.start()
+        return self
+
+    def wait_for_headers(self):
+        """Attend la réponse HTTP ; lève DownloadError si elle est refusée"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.content_length is not None or self.size or self.done)
+        if self.error and not self.size:
+            raise DownloadError(self.error)
+
+    def reader(self) -> 'GrowingFileReader':
+        """Lecteur bloquant du fichier en cours de téléchargement"""
+        return GrowingFileReader(self)
+
+    def close(self):
+        """Interrompt le téléchargement et supprime le fichier temporaire"""
+        self._cancelled.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._writer.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def wait_for_size(self, size: int, timeout: float) -> int:
+        """Attend que `size` octets soient disponibles (ou la fin du téléchargement)"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.size >= size or self.done, timeout=timeout)
+            return self.size
+
+    def wait_until_done(self, timeout: float):
+        with self._changed:
+            self._changed.wait_for(lambda: self.done, timeout=timeout)
+
+    def _open(self) -> requests.Response:
+        """Envoie la requête en vérifiant l'URL avant chaque redirection"""
+        url = self.url
+        for _ in range(self.max_redirects + 1):
+            check_url(url, self.allowed_hosts, self.allow_private)
+            response = self.session.get(url, stream=True, allow_redirects=False,
+                                        timeout=(self.connect_timeout, self.read_timeout))
+            if not response.is_redirect:
+                return response
+            response.close()
+            url = urljoin(url, response.headers['Location'])
+        raise DownloadError("Trop de redirections")
+
+    def _run(self):
+        try:
+            with self._open() as response:
+                response.raise_for_status()
+
+                declared = response.headers.get('Content-Length')
+                declared = int(declared) if declared and declared.isdigit() else 0
+                if declared > self.max_bytes:
+                    raise DownloadError(
+                        f"Vidéo trop volumineuse ({declared} octets, maximum {self.max_bytes})"
+                    )
+                with self._changed:
+                    self.content_length = declared
+                    self._changed.notify_all()
+
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if self._cancelled.is_set():
+                        raise DownloadError("Téléchargement annulé")
+                    if time.monotonic() - self.started_at > self.timeout:
+                        raise DownloadError(f"Téléchargement trop long (plus de {self.timeout:g} s)")
+                    if self.size + len(chunk) > self.max_bytes:
+                        raise DownloadError(f"Vidéo trop volumineuse (maximum {self.max_bytes} octets)")
+
+                    self._writer.write(chunk)
+                    self._writer.flush()
+                    with self._changed:
+                        self.size += len(chunk)
+                        self._changed.notify_all()
+        except DownloadError as e:
+            self.error = str(e)
+        except requests.RequestException as e:
+            self.error = f"Erreur de téléchargement: {e}"
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+
+class GrowingFileReader(io.BufferedIOBase):
+    """
+    Lecture d'un fichier en cours de téléchargement
+
+    read() attend que les octets demandés soient écrits. La taille totale
+    (seek depuis la fin) est celle annoncée par le serveur, sinon celle
+    obtenue à la fin du téléchargement. Un téléchargement interrompu est vu
+    comme une fin de fichier.
+    """
+
+    def __init__(self, download: SpooledDownload):
+        super().__init__()
+        self.download = download
+        self._file = open(download.path, 'rb')
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        download = self.download
+        if size is None or size < 0:
+            download.wait_until_done(timeout=download.timeout)
+            size = max(0, download.size - self._position)
+        else:
+            available = download.wait_for_size(self._position + size, timeout=download.read_timeout)
+            size = max(0, min(size, available - self._position))
+
+        self._file.seek(self._position)
+        data = self._file.read(size)
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        else:
+            position = self._total_size() + offset
+        self._position = max(0, position)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+    def _total_size(self) -> int:
+        download = self.download
+        if download.content_length and not download.error:
+            return download.content_length
+        download.wait_until_done(timeout=download.timeout)
+        return download.size
@@ -0,0 +1,131 @@
+"""
+Historique des traductions : requête optimisée, pagination et cache
+Projet créé par Marino ATOHOUN
+
+Les pages d'historique sont calculées en une seule requête (comptage des
+détections annoté, champs JSON volumineux différés) et paginées par curseur
+sur created_at. Elles sont mises en cache sous un numéro de version qui
+change à chaque enregistrement ou suppression d'un TranslationResult.
+"""
+
+import base64
+import binascii
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce
+
+from .models import TranslationResult
+
+
+HISTORY_VERSION_KEY = 'signvision:history:version'
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+def history_queryset():
+    """
+    Résultats ordonnés du plus récent au plus ancien, avec le nombre de
+    détections annoté et sans les champs JSON volumineux
+    """
+    return (
+        TranslationResult.objects
+        .select_related('uploaded_file', 'packed_detections')
+        .only(
+            'id', 'translated_text', 'confidence_score', 'processing_time', 'created_at',
+            'uploaded_file__original_name', 'uploaded_file__file_type', 'uploaded_file__thumbnail',
+            'packed_detections__count',
+        )
+        .annotate(detections_count=Count('detections') + Coalesce(F('packed_detections__count'), 0))
+        .order_by('-created_at', '-id')
+    )
+
+
+def encode_cursor(result) -> str:
+    """Encode la position (created_at, id) d'un résultat en curseur opaque"""
+    raw = f"{result.created_at.isoformat()}|{result.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Décode un curseur produit par encode_cursor
+
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, result_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(result_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError('Curseur invalide') from e
+
+
+def serialize_history_item(result) -> Dict:
+    """Retourne un résultat au format de l'API d'historique"""
+    return {
+        'id': result.id,
+        'file_name': result.uploaded_file.original_name,
+        'file_type': result.uploaded_file.file_type,
+        # Vignette générée à l'upload : l'original n'est pas relu pour l'affichage
+        'thumbnail_url': result.uploaded_file.thumbnail.url if result.uploaded_file.thumbnail else None,
+        'translated_text': result.translated_text,
+        'confidence_score': result.confidence_score,
+        'processing_time': result.processing_time,
+        'created_at': result.created_at.isoformat(),
+        'detections_count': result.detections_count
+    }
+
+
+def get_history_page(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Retourne une page d'historique et le curseur de la page suivante
+
+    Args:
+        cursor: Curseur retourné par la page précédente (None pour la première)
+        limit: Nombre de résultats par page
+
+    Returns:
+        (résultats sérialisés, curseur suivant ou None)
+    """
+    queryset = history_queryset()
+    if cursor:
+        created_at, result_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=result_id)
+        )
+
+    # Un élément de plus pour savoir s'il existe une page suivante
+    results = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(results[limit - 1]) if len(results) > limit else None
+    return [serialize_history_item(result) for result in results[:limit]], next_cursor
+
+
+def get_history_version() -> str:
+    """Retourne la version courante de l'historique (change à chaque écriture)"""
+    version = cache.get(HISTORY_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(HISTORY_VERSION_KEY, version, timeout=None):
+            version = cache.get(HISTORY_VERSION_KEY, version)
+    return version
+
+
+def invalidate_history():
+    """Invalide toutes les pages d'historique en cache"""
+    cache.set(HISTORY_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def get_cached_history_page(cursor: Optional[str], limit: int, version: str) -> Dict:
+    """Retourne une page d'historique depuis le cache, ou la calcule"""
+    key = f"signvision:history:{version}:{cursor or ''}:{limit}"
+    page = cache.get(key)
+    if page is None:
+        results, next_cursor = get_history_page(cursor, limit)
+        page = {'results': results, 'next_cursor': next_cursor}
+        cache.set(key, page, timeout=300)
+    return page
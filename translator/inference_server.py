@@ -0,0 +1,322 @@
+"""
+Serveur d'inférence multi-processus et client associé
+Projet créé par Marino ATOHOUN
+
+Un processus serveur possède les répliques du modèle (un processus par
+réplique). Les workers Django lui envoient leurs frames via un socket Unix.
+Les pixels transitent par multiprocessing.shared_memory : seul un petit
+en-tête JSON (nom du segment, formes, types) circule sur le socket.
+
+Protocole : chaque message est un JSON UTF-8 précédé de sa longueur sur
+4 octets (big-endian).
+"""
+
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+from importlib import import_module
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .ai_model import ImageSource, YOLOv8SignDetector, load_image
+
+
+_HEADER = struct.Struct('>I')
+
+
+def send_message(sock: socket.socket, message: Dict):
+    """Envoie un message JSON préfixé par sa longueur"""
+    payload = json.dumps(message).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def recv_message(sock: socket.socket):
+    """Reçoit un message JSON, ou None si la connexion est fermée"""
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    payload = _recv_exactly(sock, _HEADER.unpack(header)[0])
+    if payload is None:
+        return None
+    return json.loads(payload.decode('utf-8'))
+
+
+def _recv_exactly(sock: socket.socket, size: int):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Ouvre un segment créé par le client sans le confier au resource tracker"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    # Le client reste propriétaire du segment et se charge de le supprimer :
+    # la réplique retire l'enregistrement fait à l'ouverture
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _create_shared_memory(size: int) -> shared_memory.SharedMemory:
+    """
+    Crée un segment côté client, non suivi pendant la requête
+
+    Avant Python 3.13, une réplique qui partage le resource tracker du
+    client (serveur lancé dans le même processus) enregistre puis retire le
+    segment : il ne doit pas être enregistré à ce moment-là, sinon le
+    retrait de la réplique effacerait celui du client.
+    """
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    if sys.version_info < (3, 13):
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _unlink_shared_memory(shm: shared_memory.SharedMemory):
+    """Supprime un segment créé par _create_shared_memory"""
+    if sys.version_info < (3, 13):
+        # unlink() retire l'enregistrement : il est rétabli juste avant
+        resource_tracker.register(shm._name, 'shared_memory')
+    shm.unlink()
+
+
+# --- Processus répliques -------------------------------------------------
+
+_replica = None
+
+
+def _init_replica(detector_path: str, model_path: str, threads: int, backend: str, int8: bool):
+    """Initialise une réplique : configure Django et charge le modèle"""
+    global _replica
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'signvision.settings')
+    import django
+    django.setup()
+
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    module_name, class_name = detector_path.rsplit('.', 1)
+    detector_class = getattr(import_module(module_name), class_name)
+    _replica = detector_class(model_path, backend=backend, int8=int8)
+    _replica.get_model()
+
+
+def _detect_shared_frames(shm_name: str, frames: List[Dict], imgsz: Optional[int] = None) -> List[List[Dict]]:
+    """Exécute la réplique sur les frames lues directement en mémoire partagée"""
+    shm = _attach_shared_memory(shm_name)
+    try:
+        images = [
+            np.ndarray(tuple(frame['shape']), dtype=np.dtype(frame['dtype']),
+                       buffer=shm.buf, offset=frame['offset'])
+            for frame in frames
+        ]
+        detections = _replica.detect_signs_batch(images, imgsz=imgsz)
+        del images
+        return detections
+    finally:
+        shm.close()
+
+
+def _replica_info() -> Dict:
+    return _replica.get_model_info()
+
+
+# --- Serveur ---------------------------------------------------------------
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Traite les messages d'une connexion client jusqu'à sa fermeture"""
+
+    def handle(self):
+        while True:
+            message = recv_message(self.request)
+            if message is None:
+                return
+            try:
+                response = self.server.dispatch(message)
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            send_message(self.request, response)
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serveur Unix possédant un pool de répliques du modèle
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, replicas: int = 1, threads_per_replica: int = 0,
+                 model_path: str = None, backend: str = 'torch', int8: bool = False,
+                 detector_path: str = 'translator.ai_model.YOLOv8SignDetector'):
+        """
+        Initialise le serveur et démarre les répliques
+
+        Args:
+            socket_path: Chemin du socket Unix
+            replicas: Nombre de processus possédant chacun une copie du modèle
+            threads_per_replica: Threads torch par réplique (0 = défaut torch)
+            model_path: Chemin des poids
+            backend: Backend d'inférence des répliques
+            int8: Variante INT8 du backend
+            detector_path: Classe du détecteur (chemin Python pointé)
+        """
+        from .ai_model import DEFAULT_MODEL_PATH
+
+        self.socket_path = socket_path
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        context = multiprocessing.get_context('spawn')
+        self.pool = context.Pool(
+            processes=max(1, int(replicas)),
+            initializer=_init_replica,
+            initargs=(detector_path, os.fspath(model_path or DEFAULT_MODEL_PATH), threads_per_replica,
+                      backend, int8),
+        )
+        super().__init__(socket_path, _RequestHandler)
+
+    def dispatch(self, message: Dict) -> Dict:
+        """Exécute une opération demandée par un client"""
+        op = message.get('op')
+        if op == 'detect':
+            detections = self.pool.apply(
+                _detect_shared_frames, (message['shm'], message['frames'], message.get('imgsz'))
+            )
+            return {'ok': True, 'detections': detections}
+        if op == 'info':
+            return {'ok': True, 'info': self.pool.apply(_replica_info)}
+        if op == 'ping':
+            return {'ok': True}
+        return {'ok': False, 'error': f'Opération inconnue: {op}'}
+
+    def server_close(self):
+        super().server_close()
+        self.pool.terminate()
+        self.pool.join()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+# --- Client ---------------------------------------------------------------
+
+class RemoteSignDetector(YOLOv8SignDetector):
+    """
+    Détecteur délégant l'inférence au serveur d'inférence
+
+    Expose la même interface que YOLOv8SignDetector ; la traduction et le
+    post-traitement vidéo restent locaux.
+    """
+
+    def __init__(self, socket_path: str, model_path: str, backend: str = 'torch',
+                 int8: bool = False, timeout: float = 30.0):
+        """
+        Initialise le client
+
+        Args:
+            socket_path: Chemin du socket Unix du serveur
+            model_path: Chemin des poids (pour la version du modèle)
+            backend: Backend utilisé par le serveur (pour la version du modèle)
+            int8: Variante INT8 utilisée par le serveur
+            timeout: Délai maximal d'une requête en secondes
+        """
+        super().__init__(model_path, backend=backend, int8=int8)
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def load_model(self):
+        """Le modèle est chargé par le serveur ; on vérifie seulement qu'il répond"""
+        self._request({'op': 'ping'})
+        self.model_loaded = True
+
+    def get_model(self):
+        raise Exception("Le modèle est hébergé par le serveur d'inférence")
+
+    def warmup(self):
+        self.load_model()
+
+    def worker_spec(self):
+        """L'inférence a déjà lieu hors du processus : pas de segments parallèles"""
+        return None
+
+    def detect_signs_batch(self, images: List[ImageSource], imgsz: Optional[int] = None) -> List[List[Dict]]:
+        """Envoie les images au serveur via un segment de mémoire partagée"""
+        if not images:
+            return []
+
+        arrays = [np.ascontiguousarray(load_image(image)) for image in images]
+
+        frames = []
+        offset = 0
+        for array in arrays:
+            frames.append({'offset': offset, 'shape': list(array.shape), 'dtype': array.dtype.str})
+            offset += array.nbytes
+
+        shm = _create_shared_memory(max(offset, 1))
+        try:
+            for frame, array in zip(frames, arrays):
+                target = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, offset=frame['offset'])
+                target[...] = array
+                del target
+            response = self._request({'op': 'detect', 'shm': shm.name, 'frames': frames, 'imgsz': imgsz})
+        finally:
+            shm.close()
+            _unlink_shared_memory(shm)
+
+        return response['detections']
+
+    def get_model_info(self) -> Dict:
+        info = self._request({'op': 'info'})['info']
+        info['inference_server'] = self.socket_path
+        info['model_version'] = self.model_version
+        return info
+
+    def _connection(self) -> socket.socket:
+        """Connexion persistante propre à chaque thread"""
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _request(self, message: Dict) -> Dict:
+        sock = self._connection()
+        try:
+            send_message(sock, message)
+            response = recv_message(sock)
+        except OSError:
+            self._close_connection()
+            raise
+        if response is None:
+            self._close_connection()
+            raise ConnectionError("Connexion au serveur d'inférence perdue")
+        if not response.get('ok'):
+            raise Exception(response.get('error', "Erreur du serveur d'inférence"))
+        return response
+
+    def _close_connection(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
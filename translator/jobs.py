@@ -0,0 +1,92 @@
+"""
+File d'attente asynchrone des traitements d'uploads
+Projet créé par Marino ATOHOUN
+
+Les uploads sont enregistrés comme des ProcessingJob puis traités par un pool
+de threads local, ce qui libère immédiatement le worker web. L'état et la
+progression sont conservés en base pour être consultés par polling.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import ProcessingJob
+from .processing import run_inference, save_translation_result
+
+
+class JobQueue:
+    """
+    Exécute les ProcessingJob dans un pool de threads du processus
+    """
+
+    def __init__(self, max_workers: int = 2, progress_interval: float = 0.5):
+        """
+        Initialise la file
+
+        Args:
+            max_workers: Nombre de traitements simultanés
+            progress_interval: Intervalle minimal entre deux écritures de progression (s)
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.progress_interval = progress_interval
+        self._executor = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Pool créé au premier job pour ne pas démarrer de threads à l'import"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='signvision-job'
+            )
+        return self._executor
+
+    def enqueue(self, job: ProcessingJob):
+        """Place un job en file d'attente"""
+        return self.executor.submit(self._run, job.pk)
+
+    def _run(self, job_id):
+        """Traite un job dans un thread du pool"""
+        close_old_connections()
+        try:
+            job = ProcessingJob.objects.select_related('uploaded_file').get(pk=job_id)
+            self.run_job(job)
+        finally:
+            close_old_connections()
+
+    def run_job(self, job: ProcessingJob):
+        """Exécute le traitement d'un job et enregistre son résultat"""
+        ProcessingJob.objects.filter(pk=job.pk).update(status=ProcessingJob.RUNNING)
+
+        last_update = [0.0]
+
+        def on_progress(frames_done, frames_total):
+            now = time.monotonic()
+            if now - last_update[0] < self.progress_interval and frames_done < frames_total:
+                return
+            last_update[0] = now
+            ProcessingJob.objects.filter(pk=job.pk).update(
+                frames_done=frames_done, frames_total=frames_total
+            )
+
+        try:
+            result_data = run_inference(job.uploaded_file, progress_callback=on_progress)
+            translation_result = save_translation_result(job.uploaded_file, result_data)
+        except Exception as e:
+            ProcessingJob.objects.filter(pk=job.pk).update(
+                status=ProcessingJob.FAILED, error=str(e)
+            )
+            return
+
+        job.refresh_from_db(fields=['frames_done', 'frames_total'])
+        ProcessingJob.objects.filter(pk=job.pk).update(
+            status=ProcessingJob.DONE,
+            translation_result=translation_result,
+            frames_done=max(job.frames_done, job.frames_total),
+        )
+
+
+# Instance globale de la file de traitement
+job_queue = JobQueue(max_workers=getattr(settings, 'SIGNVISION_JOB_WORKERS', 2))
@@ -0,0 +1,341 @@
+"""
+Benchmarks du pipeline de détection et des requêtes
+Projet créé par Marino ATOHOUN
+
+Chaque couche est chronométrée séparément :
+- post-traitement des résultats YOLOv8 (_process_results) ;
+- traduction (translate_signs_to_text) sur des listes synthétiques ;
+- process_camera et upload_file de bout en bout via le client de test Django ;
+- persistance de N détections (lignes et stockage compact).
+
+Le modèle est remplacé par un détecteur déterministe, les données sont
+générées avec une graine fixe et la base de données est une base de test
+jetable : deux exécutions sur le même commit sont comparables. Le rapport
+est un dictionnaire sérialisable en JSON (voir la commande benchmark).
+"""
+
+import os
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+import cv2
+import django
+import numpy as np
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from translator.ai_model import YOLOv8SignDetector
+
+from ._benchmark_support import FakeResults, stub_pipeline
+
+
+# Tailles par défaut des listes de détections synthétiques
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+
+# --- Données synthétiques ----------------------------------------------------
+
+def make_fake_results(num_detections: int, num_classes: int = 30, seed: int = 0) -> FakeResults:
+    """Résultat YOLOv8 factice contenant num_detections boîtes"""
+    rng = np.random.default_rng(seed)
+    corners = rng.uniform(0, 600, size=(num_detections, 2))
+    sizes = rng.uniform(10, 200, size=(num_detections, 2))
+    return FakeResults(
+        np.hstack([corners, corners + sizes]),
+        rng.uniform(0.2, 1.0, size=num_detections),
+        rng.integers(0, num_classes, size=num_detections),
+    )
+
+
+def make_detections(num_detections: int, classes: List[str], per_frame: int = 3, seed: int = 0) -> List[Dict]:
+    """
+    Liste de détections au format de l'API, triée par frame
+
+    Args:
+        num_detections: Nombre total de détections
+        classes: Classes de signes tirées au hasard
+        per_frame: Nombre moyen de détections par frame
+    """
+    rng = np.random.default_rng(seed)
+    frames = np.sort(rng.integers(0, max(1, num_detections // per_frame), size=num_detections))
+    class_ids = rng.integers(0, len(classes), size=num_detections)
+    confidences = rng.uniform(0.3, 1.0, size=num_detections)
+    boxes = rng.uniform(0, 400, size=(num_detections, 4))
+    return [
+        {
+            'class': classes[class_id],
+            'confidence': float(confidence),
+            'bbox': {'x': float(x), 'y': float(y), 'width': float(w), 'height': float(h)},
+            'frame': int(frame),
+        }
+        for frame, class_id, confidence, (x, y, w, h) in zip(frames, class_ids, confidences, boxes)
+    ]
+
+
+def make_jpeg(index: int = 0, size=(480, 640)) -> bytes:
+    """Image JPEG déterministe ; index modifie son contenu (et son empreinte)"""
+    image = np.zeros(size + (3,), dtype=np.uint8)
+    image[0, 0, 0] = index % 256
+    image[1, 1] = (index // 256 % 256, index // 65536 % 256, 255)
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 100])[1].tobytes()
+
+
+# --- Mesure -----------------------------------------------------------------
+
+def summarize(samples_ms: List[float]) -> Dict:
+    """Statistiques d'une série de mesures en millisecondes"""
+    ordered = sorted(samples_ms)
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0], 4),
+        'p50_ms': round(statistics.median(ordered), 4),
+        'p95_ms': round(ordered[int(0.95 * (len(ordered) - 1))], 4),
+        'mean_ms': round(statistics.fmean(ordered), 4),
+        'max_ms': round(ordered[-1], 4),
+    }
+
+
+def measure(func: Callable[[], object], repeat: int = 5, number: int = 1,
+            setup: Optional[Callable[[], object]] = None) -> Dict:
+    """
+    Chronomètre func ; chaque mesure est la moyenne de `number` appels
+
+    Une exécution de chauffe non chronométrée précède les mesures.
+    """
+    if setup:
+        setup()
+    func()
+
+    samples = []
+    for _ in range(max(1, repeat)):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+    return summarize(samples)
+
+
+def _entry(benchmark: str, size: Optional[int], stats: Dict, **extra) -> Dict:
+    return dict({'benchmark': benchmark, 'size': size}, **extra, **stats)
+
+
+def entry_key(entry: Dict) -> str:
+    """Identifiant stable d'une mesure, pour comparer deux rapports"""
+    variant = f"[{entry['variant']}]" if entry.get('variant') else ''
+    size = f"@{entry['size']}" if entry.get('size') is not None else ''
+    return f"{entry['benchmark']}{variant}{size}"
+
+
+# --- Benchmarks -------------------------------------------------------------
+
+def bench_process_results(detector: YOLOv8SignDetector, sizes: Iterable[int], repeat: int = 5) -> List[Dict]:
+    """Post-traitement d'un résultat YOLOv8 de taille croissante"""
+    entries = []
+    for size in sizes:
+        results = make_fake_results(size, num_classes=len(detector.sign_classes))
+        stats = measure(lambda: detector._process_results(results), repeat=repeat)
+        entries.append(_entry('process_results', size, stats))
+    return entries
+
+
+def bench_translate(detector: YOLOv8SignDetector, sizes: Iterable[int], repeat: int = 5) -> List[Dict]:
+    """Traduction de listes de détections de taille croissante"""
+    entries = []
+    for size in sizes:
+        detections = make_detections(size, detector.sign_classes)
+        stats = measure(lambda: detector.translate_signs_to_text(detections), repeat=repeat)
+        entries.append(_entry('translate_signs_to_text', size, stats))
+    return entries
+
+
+def check_response(response):
+    """
+    Vérifie qu'une requête mesurée a réellement passé l'image au modèle
+
+    Les vues répondent success=True même quand le traitement a échoué
+    (process_file_with_ai intercepte les erreurs) : un résultat sans
+    détection ou portant une erreur ne chronométrerait que le chemin
+    d'erreur. Le détecteur factice renvoie toujours une détection par image.
+    """
+    payload = response.json()
+    data = payload.get('data') or {}
+    if not payload.get('success') or 'error' in payload or 'error' in data or not data.get('detections'):
+        raise AssertionError(f"Requête en échec pendant le benchmark: {response.content[:500]!r}")
+
+
+def bench_process_camera(repeat: int = 5, number: int = 10) -> List[Dict]:
+    """Requête process_camera complète (sans session puis avec session)"""
+    client = Client()
+    url = reverse('process_camera')
+    frame = make_jpeg()
+    entries = []
+
+    for variant, data in (('stateless', {}), ('session', {'camera_session': 'benchmark'})):
+        def request():
+            response = client.post(url, dict(data, camera_frame=SimpleUploadedFile('frame.jpg', frame, 'image/jpeg')))
+            check_response(response)
+        entries.append(_entry('process_camera', None, measure(request, repeat=repeat, number=number), variant=variant))
+    return entries
+
+
+def bench_upload_file(repeat: int = 5, number: int = 10) -> List[Dict]:
+    """Upload synchrone d'une image, puis upload d'un contenu déjà traité (cache)"""
+    client = Client()
+    url = reverse('upload_file')
+    counter = iter(range(1, 1 << 24))
+
+    def upload(content):
+        response = client.post(url, {'media_file': SimpleUploadedFile('image.jpg', content, 'image/jpeg')})
+        check_response(response)
+
+    entries = []
+    with override_settings(SIGNVISION_ASYNC_UPLOADS=False):
+        # Contenu différent à chaque appel : le cache de résultats ne sert jamais
+        stats = measure(lambda: upload(make_jpeg(next(counter))), repeat=repeat, number=number)
+        entries.append(_entry('upload_file', None, stats, variant='miss'))
+
+        cached = make_jpeg(0)
+        upload(cached)
+        stats = measure(lambda: upload(cached), repeat=repeat, number=number)
+        entries.append(_entry('upload_file', None, stats, variant='cached'))
+    return entries
+
+
+def bench_persistence(detector: YOLOv8SignDetector, sizes: Iterable[int], repeat: int = 5) -> List[Dict]:
+    """Enregistrement d'un résultat de N détections, en lignes et en compact"""
+    from translator.models import UploadedFile
+    from translator.processing import save_translation_result
+
+    entries = []
+    for size in sizes:
+        result_data = {
+            'detections': make_detections(size, detector.sign_classes),
+            'translated_text': 'benchmark',
+            'confidence_score': 90.0,
+            'processing_time': 0.0,
+        }
+        for mode in ('rows', 'packed'):
+            def save():
+                file_instance = UploadedFile(file_type='video', original_name='benchmark.mp4')
+                file_instance.file.name = 'uploads/benchmark.mp4'
+                save_translation_result(file_instance, result_data)
+
+            with override_settings(SIGNVISION_DETECTION_STORAGE=mode):
+                stats = measure(save, repeat=repeat)
+            entries.append(_entry('save_translation_result', size, stats, variant=mode))
+    return entries
+
+
+# --- Environnement ----------------------------------------------------------
+
+@contextmanager
+def isolated_database():
+    """Crée une base de test jetable le temps des benchmarks"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def environment_info() -> Dict:
+    """Version du code et de l'environnement, pour interpréter les mesures"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'django': django.get_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+
+
+def run_benchmarks(sizes: Iterable[int] = DEFAULT_SIZES, repeat: int = 5, requests: int = 10,
+                   persistence_sizes: Optional[Iterable[int]] = None, isolate_db: bool = True) -> Dict:
+    """
+    Exécute toute la suite
+
+    Args:
+        sizes: Tailles des listes de détections (post-traitement, traduction)
+        repeat: Nombre de mesures par benchmark
+        requests: Requêtes par mesure pour les benchmarks de bout en bout
+        persistence_sizes: Tailles pour la persistance (par défaut `sizes`)
+        isolate_db: Crée une base de test jetable (False si l'appelant en
+            fournit déjà une, par exemple depuis un TestCase)
+
+    Returns:
+        dict: {'environment': ..., 'parameters': ..., 'results': [...]}
+    """
+    sizes = list(sizes)
+    persistence_sizes = sizes if persistence_sizes is None else list(persistence_sizes)
+    database = isolated_database() if isolate_db else nullcontext()
+
+    with database, stub_pipeline() as detector:
+        results = []
+        results += bench_process_results(detector, sizes, repeat)
+        results += bench_translate(detector, sizes, repeat)
+        results += bench_process_camera(repeat, requests)
+        results += bench_upload_file(repeat, requests)
+        results += bench_persistence(detector, persistence_sizes, repeat)
+
+    return {
+        'environment': environment_info(),
+        'parameters': {
+            'sizes': sizes,
+            'persistence_sizes': persistence_sizes,
+            'repeat': repeat,
+            'requests': requests,
+        },
+        'results': results,
+    }
+
+
+def compare_reports(baseline: Dict, current: Dict, threshold: float = 1.2) -> List[Dict]:
+    """
+    Compare les médianes de deux rapports
+
+    Returns:
+        Une ligne par mesure commune : clé, p50 de référence et actuel,
+        rapport et drapeau `regression` (rapport supérieur au seuil)
+    """
+    reference = {entry_key(entry): entry for entry in baseline.get('results', [])}
+    rows = []
+    for entry in current.get('results', []):
+        key = entry_key(entry)
+        if key not in reference:
+            continue
+        before, after = reference[key]['p50_ms'], entry['p50_ms']
+        ratio = after / before if before else float('inf')
+        rows.append({
+            'key': key,
+            'baseline_p50_ms': before,
+            'p50_ms': after,
+            'ratio': round(ratio, 3),
+            'regression': ratio > threshold,
+        })
+    return rows
@@ -0,0 +1,85 @@
+"""
+Modèle factice et pipeline isolé de la commande benchmark
+Projet créé par Marino ATOHOUN
+
+La commande benchmark et les tests remplacent le modèle YOLOv8 par un
+détecteur déterministe. Le module n'est pas importé par l'application (le
+préfixe _ l'exclut des commandes de manage.py).
+"""
+
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Optional
+from unittest import mock
+
+import numpy as np
+from django.test import override_settings
+
+from translator.ai_model import YOLOv8SignDetector, load_image
+
+
+class FakeBoxes:
+    """Imite ultralytics.engine.results.Boxes avec des tableaux NumPy"""
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32)
+        self.cls = np.asarray(cls, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class FakeResults:
+    """Imite ultralytics.engine.results.Results"""
+
+    def __init__(self, xyxy, conf, cls):
+        self.boxes = FakeBoxes(xyxy, conf, cls)
+
+
+class StubSignDetector(YOLOv8SignDetector):
+    """Détecteur déterministe : une détection par image, classe selon le pixel (0, 0)"""
+
+    def get_model(self):
+        return self
+
+    def detect_signs_batch(self, images, imgsz=None):
+        detections = []
+        for image in images:
+            image = load_image(image)
+            height, width = image.shape[:2]
+            detections.append([{
+                'class': self.sign_classes[int(image[0, 0, 0]) % len(self.sign_classes)],
+                'confidence': 0.9,
+                'bbox': {'x': 0.0, 'y': 0.0, 'width': float(width), 'height': float(height)},
+                'frame': 0
+            }])
+        return detections
+
+
+@contextmanager
+def stub_pipeline(detector: Optional[YOLOv8SignDetector] = None):
+    """
+    Remplace le modèle par un détecteur déterministe
+
+    Les fichiers uploadés sont écrits dans un dossier temporaire et le cache
+    de résultats est vidé à l'entrée comme à la sortie.
+    """
+    from translator import batch, processing, views
+    from translator.batching import scheduler
+    from translator.cache import result_cache
+
+    detector = detector or StubSignDetector('/benchmark/best.pt')
+    media_root = tempfile.mkdtemp(prefix='signvision-bench-')
+    result_cache.clear()
+    try:
+        with mock.patch.object(processing, 'detector', detector), \
+                mock.patch.object(batch, 'detector', detector), \
+                mock.patch.object(views, 'detector', detector), \
+                mock.patch.object(scheduler, 'detector', detector), \
+                override_settings(MEDIA_ROOT=media_root):
+            yield detector
+    finally:
+        result_cache.clear()
+        shutil.rmtree(media_root, ignore_errors=True)
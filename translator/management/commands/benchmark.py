@@ -0,0 +1,72 @@
+"""
+Commande de benchmark du pipeline de détection et des requêtes
+Projet créé par Marino ATOHOUN
+
+Écrit un rapport JSON (voir _benchmark_suite) et, si un rapport de
+référence est fourni, compare les médianes pour repérer les régressions.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ._benchmark_suite import DEFAULT_SIZES, compare_reports, run_benchmarks
+
+
+def _sizes(value):
+    return [int(size) for size in value.split(',') if size.strip()]
+
+
+class Command(BaseCommand):
+    help = "Chronomètre post-traitement, traduction, requêtes et persistance (rapport JSON)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=_sizes, default=list(DEFAULT_SIZES),
+            help='Tailles des listes de détections, séparées par des virgules'
+        )
+        parser.add_argument(
+            '--persistence-sizes', type=_sizes, default=None,
+            help='Tailles pour la persistance (par défaut --sizes)'
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Mesures par benchmark')
+        parser.add_argument('--requests', type=int, default=10, help='Requêtes par mesure (bout en bout)')
+        parser.add_argument('--output', default=None, help='Fichier JSON de résultats (sortie standard sinon)')
+        parser.add_argument('--compare', default=None, help='Rapport JSON de référence')
+        parser.add_argument(
+            '--threshold', type=float, default=1.2,
+            help='Rapport de médianes au-delà duquel une mesure est une régression'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        report = run_benchmarks(
+            sizes=options['sizes'],
+            repeat=options['repeat'],
+            requests=options['requests'],
+            persistence_sizes=options['persistence_sizes'],
+        )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stderr.write(f"Rapport écrit dans {options['output']}")
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        if baseline is None:
+            return
+
+        rows = compare_reports(baseline, report, options['threshold'])
+        for row in rows:
+            self.stderr.write(
+                f"{row['key']:<45} {row['baseline_p50_ms']:>10.3f} -> {row['p50_ms']:>10.3f} ms  "
+                f"x{row['ratio']:<6} {'RÉGRESSION' if row['regression'] else ''}"
+            )
+        regressions = [row['key'] for row in rows if row['regression']]
+        if regressions:
+            raise CommandError(f"{len(regressions)} régression(s) : {', '.join(regressions)}")
@@ -0,0 +1,96 @@
+"""
+Commande de comparaison des backends d'inférence
+Projet créé par Marino ATOHOUN
+
+Mesure la latence de chaque backend disponible et vérifie que ses détections
+restent dans la tolérance annoncée par rapport à la référence PyTorch.
+"""
+
+import glob
+import json
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from translator.ai_model import DEFAULT_MODEL_PATH, YOLOv8SignDetector, load_image
+from translator.backends import BACKENDS, compare_detections
+
+
+class Command(BaseCommand):
+    help = "Compare latence et détections des backends torch / onnx / openvino (FP32 et INT8)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('images', help="Dossier d'images de test (jpg/png)")
+        parser.add_argument('--runs', type=int, default=5, help='Passes chronométrées par image')
+        parser.add_argument('--batch-size', type=int, default=1, help='Images par passe du modèle')
+        parser.add_argument(
+            '--model',
+            default=os.fspath(getattr(settings, 'SIGNVISION_MODEL_PATH', DEFAULT_MODEL_PATH)),
+            help='Chemin des poids PyTorch',
+        )
+        parser.add_argument('--output', default=None, help='Fichier JSON de résultats')
+
+    def handle(self, *args, **options):
+        paths = sorted(
+            path for pattern in ('*.jpg', '*.jpeg', '*.png')
+            for path in glob.glob(os.path.join(options['images'], pattern))
+        )
+        if not paths:
+            raise CommandError(f"Aucune image dans {options['images']}")
+        images = [load_image(path) for path in paths]
+        batches = [images[i:i + options['batch_size']] for i in range(0, len(images), options['batch_size'])]
+
+        reference = None
+        report = []
+        for name, backend_class in BACKENDS.items():
+            for int8 in ((False, True) if backend_class.supports_int8 else (False,)):
+                detector = YOLOv8SignDetector(options['model'], backend=name, int8=int8)
+                if not detector.backend.is_available():
+                    continue
+                try:
+                    detector.get_model()
+                except Exception as e:
+                    self.stderr.write(f"{detector.backend.label}: indisponible ({e})")
+                    continue
+
+                # Passe de chauffe, non chronométrée
+                detections = [d for batch in batches for d in detector.detect_signs_batch(batch)]
+
+                latencies = []
+                for _ in range(options['runs']):
+                    for batch in batches:
+                        start = time.perf_counter()
+                        detector.detect_signs_batch(batch)
+                        latencies.append((time.perf_counter() - start) * 1000 / len(batch))
+
+                entry = {
+                    'backend': detector.backend.label,
+                    'latency_ms_p50': round(statistics.median(latencies), 3),
+                    'latency_ms_p95': round(sorted(latencies)[int(0.95 * (len(latencies) - 1))], 3),
+                    'latency_ms_mean': round(statistics.fmean(latencies), 3),
+                    'tolerance': detector.backend.tolerance,
+                }
+                if reference is None:
+                    reference = detections
+                else:
+                    comparisons = [
+                        compare_detections(expected, actual, detector.backend.tolerance)
+                        for expected, actual in zip(reference, detections)
+                    ]
+                    entry['within_tolerance'] = all(c['within_tolerance'] for c in comparisons)
+                    entry['worst_iou'] = min(c['worst_iou'] for c in comparisons)
+                    entry['worst_confidence_delta'] = max(c['worst_confidence_delta'] for c in comparisons)
+                report.append(entry)
+
+                self.stdout.write(
+                    f"{entry['backend']:<14} p50 {entry['latency_ms_p50']:>8.2f} ms  "
+                    f"p95 {entry['latency_ms_p95']:>8.2f} ms  "
+                    f"tolérance {'-' if 'within_tolerance' not in entry else ('OK' if entry['within_tolerance'] else 'HORS')}"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'images': len(images), 'results': report}, output, indent=2)
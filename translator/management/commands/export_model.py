@@ -0,0 +1,50 @@
+"""
+Commande d'export du modèle vers les backends CPU
+Projet créé par Marino ATOHOUN
+"""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from translator.ai_model import DEFAULT_MODEL_PATH
+from translator.backends import BACKENDS, get_backend
+
+
+class Command(BaseCommand):
+    help = "Exporte best.pt vers ONNX et/ou OpenVINO, éventuellement en INT8"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=['onnx', 'openvino', 'all'], default='all',
+            help='Format à produire',
+        )
+        parser.add_argument('--int8', action='store_true', help='Produit aussi la variante INT8')
+        parser.add_argument('--imgsz', type=int, default=640, help="Taille d'entrée du modèle")
+        parser.add_argument(
+            '--data', default=None,
+            help='YAML de calibration ultralytics pour la quantification INT8 OpenVINO',
+        )
+        parser.add_argument(
+            '--model',
+            default=os.fspath(getattr(settings, 'SIGNVISION_MODEL_PATH', DEFAULT_MODEL_PATH)),
+            help='Chemin des poids PyTorch',
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['model']):
+            raise CommandError(f"Poids introuvables: {options['model']}")
+
+        names = [name for name in BACKENDS if name != 'torch'] if options['format'] == 'all' else [options['format']]
+        variants = [False, True] if options['int8'] else [False]
+
+        for name in names:
+            for int8 in variants:
+                backend = get_backend(name, options['model'], int8=int8)
+                self.stdout.write(f"Export {backend.label}...")
+                try:
+                    path = backend.export(imgsz=options['imgsz'], data=options['data'])
+                except ImportError as e:
+                    raise CommandError(f"Dépendance manquante pour {backend.label}: {e}")
+                self.stdout.write(self.style.SUCCESS(f"  -> {path}"))
@@ -0,0 +1,85 @@
+"""
+Commande de retraitement des fichiers uploadés
+Projet créé par Marino ATOHOUN
+
+Réanalyse les fichiers dont aucun résultat n'a été calculé par la version
+actuelle du modèle (par exemple après le remplacement de best.pt). Les
+images sont lues depuis leur dérivé à la taille du modèle ; --backfill
+génère d'abord les dérivés manquants des images plus anciennes.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from translator.ai_model import detector
+from translator.derivatives import attach_derivatives
+from translator.models import UploadedFile
+from translator.processing import run_inference, save_translation_result
+
+
+class Command(BaseCommand):
+    help = "Retraite les fichiers analysés par une autre version du modèle"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Retraite tous les fichiers, à jour ou non')
+        parser.add_argument('--images-only', action='store_true', help='Ignore les vidéos')
+        parser.add_argument('--limit', type=int, default=None, help='Nombre maximal de fichiers')
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help="Retraitements simultanés (les images sont regroupées en lots par le micro-batching)"
+        )
+        parser.add_argument('--backfill', action='store_true', help='Génère les dérivés manquants des images')
+
+    def handle(self, *args, **options):
+        queryset = UploadedFile.objects.exclude(file='').order_by('uploaded_at')
+        if not options['all']:
+            queryset = queryset.exclude(translations__model_version=detector.model_version)
+        if options['images_only']:
+            queryset = queryset.filter(file_type='image')
+        if options['limit']:
+            queryset = queryset[:options['limit']]
+        files = list(queryset)
+
+        if options['backfill']:
+            created = 0
+            for file_instance in files:
+                if file_instance.file_type == 'image' and not file_instance.derivative:
+                    attach_derivatives(file_instance, file_instance.file.path)
+                    if file_instance.derivative:
+                        file_instance.save(update_fields=['derivative', 'derivative_scale', 'thumbnail'])
+                        created += 1
+            self.stderr.write(f"{created} dérivé(s) généré(s)")
+
+        started_at = time.time()
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                outcomes = list(executor.map(self._reprocess_in_thread, files))
+        else:
+            outcomes = [self._reprocess(file_instance) for file_instance in files]
+
+        failures = [name for name, error in outcomes if error]
+        for name, error in outcomes:
+            if error:
+                self.stderr.write(f"Échec pour {name}: {error}")
+        self.stdout.write(
+            f"{len(files) - len(failures)}/{len(files)} fichier(s) retraité(s) "
+            f"en {time.time() - started_at:.2f}s (modèle {detector.model_version})"
+        )
+
+    @staticmethod
+    def _reprocess(file_instance):
+        try:
+            result_data = run_inference(file_instance, use_derivative=True)
+            save_translation_result(file_instance, result_data)
+            return file_instance.original_name, None
+        except Exception as e:
+            return file_instance.original_name, str(e)
+
+    def _reprocess_in_thread(self, file_instance):
+        try:
+            return self._reprocess(file_instance)
+        finally:
+            close_old_connections()
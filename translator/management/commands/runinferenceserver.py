@@ -0,0 +1,59 @@
+"""
+Commande de lancement du serveur d'inférence
+Projet créé par Marino ATOHOUN
+"""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from translator.inference_server import InferenceServer
+
+
+class Command(BaseCommand):
+    help = "Lance le serveur d'inférence partagé par les workers Django (socket Unix)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            default=getattr(settings, 'SIGNVISION_INFERENCE_SOCKET', None) or '/tmp/signvision-inference.sock',
+            help='Chemin du socket Unix',
+        )
+        parser.add_argument(
+            '--replicas', type=int,
+            default=getattr(settings, 'SIGNVISION_INFERENCE_REPLICAS', 1),
+            help='Nombre de processus possédant une copie du modèle',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=0,
+            help='Threads torch par réplique (par défaut : coeurs / répliques)',
+        )
+        parser.add_argument(
+            '--model',
+            default=os.fspath(getattr(settings, 'SIGNVISION_MODEL_PATH', '')) or None,
+            help='Chemin des poids du modèle',
+        )
+
+    def handle(self, *args, **options):
+        replicas = max(1, options['replicas'])
+        threads = options['threads'] or max(1, (os.cpu_count() or 1) // replicas)
+
+        server = InferenceServer(
+            options['socket'],
+            replicas=replicas,
+            threads_per_replica=threads,
+            model_path=options['model'],
+            backend=getattr(settings, 'SIGNVISION_INFERENCE_BACKEND', 'torch'),
+            int8=getattr(settings, 'SIGNVISION_INFERENCE_INT8', False),
+        )
+        self.stdout.write(
+            f"Serveur d'inférence sur {options['socket']} "
+            f"({replicas} réplique(s), {threads} thread(s) chacune)"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,286 @@
+"""
+Métriques de performance au format Prometheus
+Projet créé par Marino ATOHOUN
+
+Les étapes du chemin critique (décodage, attente en file, inférence,
+post-traitement, traduction, écriture en base) et les vues instrumentées
+enregistrent leurs durées dans des histogrammes. Les percentiles p50/p95/p99
+sont calculés sur une fenêtre glissante des dernières mesures.
+
+Quand SIGNVISION_METRICS_ENABLED est faux, les chronomètres sont des
+contextes vides partagés et aucune mesure n'est enregistrée.
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+
+# Bornes (s) des histogrammes, du décodage d'une frame à une vidéo entière
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """
+    Histogramme cumulatif avec une fenêtre des dernières mesures
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window: int = 1024):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * len(self.buckets)
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self._recent.append(value)
+            index = bisect_left(self.buckets, value)
+            if index < len(self._counts):
+                self._counts[index] += 1
+
+    def quantiles(self, quantiles=QUANTILES) -> Dict[float, float]:
+        """Percentiles (rang le plus proche) sur la fenêtre glissante"""
+        with self._lock:
+            recent = sorted(self._recent)
+        if not recent:
+            return {q: 0.0 for q in quantiles}
+        return {q: recent[min(len(recent) - 1, int(q * len(recent)))] for q in quantiles}
+
+    def cumulative_counts(self) -> List[Tuple[float, int]]:
+        with self._lock:
+            counts = list(self._counts)
+        total = 0
+        cumulative = []
+        for bound, count in zip(self.buckets, counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+
+class _Timer:
+    """Chronomètre une étape et enregistre sa durée à la sortie"""
+
+    __slots__ = ('registry', 'stage', 'started_at')
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.stage, time.perf_counter() - self.started_at)
+        return False
+
+
+class _NullTimer:
+    """Chronomètre inactif (métriques désactivées)"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Durées par étape et par vue, compteurs de requêtes et jauges
+    """
+
+    def __init__(self, enabled: bool = True, prefix: str = 'signvision'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._stages = {}
+        self._views = {}
+        self._pipeline_runs = {}
+        self._requests = {}
+        self._errors = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    # --- Enregistrement ---
+
+    def timer(self, stage: str):
+        """Contexte chronométrant une étape du pipeline"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def observe(self, stage: str, seconds: float):
+        """Enregistre la durée d'une étape"""
+        if self.enabled:
+            self._histogram(self._stages, stage).observe(seconds)
+
+    def observe_pipeline_run(self, stage: str, seconds: float):
+        """Enregistre le temps de travail d'une étape sur un passage du pipeline vidéo"""
+        if self.enabled:
+            self._histogram(self._pipeline_runs, stage).observe(seconds)
+
+    def observe_request(self, view: str, seconds: float, error: bool = False):
+        """Enregistre une requête traitée par une vue"""
+        if not self.enabled:
+            return
+        self._histogram(self._views, view).observe(seconds)
+        with self._lock:
+            self._requests[view] = self._requests.get(view, 0) + 1
+            if error:
+                self._errors[view] = self._errors.get(view, 0) + 1
+
+    def register_gauge(self, name: str, help_text: str, func: Callable[[], float]):
+        """Jauge évaluée au moment de l'export (profondeur de file, sessions...)"""
+        self._gauges[name] = (help_text, func)
+
+    def track_view(self, name: str):
+        """
+        Décorateur de vue : durée, nombre de requêtes et d'erreurs
+
+        Une réponse est une erreur si son statut est >= 400 ou si c'est une
+        réponse JSON {"success": false, ...} (les vues de l'API interceptent
+        leurs exceptions et répondent avec le statut 200).
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(request, *args, **kwargs):
+                if not self.enabled:
+                    return view(request, *args, **kwargs)
+                started_at = time.perf_counter()
+                try:
+                    response = view(request, *args, **kwargs)
+                except Exception:
+                    self.observe_request(name, time.perf_counter() - started_at, error=True)
+                    raise
+                self.observe_request(name, time.perf_counter() - started_at, error=_is_error(response))
+                return response
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._views.clear()
+            self._pipeline_runs.clear()
+            self._requests.clear()
+            self._errors.clear()
+
+    def _histogram(self, family: Dict, key: str) -> Histogram:
+        histogram = family.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = family.setdefault(key, Histogram())
+        return histogram
+
+    # --- Lecture ---
+
+    def stage_quantiles(self, stage: str) -> Optional[Dict[float, float]]:
+        histogram = self._stages.get(stage)
+        return histogram.quantiles() if histogram is not None else None
+
+    def render(self) -> str:
+        """Export au format texte de Prometheus (version 0.0.4)"""
+        lines = []
+        self._render_histograms(
+            lines, f'{self.prefix}_stage_duration_seconds', 'stage',
+            "Durée des étapes du pipeline d'inférence", self._stages
+        )
+        self._render_histograms(
+            lines, f'{self.prefix}_request_duration_seconds', 'view',
+            'Durée des requêtes par vue', self._views
+        )
+        self._render_histograms(
+            lines, f'{self.prefix}_pipeline_stage_busy_seconds', 'stage',
+            'Temps de travail par étape sur un passage du pipeline vidéo', self._pipeline_runs
+        )
+        self._render_counter(lines, f'{self.prefix}_requests_total', 'Requêtes traitées par vue', self._requests)
+        self._render_counter(lines, f'{self.prefix}_request_errors_total', 'Requêtes en erreur par vue', self._errors)
+
+        for name, (help_text, func) in sorted(self._gauges.items()):
+            try:
+                value = func()
+            except Exception:
+                continue
+            lines.append(f'# HELP {self.prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {self.prefix}_{name} gauge')
+            lines.append(f'{self.prefix}_{name} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _render_histograms(self, lines: List[str], name: str, label: str, help_text: str, family: Dict):
+        histograms = sorted(family.items())
+        if not histograms:
+            return
+
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, histogram in histograms:
+            for bound, count in histogram.cumulative_counts():
+                lines.append(f'{name}_bucket{_format_labels({label: key, "le": _format_value(bound)})} {count}')
+            lines.append(f'{name}_bucket{_format_labels({label: key, "le": "+Inf"})} {histogram.count}')
+            lines.append(f'{name}_sum{_format_labels({label: key})} {_format_value(histogram.sum)}')
+            lines.append(f'{name}_count{_format_labels({label: key})} {histogram.count}')
+
+        # Percentiles sur la fenêtre glissante, exportés comme un résumé
+        summary = f'{name[:-len("_seconds")]}_quantile_seconds'
+        lines.append(f'# HELP {summary} {help_text} (percentiles des dernières mesures)')
+        lines.append(f'# TYPE {summary} summary')
+        for key, histogram in histograms:
+            for quantile, value in histogram.quantiles().items():
+                lines.append(f'{summary}{_format_labels({label: key, "quantile": quantile})} {_format_value(value)}')
+            lines.append(f'{summary}_sum{_format_labels({label: key})} {_format_value(histogram.sum)}')
+            lines.append(f'{summary}_count{_format_labels({label: key})} {histogram.count}')
+
+    @staticmethod
+    def _render_counter(lines: List[str], name: str, help_text: str, values: Dict):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for key, value in sorted(values.items()):
+            lines.append(f'{name}{_format_labels({"view": key})} {value}')
+
+
+def _is_error(response) -> bool:
+    if response.status_code >= 400:
+        return True
+    # JsonResponse sérialise {'success': ...} en premier : pas besoin de décoder
+    return (
+        response.get('Content-Type', '').startswith('application/json')
+        and not getattr(response, 'streaming', False)
+        and response.content[:20].startswith(b'{"success": false')
+    )
+
+
+# Registre global des métriques
+metrics = MetricsRegistry(enabled=getattr(settings, 'SIGNVISION_METRICS_ENABLED', True))
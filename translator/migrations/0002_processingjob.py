@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translator', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminé'), ('failed', 'Échec')], default='pending', max_length=10)),
+                ('frames_done', models.IntegerField(default=0)),
+                ('frames_total', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('translation_result', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='translator.translationresult')),
+                ('uploaded_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='translator.uploadedfile')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translator', '0002_processingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationresult',
+            name='model_version',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translator', '0003_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackedDetections',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('class_names', models.JSONField(default=list)),
+                ('frames', models.BinaryField()),
+                ('class_ids', models.BinaryField()),
+                ('confidences', models.BinaryField()),
+                ('boxes', models.BinaryField()),
+                ('translation_result', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='packed_detections', to='translator.translationresult')),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translator', '0004_packeddetections'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('original_name', models.CharField(max_length=255)),
+                ('file_type', models.CharField(choices=[('image', 'Image'), ('video', 'Vidéo')], max_length=10)),
+                ('size', models.BigIntegerField()),
+                ('offset', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('open', 'En cours'), ('committed', 'Terminé')], default='open', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('uploaded_file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to='translator.uploadedfile')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translator', '0005_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='derivative',
+            field=models.FileField(blank=True, upload_to='derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='derivative_scale',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='thumbnail',
+            field=models.FileField(blank=True, upload_to='thumbnails/'),
+        ),
+    ]
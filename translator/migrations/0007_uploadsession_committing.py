@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translator', '0006_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('open', 'En cours'), ('committing', 'Validation en cours'), ('committed', 'Terminé')], default='open', max_length=10),
+        ),
+    ]
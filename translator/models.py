@@ -6,6 +6,9 @@ Projet créé par Marino ATOHOUN
 from django.db import models
 from django.utils import timezone
 import os
+import uuid
+
+import numpy as np
 
 
 def upload_to(instance, filename):
@@ -26,6 +29,10 @@ class UploadedFile(models.Model):
     file = models.FileField(upload_to=upload_to)
     file_type = models.CharField(max_length=10, choices=FILE_TYPES)
     original_name = models.CharField(max_length=255)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # Empreinte SHA-256 du contenu
+    derivative = models.FileField(upload_to='derivatives/', blank=True)  # Image à la taille d'entrée du modèle
+    derivative_scale = models.FloatField(default=1.0)  # Rapport de taille original / dérivé
+    thumbnail = models.FileField(upload_to='thumbnails/', blank=True)  # Vignette de l'historique
     uploaded_at = models.DateTimeField(auto_now_add=True)
     processed = models.BooleanField(default=False)
     
@@ -40,10 +47,11 @@ class TranslationResult(models.Model):
     """Modèle pour stocker les résultats de traduction"""
     
     uploaded_file = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name='translations')
-    detected_signs = models.JSONField(default=list)  # Liste des signes détectés
+    detected_signs = models.JSONField(default=list)  # Liste des signes détectés (vide si stockés sous forme compacte)
     translated_text = models.TextField(blank=True)
     confidence_score = models.FloatField(default=0.0)
     processing_time = models.FloatField(default=0.0)  # Temps de traitement en secondes
+    model_version = models.CharField(max_length=64, blank=True, db_index=True)  # Vide si le traitement a échoué
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -51,6 +59,13 @@ class TranslationResult(models.Model):
     
     def __str__(self):
         return f"Traduction pour {self.uploaded_file.original_name}"
+    
+    def stored_detections(self):
+        """Retourne les détections enregistrées, en lignes ou au format compact"""
+        try:
+            return self.packed_detections.unpack()
+        except PackedDetections.DoesNotExist:
+            return [detection.as_dict() for detection in self.detections.all()]
 
 
 class SignDetection(models.Model):
@@ -70,3 +85,175 @@ class SignDetection(models.Model):
     
     def __str__(self):
         return f"{self.sign_class} ({self.confidence:.2f})"
+    
+    def as_dict(self):
+        """Retourne la détection au format du détecteur"""
+        return {
+            'class': self.sign_class,
+            'confidence': self.confidence,
+            'bbox': {
+                'x': self.bbox_x,
+                'y': self.bbox_y,
+                'width': self.bbox_width,
+                'height': self.bbox_height
+            },
+            'frame': self.frame_number
+        }
+
+
+class PackedDetections(models.Model):
+    """
+    Modèle pour stocker toutes les détections d'un résultat sous forme compacte
+    
+    Chaque colonne est un tableau NumPy sérialisé (little-endian), ce qui
+    remplace des milliers de lignes SignDetection pour les vidéos longues.
+    """
+    
+    translation_result = models.OneToOneField(
+        TranslationResult, on_delete=models.CASCADE, related_name='packed_detections'
+    )
+    count = models.IntegerField(default=0)  # Nombre de détections
+    class_names = models.JSONField(default=list)  # Vocabulaire des classes référencé par class_ids
+    frames = models.BinaryField()  # int32
+    class_ids = models.BinaryField()  # uint16, indices dans class_names
+    confidences = models.BinaryField()  # float32
+    boxes = models.BinaryField()  # float32, (count, 4) : x, y, width, height
+    
+    def __str__(self):
+        return f"{self.count} détections compactes"
+    
+    @classmethod
+    def pack(cls, translation_result, detections):
+        """
+        Construit (sans l'enregistrer) la forme compacte d'une liste de détections
+        
+        Args:
+            translation_result: Résultat auquel rattacher les détections
+            detections: Liste des détections au format du détecteur
+        """
+        class_names = []
+        class_index = {}
+        class_ids = np.empty(len(detections), dtype='<u2')
+        frames = np.empty(len(detections), dtype='<i4')
+        confidences = np.empty(len(detections), dtype='<f4')
+        boxes = np.empty((len(detections), 4), dtype='<f4')
+        
+        for i, detection in enumerate(detections):
+            name = detection['class']
+            if name not in class_index:
+                class_index[name] = len(class_names)
+                class_names.append(name)
+            class_ids[i] = class_index[name]
+            frames[i] = detection.get('frame', 0)
+            confidences[i] = detection['confidence']
+            bbox = detection['bbox']
+            boxes[i] = (bbox['x'], bbox['y'], bbox['width'], bbox['height'])
+        
+        return cls(
+            translation_result=translation_result,
+            count=len(detections),
+            class_names=class_names,
+            frames=frames.tobytes(),
+            class_ids=class_ids.tobytes(),
+            confidences=confidences.tobytes(),
+            boxes=boxes.tobytes()
+        )
+    
+    def unpack(self):
+        """Retourne les détections au format du détecteur"""
+        frames = np.frombuffer(bytes(self.frames), dtype='<i4')
+        class_ids = np.frombuffer(bytes(self.class_ids), dtype='<u2')
+        confidences = np.frombuffer(bytes(self.confidences), dtype='<f4')
+        boxes = np.frombuffer(bytes(self.boxes), dtype='<f4').reshape(-1, 4)
+        
+        return [
+            {
+                'class': self.class_names[class_id],
+                'confidence': confidence,
+                'bbox': {'x': x, 'y': y, 'width': width, 'height': height},
+                'frame': frame
+            }
+            for frame, class_id, confidence, (x, y, width, height) in zip(
+                frames.tolist(), class_ids.tolist(), confidences.tolist(), boxes.tolist()
+            )
+        ]
+
+
+class ProcessingJob(models.Model):
+    """Modèle pour suivre le traitement asynchrone d'un fichier uploadé"""
+    
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    
+    STATUSES = [
+        (PENDING, 'En attente'),
+        (RUNNING, 'En cours'),
+        (DONE, 'Terminé'),
+        (FAILED, 'Échec'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploaded_file = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    frames_done = models.IntegerField(default=0)  # Frames déjà analysées
+    frames_total = models.IntegerField(default=0)  # Frames à analyser (1 pour une image)
+    translation_result = models.ForeignKey(
+        TranslationResult, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs'
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Job {self.id} ({self.status})"
+    
+    @property
+    def progress(self):
+        """Progression entre 0 et 1"""
+        if self.status == self.DONE:
+            return 1.0
+        if not self.frames_total:
+            return 0.0
+        return min(1.0, self.frames_done / self.frames_total)
+
+
+class UploadSession(models.Model):
+    """
+    Modèle pour suivre un upload découpé en morceaux (reprise possible)
+    
+    Les morceaux sont écrits directement dans un fichier partiel ; l'offset
+    enregistré est le nombre d'octets reçus et validés.
+    """
+    
+    OPEN = 'open'
+    COMMITTING = 'committing'
+    COMMITTED = 'committed'
+    
+    STATUSES = [
+        (OPEN, 'En cours'),
+        (COMMITTING, 'Validation en cours'),
+        (COMMITTED, 'Terminé'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    original_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=10, choices=UploadedFile.FILE_TYPES)
+    size = models.BigIntegerField()  # Taille annoncée par le client
+    offset = models.BigIntegerField(default=0)  # Octets reçus
+    status = models.CharField(max_length=10, choices=STATUSES, default=OPEN)
+    content_hash = models.CharField(max_length=64, blank=True)  # SHA-256, fixée à la validation
+    uploaded_file = models.ForeignKey(
+        UploadedFile, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_sessions'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Upload {self.original_name} ({self.offset}/{self.size})"
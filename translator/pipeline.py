@@ -0,0 +1,397 @@
+"""
+Exécution en pipeline des étapes d'analyse vidéo
+Projet créé par Marino ATOHOUN
+
+Chaque étape (décodage, prétraitement, inférence, post-traitement et
+traduction) tourne dans son propre thread et communique avec la suivante
+par une file bornée : le décodage de la frame suivante se fait
+pendant que le modèle travaille, et une étape lente ralentit les autres au
+lieu de laisser les files grossir.
+
+Pour chaque étape sont mesurés :
+- le temps de travail ;
+- l'attente en entrée (étape affamée par la précédente) ;
+- l'attente en sortie (contre-pression : la suivante ne suit pas).
+L'étape goulot est celle dont le temps de travail par thread est le plus
+élevé.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import cv2
+
+from .metrics import metrics
+from .translation import StreamingTranslator
+
+
+# Fin du flux dans une file
+_END = object()
+
+# Intervalle de vérification de l'annulation pendant une attente (s)
+_POLL_INTERVAL = 0.1
+
+
+class PipelineCancelled(Exception):
+    """Le pipeline a été arrêté (erreur dans une autre étape)"""
+
+
+class StageStats:
+    """Temps de travail, attentes et volume d'une étape"""
+
+    def __init__(self, name: str, workers: int = 1):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.input_wait = 0.0
+        self.output_wait = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items: int = 0, busy: float = 0.0, input_wait: float = 0.0, output_wait: float = 0.0):
+        with self._lock:
+            self.items += items
+            self.busy += busy
+            self.input_wait += input_wait
+            self.output_wait += output_wait
+
+    def as_dict(self, elapsed: float) -> Dict:
+        capacity = max(elapsed * self.workers, 1e-9)
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'busy_s': round(self.busy, 6),
+            'input_wait_s': round(self.input_wait, 6),
+            'output_wait_s': round(self.output_wait, 6),
+            'utilization': round(min(1.0, self.busy / capacity), 4),
+            'backpressure': round(min(1.0, self.output_wait / capacity), 4),
+            'ms_per_item': round(self.busy / self.items * 1000, 4) if self.items else 0,
+        }
+
+
+class Stage:
+    """
+    Étape du pipeline
+
+    `func` reçoit un élément (ou une liste d'au plus `batch_size` éléments
+    si batch_size > 1) et retourne l'élément suivant, ou None pour ne rien
+    transmettre.
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, batch_size: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+
+
+class Pipeline:
+    """
+    Exécuteur d'étapes reliées par des files bornées
+
+    La source (un itérable, typiquement le décodage des frames) est
+    consommée dans son propre thread ; ses éléments traversent les étapes
+    dans l'ordre. Avec plusieurs threads sur une étape, l'ordre des éléments
+    en sortie de cette étape n'est plus garanti.
+    """
+
+    def __init__(self, source_name: str, stages: List[Stage], queue_size: int = 4):
+        """
+        Args:
+            source_name: Nom de l'étape qui lit la source
+            stages: Étapes, dans l'ordre
+            queue_size: Capacité de chaque file entre deux étapes
+        """
+        self.source_name = source_name
+        self.stages = stages
+        self.queue_size = max(1, int(queue_size))
+        self.stats = {source_name: StageStats(source_name)}
+        self.stats.update((stage.name, StageStats(stage.name, stage.workers)) for stage in stages)
+        self.elapsed = 0.0
+        self._cancelled = threading.Event()
+        self._error = None
+
+    def run(self, source: Iterable) -> Iterator:
+        """
+        Exécute le pipeline et produit les sorties de la dernière étape
+
+        Raises:
+            Exception: La première erreur levée par une étape
+        """
+        started_at = time.perf_counter()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(
+            target=self._guard, args=(self._read_source, source, queues[0]),
+            name=f'signvision-pipeline-{self.source_name}', daemon=True
+        )]
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._guard,
+                    args=(self._run_stage, stage, queues[index], queues[index + 1], remaining, lock),
+                    name=f'signvision-pipeline-{stage.name}-{worker}', daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+
+        output = queues[-1]
+        try:
+            while True:
+                try:
+                    item = self._get(output)
+                except PipelineCancelled:
+                    break
+                if item is _END:
+                    break
+                yield item
+        finally:
+            # Arrêt anticipé (consommateur interrompu ou erreur) : on libère les threads
+            self._cancelled.set()
+            for thread in threads:
+                thread.join()
+            self.elapsed = time.perf_counter() - started_at
+            # Durée cumulée sur tout le passage : histogramme distinct des
+            # durées par élément de stage_duration_seconds
+            for name, stats in self.stats.items():
+                metrics.observe_pipeline_run(name, stats.busy)
+
+        if self._error is not None:
+            raise self._error
+
+    def get_stats(self) -> Dict:
+        """Statistiques par étape et étape goulot"""
+        stages = {name: stats.as_dict(self.elapsed) for name, stats in self.stats.items()}
+        bottleneck = max(self.stats.values(), key=lambda stats: stats.busy / stats.workers).name
+        return {
+            'elapsed_s': round(self.elapsed, 6),
+            'queue_size': self.queue_size,
+            'bottleneck': bottleneck,
+            'stages': stages,
+        }
+
+    # --- Threads ---
+
+    def _guard(self, target, *args):
+        try:
+            target(*args)
+        except PipelineCancelled:
+            pass
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+            self._cancelled.set()
+
+    def _read_source(self, source: Iterable, output: queue.Queue):
+        stats = self.stats[self.source_name]
+        iterator = iter(source)
+        try:
+            while not self._cancelled.is_set():
+                started_at = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stats.add(items=1, busy=time.perf_counter() - started_at)
+                self._put(output, item, stats)
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+        self._put(output, _END, stats)
+
+    def _run_stage(self, stage: Stage, input_queue: queue.Queue, output: queue.Queue,
+                   remaining: List[int], lock: threading.Lock):
+        stats = self.stats[stage.name]
+        finished = False
+        while not finished:
+            waited_at = time.perf_counter()
+            item = self._get(input_queue)
+            if item is _END:
+                break
+            if stage.batch_size > 1:
+                batch = [item]
+                while len(batch) < stage.batch_size:
+                    item = self._get(input_queue)
+                    if item is _END:
+                        finished = True
+                        break
+                    batch.append(item)
+                item = batch
+            started_at = time.perf_counter()
+            stats.add(input_wait=started_at - waited_at)
+
+            result = stage.func(item)
+            stats.add(items=len(item) if stage.batch_size > 1 else 1, busy=time.perf_counter() - started_at)
+            if result is not None:
+                self._put(output, result, stats)
+
+        # La fin de flux est remise dans la file pour les autres threads de
+        # l'étape ; le dernier à terminer la transmet à l'étape suivante
+        self._put(input_queue, _END, None)
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            self._put(output, _END, stats)
+
+    def _get(self, source: queue.Queue):
+        while True:
+            if self._cancelled.is_set() and self._error is not None:
+                raise PipelineCancelled()
+            try:
+                return source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if self._cancelled.is_set():
+                    raise PipelineCancelled()
+
+    def _put(self, target: queue.Queue, item, stats: Optional[StageStats]):
+        started_at = time.perf_counter()
+        while True:
+            if self._cancelled.is_set():
+                raise PipelineCancelled()
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+        if stats is not None:
+            stats.add(output_wait=time.perf_counter() - started_at)
+
+
+# --- Pipeline vidéo --------------------------------------------------------
+
+def resize_for_model(frame, max_size: int):
+    """
+    Réduit une frame pour que son plus grand côté vaille au plus `max_size`
+
+    Returns:
+        (frame réduite, facteur d'échelle vers la frame d'origine)
+    """
+    height, width = frame.shape[:2]
+    longest = max(height, width)
+    if not max_size or longest <= max_size:
+        return frame, 1.0
+    scale = longest / float(max_size)
+    size = (max(1, round(width / scale)), max(1, round(height / scale)))
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA), scale
+
+
+class _VideoStages:
+    """Fonctions des étapes du pipeline vidéo et état partagé"""
+
+    def __init__(self, detector, preprocess_size: int, translator: Optional[StreamingTranslator]):
+        self.detector = detector
+        self.preprocess_size = preprocess_size
+        self.translator = translator
+        self.detections = []
+
+    def preprocess(self, item):
+        frame_number, frame = item
+        frame, scale = resize_for_model(frame, self.preprocess_size)
+        return frame_number, frame, scale
+
+    def infer(self, batch):
+        results = self.detector.detect_signs_batch([frame for _, frame, _ in batch])
+        return [(frame_number, scale, detections) for (frame_number, _, scale), detections in zip(batch, results)]
+
+    def postprocess(self, batch):
+        detections = []
+        for frame_number, scale, frame_detections in batch:
+            for detection in frame_detections:
+                if scale != 1.0:
+                    bbox = detection['bbox']
+                    for key in ('x', 'y', 'width', 'height'):
+                        bbox[key] = bbox[key] * scale
+                detection['frame'] = frame_number
+                detections.append(detection)
+        if self.translator is not None:
+            self.translator.feed(detections)
+        self.detections.extend(detections)
+        return batch[-1][0] + 1
+
+
+class PipelineStatsStore:
+    """Statistiques cumulées des pipelines vidéo du processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._stages = {}
+        self._last = None
+
+    def add(self, stats: Dict):
+        with self._lock:
+            self._runs += 1
+            self._last = stats
+            for name, stage in stats['stages'].items():
+                total = self._stages.setdefault(name, {'items': 0, 'busy_s': 0.0, 'output_wait_s': 0.0})
+                total['items'] += stage['items']
+                total['busy_s'] += stage['busy_s']
+                total['output_wait_s'] += stage['output_wait_s']
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'runs': self._runs,
+                'stages': {name: dict(stage) for name, stage in self._stages.items()},
+                'last_run': self._last,
+            }
+
+
+# Statistiques des pipelines vidéo, exposées par /api/inference_stats/
+pipeline_stats = PipelineStatsStore()
+
+
+def run_video_pipeline(detector, frames: Iterable, batch_size: int = 8, preprocess_size: int = 640,
+                       queue_size: int = 4, total_frames: int = 0,
+                       progress_callback: Optional[Callable[[int, int], None]] = None,
+                       translate: bool = True) -> Dict:
+    """
+    Analyse une vidéo avec les étapes décodage -> prétraitement -> inférence
+    -> post-traitement/traduction en parallèle
+
+    La progression est signalée depuis le thread appelant, à mesure que les
+    lots sortent du pipeline : le callback peut écrire en base sans ouvrir
+    de connexion dans les threads des étapes.
+
+    Args:
+        detector: Détecteur exposant detect_signs_batch et streaming_translator
+        frames: Itérable de (numéro de frame, image BGR), lu par l'étape de décodage
+        batch_size: Frames par passe du modèle
+        preprocess_size: Plus grand côté des frames envoyées au modèle (0 = inchangé)
+        queue_size: Capacité des files entre étapes
+        total_frames: Nombre de frames annoncé (pour la progression)
+        progress_callback: Appelé dans le thread appelant avec
+            (frames parcourues, frames totales)
+        translate: Traduit les détections au fil de l'eau ; sinon
+            'translated_text' vaut None
+
+    Returns:
+        dict: 'detections' (ordre des frames), 'translated_text' et 'stats'
+    """
+    translator = detector.streaming_translator() if translate else None
+    stages = _VideoStages(detector, preprocess_size, translator)
+    pipeline = Pipeline('decode', [
+        Stage('preprocess', stages.preprocess),
+        Stage('infer', stages.infer, batch_size=batch_size),
+        Stage('postprocess', stages.postprocess),
+    ], queue_size=queue_size)
+
+    for frames_done in pipeline.run(frames):
+        if progress_callback:
+            progress_callback(frames_done, max(total_frames, frames_done))
+
+    stats = pipeline.get_stats()
+    pipeline_stats.add(stats)
+    translated_text = None
+    if translate:
+        translated_text = translator.finish() if stages.detections else detector.translate_signs_to_text([])
+    return {
+        'detections': stages.detections,
+        'translated_text': translated_text,
+        'stats': stats,
+    }
@@ -0,0 +1,477 @@
+"""
+Traitement des fichiers uploadés avec le modèle IA
+Projet créé par Marino ATOHOUN
+"""
+
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .ai_model import detector
+from .batching import scheduler
+from .cache import result_cache
+from .capture import CaptureAdvisor
+from .derivatives import attach_derivatives, scale_detections
+from .download import DownloadError, SpooledDownload
+from .metrics import metrics
+from .models import UploadedFile, TranslationResult, SignDetection, PackedDetections
+from .roi import ROITracker
+from .temporal import CameraSession, SessionRegistry
+from .video import VideoInferenceEngine
+
+
+# Signature des callbacks de progression : (frames traitées, frames totales)
+ProgressCallback = Callable[[int, int], None]
+
+
+def store_uploaded_file(uploaded_file, file_type: str, content_hash: str,
+                        commit: bool = True, duplicate: Optional[UploadedFile] = None) -> UploadedFile:
+    """
+    Enregistre un fichier uploadé en dédupliquant son contenu sur le disque
+
+    Si un fichier de même empreinte est déjà stocké, le nouvel UploadedFile
+    réutilise ce fichier au lieu d'en écrire une nouvelle copie. Les images
+    reçoivent un dérivé à la taille du modèle et une vignette (réutilisés
+    eux aussi pour un contenu déjà connu).
+
+    Args:
+        uploaded_file: Fichier reçu dans request.FILES
+        file_type: 'image' ou 'video'
+        content_hash: Empreinte SHA-256 du contenu
+        commit: Si False, le fichier est écrit sur le disque mais la ligne
+            UploadedFile n'est pas créée (elle le sera avec les résultats)
+        duplicate: Instance de même contenu dont les fichiers sont réutilisés
+            (par exemple une image déjà stockée du même lot, pas encore en
+            base) ; par défaut, recherchée en base
+
+    Returns:
+        UploadedFile: Instance enregistrée ou non selon `commit`
+    """
+    stored_file = uploaded_file
+    if duplicate is None:
+        duplicate = (
+            UploadedFile.objects
+            .filter(content_hash=content_hash)
+            .exclude(file='')
+            .only('file', 'derivative', 'derivative_scale', 'thumbnail')
+            .first()
+        )
+    if duplicate is not None and default_storage.exists(duplicate.file.name):
+        stored_file = duplicate.file.name
+
+    file_instance = UploadedFile(
+        file_type=file_type,
+        original_name=uploaded_file.name,
+        content_hash=content_hash
+    )
+
+    if file_type == 'image':
+        if isinstance(stored_file, str) and duplicate.derivative and default_storage.exists(duplicate.derivative.name):
+            file_instance.derivative.name = duplicate.derivative.name
+            file_instance.derivative_scale = duplicate.derivative_scale
+            file_instance.thumbnail.name = duplicate.thumbnail.name
+        else:
+            # Décodage unique de l'original, avant son déplacement vers le stockage
+            uploaded_file.seek(0)
+            attach_derivatives(file_instance, uploaded_file)
+            uploaded_file.seek(0)
+
+    if isinstance(stored_file, str):
+        file_instance.file.name = stored_file
+    else:
+        file_instance.file.save(uploaded_file.name, uploaded_file, save=False)
+
+    if commit:
+        file_instance.save()
+    return file_instance
+
+
+def delete_unsaved_files(file_instances: Iterable[UploadedFile]):
+    """
+    Supprime du stockage les fichiers d'instances UploadedFile non enregistrées
+
+    Un fichier encore référencé par une ligne en base (contenu dédupliqué)
+    est conservé.
+    """
+    names = {
+        field.name
+        for file_instance in file_instances
+        for field in (file_instance.file, file_instance.derivative, file_instance.thumbnail)
+        if field
+    }
+    if not names:
+        return
+
+    referenced = set()
+    for field in ('file', 'derivative', 'thumbnail'):
+        referenced.update(
+            UploadedFile.objects.filter(**{f'{field}__in': names}).values_list(field, flat=True)
+        )
+    for name in names - referenced:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            pass
+
+
+def new_camera_session() -> CameraSession:
+    """Crée une session caméra configurée par les paramètres SIGNVISION_*"""
+    return CameraSession(
+        translate=detector.translate_sign,
+        motion_threshold=getattr(settings, 'SIGNVISION_MOTION_THRESHOLD', 4.0),
+        max_skipped=getattr(settings, 'SIGNVISION_MOTION_MAX_SKIPPED', 15),
+        smoothing_window=getattr(settings, 'SIGNVISION_SMOOTHING_WINDOW', 5),
+        roi=new_roi_tracker(),
+    )
+
+
+def new_roi_tracker() -> Optional[ROITracker]:
+    """Crée le suivi de région des mains, ou None s'il est désactivé"""
+    if not getattr(settings, 'SIGNVISION_ROI_ENABLED', True):
+        return None
+    return ROITracker(
+        input_size=getattr(settings, 'SIGNVISION_ROI_INPUT_SIZE', 320),
+        padding=getattr(settings, 'SIGNVISION_ROI_PADDING', 0.5),
+        refresh_interval=getattr(settings, 'SIGNVISION_ROI_REFRESH_INTERVAL', 10),
+        min_confidence=getattr(settings, 'SIGNVISION_ROI_MIN_CONFIDENCE', 0.5),
+    )
+
+
+# Sessions caméra des clients HTTP (identifiées par le champ camera_session)
+camera_sessions = SessionRegistry(
+    new_camera_session, ttl=getattr(settings, 'SIGNVISION_CAMERA_SESSION_TTL', 120)
+)
+metrics.register_gauge('camera_sessions', 'Sessions caméra actives', lambda: len(camera_sessions))
+
+
+# Consignes de capture renvoyées aux clients caméra selon la charge
+capture_advisor = CaptureAdvisor(
+    target_latency_ms=getattr(settings, 'SIGNVISION_CAPTURE_TARGET_LATENCY_MS', 250),
+    min_interval_ms=getattr(settings, 'SIGNVISION_CAPTURE_MIN_INTERVAL_MS', 200),
+    max_interval_ms=getattr(settings, 'SIGNVISION_CAPTURE_MAX_INTERVAL_MS', 2000),
+    batch_size=scheduler.max_batch_size,
+)
+
+
+def analyze_camera_frame(frame_bytes: bytes, session: Optional[CameraSession] = None) -> Dict:
+    """
+    Détecte et traduit les signes d'une frame de caméra encodée (JPEG/PNG)
+
+    Partagé par la vue HTTP process_camera et le canal WebSocket.
+
+    Args:
+        frame_bytes: Frame encodée
+        session: Session caméra ; si fournie, l'inférence peut être évitée
+            sur une scène statique et la traduction est la transcription lissée
+
+    Returns:
+        dict: Données de réponse (traduction, confiance, temps, détections
+            et consignes de capture)
+    """
+    start_time = time.time()
+    temporal = None
+    if session is None:
+        detections = scheduler.detect_signs_image(frame_bytes)
+        translated_text = detector.translate_signs_to_text(detections)
+    else:
+        temporal = session.process(frame_bytes, scheduler.detect_signs_image)
+        detections = temporal.pop('detections')
+        translated_text = temporal['transcript'] or "Aucun signe détecté"
+    processing_time = time.time() - start_time
+
+    # Seules les frames passées par le modèle reflètent la charge du serveur
+    if temporal is None or not temporal['inference_skipped']:
+        capture_advisor.observe(processing_time)
+
+    # Calcul de la confiance moyenne
+    confidence_score = 0
+    if detections:
+        confidence_score = sum(d['confidence'] for d in detections) / len(detections) * 100
+
+    data = {
+        'translated_text': translated_text,
+        'confidence_score': round(confidence_score, 2),
+        'processing_time': round(processing_time, 2),
+        'detections': detections,
+        'capture_hints': capture_advisor.hints(scheduler.queue_depth()),
+    }
+    if temporal is not None:
+        data.update(temporal)
+    return data
+
+
+def analyze_remote_video(video_url: str) -> Iterator[Dict]:
+    """
+    Télécharge une vidéo distante et l'analyse pendant le téléchargement
+
+    Le téléchargement est borné par SIGNVISION_URL_MAX_BYTES et
+    SIGNVISION_URL_TIMEOUT ; le décodage et l'inférence commencent dès que
+    les premiers octets sont arrivés.
+
+    Args:
+        video_url: Adresse http(s) de la vidéo
+
+    Yields:
+        dict: Événements 'start', puis 'detections' (un par lot de frames,
+            avec la traduction partielle), puis 'result' ou 'error'
+    """
+    start_time = time.time()
+    download = SpooledDownload(
+        video_url,
+        max_bytes=getattr(settings, 'SIGNVISION_URL_MAX_BYTES', 200 * 1024 * 1024),
+        timeout=getattr(settings, 'SIGNVISION_URL_TIMEOUT', 120),
+        connect_timeout=getattr(settings, 'SIGNVISION_URL_CONNECT_TIMEOUT', 10),
+        read_timeout=getattr(settings, 'SIGNVISION_URL_READ_TIMEOUT', 30),
+        chunk_size=getattr(settings, 'SIGNVISION_URL_CHUNK_SIZE', 64 * 1024),
+        allowed_hosts=getattr(settings, 'SIGNVISION_URL_ALLOWED_HOSTS', ()),
+        allow_private=getattr(settings, 'SIGNVISION_URL_ALLOW_PRIVATE_NETWORKS', False),
+        max_redirects=getattr(settings, 'SIGNVISION_URL_MAX_REDIRECTS', 5),
+    ).start()
+    reader = None
+
+    try:
+        download.wait_for_headers()
+        yield {'type': 'start', 'url': video_url, 'content_length': download.content_length or None}
+
+        reader = download.reader()
+        translator = detector.streaming_translator()
+        progress = {'frames': 0}
+        detections_count = 0
+        confidence_total = 0.0
+
+        def on_progress(frames_done, frames_total):
+            progress['frames'] = frames_done
+
+        engine = VideoInferenceEngine.from_settings(detector)
+        for detections in engine.stream(reader, on_progress):
+            with metrics.timer('translate'):
+                translator.feed(detections)
+            detections_count += len(detections)
+            confidence_total += sum(d['confidence'] for d in detections)
+            yield {
+                'type': 'detections',
+                'frames_done': progress['frames'],
+                'bytes_downloaded': download.size,
+                'partial_text': translator.text(),
+                'detections': detections,
+            }
+
+        if download.error:
+            raise DownloadError(download.error)
+
+        confidence_score = confidence_total / detections_count * 100 if detections_count else 0
+        yield {
+            'type': 'result',
+            'success': True,
+            'translated_text': translator.finish(),
+            'confidence_score': round(confidence_score, 2),
+            'processing_time': round(time.time() - start_time, 2),
+            'detections_count': detections_count,
+            'frames_processed': progress['frames'],
+            'bytes_downloaded': download.size,
+        }
+
+    except Exception as e:
+        yield {
+            'type': 'error',
+            'success': False,
+            'error': f"Erreur lors du traitement de l'URL: {str(e)}",
+        }
+    finally:
+        if reader is not None:
+            reader.close()
+        download.close()
+
+
+def run_inference(file_instance, progress_callback: Optional[ProgressCallback] = None,
+                  use_derivative: bool = False) -> Dict:
+    """
+    Exécute le modèle sur un fichier et calcule la traduction
+
+    Contrairement à process_file_with_ai, les erreurs sont propagées. La
+    première analyse d'une image porte sur l'original : le dérivé est un
+    JPEG recompressé, réservé aux retraitements.
+
+    Args:
+        file_instance: Instance du modèle UploadedFile
+        progress_callback: Appelé avec (frames traitées, frames totales)
+        use_derivative: Analyse le dérivé à la taille du modèle s'il existe
+
+    Returns:
+        dict: Résultats du traitement
+    """
+    start_time = time.time()
+
+    file_path = file_instance.file.path
+
+    if file_instance.file_type == 'image':
+        if use_derivative and file_instance.derivative:
+            # Dérivé à la taille du modèle : pas de décodage de l'original
+            detections = scale_detections(
+                scheduler.detect_signs_image(file_instance.derivative.path), file_instance.derivative_scale
+            )
+        else:
+            detections = scheduler.detect_signs_image(file_path)
+        if progress_callback:
+            progress_callback(1, 1)
+        translated_text = detector.translate_signs_to_text(detections)
+    else:  # video
+        analysis = detector.analyze_video(file_path, progress_callback=progress_callback)
+        detections = analysis['detections']
+        translated_text = analysis['translated_text']
+
+    processing_time = time.time() - start_time
+
+    # Calcul de la confiance moyenne
+    confidence_score = 0
+    if detections:
+        confidence_score = sum(d['confidence'] for d in detections) / len(detections) * 100
+
+    return {
+        'detections': detections,
+        'translated_text': translated_text,
+        'confidence_score': round(confidence_score, 2),
+        'processing_time': round(processing_time, 2)
+    }
+
+
+def process_file_with_ai(file_instance, progress_callback: Optional[ProgressCallback] = None) -> Dict:
+    """
+    Traite un fichier avec le modèle IA
+    
+    Args:
+        file_instance: Instance du modèle UploadedFile
+        progress_callback: Appelé avec (frames traitées, frames totales)
+        
+    Returns:
+        dict: Résultats du traitement
+    """
+    start_time = time.time()
+    
+    try:
+        return run_inference(file_instance, progress_callback)
+        
+    except Exception as e:
+        return {
+            'detections': [],
+            'translated_text': f'Erreur lors du traitement: {str(e)}',
+            'confidence_score': 0,
+            'processing_time': time.time() - start_time,
+            'error': str(e)
+        }
+
+
+def detection_storage_mode(detections_count: int) -> str:
+    """
+    Choisit le stockage des détections : 'rows' (une ligne par boîte)
+    ou 'packed' (tableaux compacts), selon SIGNVISION_DETECTION_STORAGE
+    """
+    mode = getattr(settings, 'SIGNVISION_DETECTION_STORAGE', 'auto')
+    if mode == 'auto':
+        threshold = getattr(settings, 'SIGNVISION_PACKED_DETECTIONS_THRESHOLD', 2000)
+        return 'packed' if detections_count > threshold else 'rows'
+    return mode
+
+
+def save_translation_result(file_instance, result_data: Dict) -> TranslationResult:
+    """
+    Enregistre le résultat de traduction et les détections d'un fichier
+
+    Le fichier, le résultat et toutes les détections sont écrits dans une
+    seule transaction ; les détections sont insérées par lots (bulk_create)
+    ou sous forme compacte pour les vidéos longues.
+
+    Args:
+        file_instance: Instance du modèle UploadedFile traitée
+            (éventuellement pas encore enregistrée)
+        result_data: Résultats retournés par process_file_with_ai
+
+    Returns:
+        TranslationResult: Résultat enregistré
+    """
+    return save_translation_results([(file_instance, result_data)])[0]
+
+
+def save_translation_results(results: List[Tuple[UploadedFile, Dict]]) -> List[TranslationResult]:
+    """
+    Enregistre les résultats de plusieurs fichiers dans une seule transaction
+
+    Les détections de tous les fichiers sont insérées ensemble (bulk_create),
+    ainsi que les détections compactes.
+
+    Args:
+        results: Couples (UploadedFile, résultats de process_file_with_ai)
+
+    Returns:
+        list: TranslationResult enregistrés, dans l'ordre de `results`
+    """
+    translation_results = []
+    detection_rows = []
+    packed_detections = []
+
+    with metrics.timer('db'), transaction.atomic():
+        for file_instance, result_data in results:
+            detections = result_data['detections']
+            packed = detection_storage_mode(len(detections)) == 'packed'
+            file_instance.processed = True
+            file_instance.save()
+
+            translation_result = TranslationResult.objects.create(
+                uploaded_file=file_instance,
+                # En mode compact, les détections ne sont pas recopiées en JSON
+                detected_signs=[] if packed else detections,
+                translated_text=result_data['translated_text'],
+                confidence_score=result_data['confidence_score'],
+                processing_time=result_data['processing_time'],
+                # Un résultat en erreur n'a pas de version et n'est jamais servi par le cache
+                model_version='' if result_data.get('error') else detector.model_version
+            )
+            translation_results.append(translation_result)
+
+            if packed:
+                packed_detections.append(PackedDetections.pack(translation_result, detections))
+            else:
+                detection_rows.extend(
+                    SignDetection(
+                        translation_result=translation_result,
+                        sign_class=detection['class'],
+                        confidence=detection['confidence'],
+                        bbox_x=detection['bbox']['x'],
+                        bbox_y=detection['bbox']['y'],
+                        bbox_width=detection['bbox']['width'],
+                        bbox_height=detection['bbox']['height'],
+                        frame_number=detection.get('frame', 0)
+                    )
+                    for detection in detections
+                )
+
+        SignDetection.objects.bulk_create(
+            detection_rows, batch_size=getattr(settings, 'SIGNVISION_DB_BATCH_SIZE', 500)
+        )
+        PackedDetections.objects.bulk_create(packed_detections)
+
+    for (file_instance, _), translation_result in zip(results, translation_results):
+        if translation_result.model_version:
+            result_cache.put(file_instance.content_hash, translation_result.model_version,
+                             serialize_result(translation_result))
+
+    return translation_results
+
+
+def serialize_result(translation_result: TranslationResult) -> Dict:
+    """Retourne les données d'un résultat au format des réponses API"""
+    detections = translation_result.detected_signs
+    if not detections and translation_result.confidence_score:
+        # Un score non nul implique des détections : elles sont stockées
+        # sous forme compacte
+        detections = translation_result.stored_detections()
+    return {
+        'result_id': translation_result.id,
+        'translated_text': translation_result.translated_text,
+        'confidence_score': translation_result.confidence_score,
+        'processing_time': translation_result.processing_time,
+        'detections': detections
+    }
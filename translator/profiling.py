@@ -0,0 +1,342 @@
+"""
+Profilage à la demande des vues coûteuses
+Projet créé par Marino ATOHOUN
+
+Le middleware profile une fraction des requêtes vers process_camera,
+upload_file, process_url et process_batch lorsque
+SIGNVISION_PROFILING_ENABLED est vrai, ou une requête précise lorsqu'elle
+porte l'en-tête X-SignVision-Profile avec le jeton
+SIGNVISION_PROFILING_TOKEN.
+
+Pour chaque requête profilée :
+- cProfile mesure le thread de la requête ;
+- un échantillonneur relève à intervalle fixe les piles du thread de la
+  requête et des threads internes (micro-batching, jobs, pipeline vidéo,
+  téléchargement), y compris ceux démarrés pendant la requête.
+
+Pour une réponse en flux (NDJSON), le travail a lieu pendant la lecture du
+contenu : le profil couvre alors toute la lecture et ne s'arrête qu'à la
+fermeture de la réponse. Les processus des segments vidéo parallèles ne
+sont pas profilés.
+
+Les profils sont agrégés par vue et téléchargeables au format pstats
+(python -m pstats, snakeviz) ou en piles repliées (flamegraph.pl,
+speedscope). Hors requête profilée, le coût se limite à quelques tests.
+"""
+
+import cProfile
+import hmac
+import io
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+
+PROFILE_HEADER = 'X-SignVision-Profile'
+
+DEFAULT_PROFILED_VIEWS = ('process_camera', 'upload_file', 'process_url', 'process_batch')
+
+# Préfixe des threads internes échantillonnés en plus du thread de la requête
+INTERNAL_THREAD_PREFIX = 'signvision-'
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Relève périodiquement les piles d'appels de threads choisis
+    """
+
+    def __init__(self, thread_ids: Dict[int, str], interval: float = 0.005, max_depth: int = 128,
+                 thread_prefix: Optional[str] = None):
+        """
+        Args:
+            thread_ids: Identifiants des threads à échantillonner et leur nom
+            interval: Intervalle entre deux relevés (s)
+            max_depth: Profondeur maximale d'une pile
+            thread_prefix: Échantillonne aussi les threads dont le nom porte
+                ce préfixe, recherchés à chaque relevé
+        """
+        self.thread_ids = thread_ids
+        self.thread_prefix = thread_prefix
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def sample(self):
+        frames = sys._current_frames()
+        thread_ids = self.thread_ids
+        if self.thread_prefix:
+            thread_ids = dict(thread_ids)
+            thread_ids.update(
+                (thread.ident, thread.name) for thread in threading.enumerate()
+                if thread.name.startswith(self.thread_prefix) and thread.ident not in thread_ids
+            )
+        for thread_id, name in thread_ids.items():
+            frame = frames.get(thread_id)
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                labels.append(name)
+                self.stacks[';'.join(reversed(labels))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+
+class ProfileStore:
+    """
+    Profils agrégés par vue
+    """
+
+    def __init__(self, max_stacks: int = 20000):
+        """
+        Args:
+            max_stacks: Nombre maximal de piles distinctes conservées par vue ;
+                les suivantes sont comptées sous une pile « [autres] »
+        """
+        self.max_stacks = max_stacks
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def add(self, view: str, profile: cProfile.Profile, stacks: Counter, elapsed: float):
+        with self._lock:
+            entry = self._views.get(view)
+            if entry is None:
+                entry = self._views[view] = {
+                    'requests': 0,
+                    'total_time': 0.0,
+                    'stats': pstats.Stats(profile, stream=io.StringIO()),
+                    'stacks': Counter(),
+                }
+            else:
+                entry['stats'].add(profile)
+
+            entry['requests'] += 1
+            entry['total_time'] += elapsed
+            for stack, count in stacks.items():
+                if stack in entry['stacks'] or len(entry['stacks']) < self.max_stacks:
+                    entry['stacks'][stack] += count
+                else:
+                    entry['stacks']['[autres]'] += count
+
+    def views(self) -> List[str]:
+        return sorted(self._views)
+
+    def summary(self, top: int = 10) -> Dict:
+        """Nombre de requêtes, temps moyen et fonctions au temps propre le plus élevé"""
+        with self._lock:
+            summary = {}
+            for view, entry in sorted(self._views.items()):
+                functions = sorted(
+                    entry['stats'].stats.items(), key=lambda item: item[1][2], reverse=True
+                )[:top]
+                summary[view] = {
+                    'requests': entry['requests'],
+                    'mean_time': round(entry['total_time'] / entry['requests'], 6),
+                    'samples': sum(entry['stacks'].values()),
+                    'top_functions': [
+                        {
+                            'function': f"{name} ({os.path.basename(filename)}:{line})",
+                            'calls': calls,
+                            'own_time': round(own_time, 6),
+                            'cumulative_time': round(cumulative_time, 6),
+                        }
+                        for (filename, line, name), (_, calls, own_time, cumulative_time, _) in functions
+                    ],
+                }
+            return summary
+
+    def pstats_bytes(self, view: str) -> Optional[bytes]:
+        """Profil agrégé au format de pstats.Stats.dump_stats"""
+        with self._lock:
+            entry = self._views.get(view)
+            return marshal.dumps(entry['stats'].stats) if entry else None
+
+    def collapsed(self, view: str) -> Optional[str]:
+        """Piles repliées : une ligne « frame;frame;... nombre » par pile"""
+        with self._lock:
+            entry = self._views.get(view)
+            if entry is None:
+                return None
+            return ''.join(f'{stack} {count}\n' for stack, count in sorted(entry['stacks'].items()))
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+class _ProfiledRequest:
+    """Profilage d'une requête : cProfile et échantillonneur de piles"""
+
+    def __init__(self, view: str, interval: float):
+        self.view = view
+        current = threading.current_thread()
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(
+            {current.ident: f'request:{view}'}, interval=interval, thread_prefix=INTERNAL_THREAD_PREFIX
+        )
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.sampler.start()
+        self.profile.enable()
+
+    def pause(self):
+        self.profile.disable()
+
+    def resume(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        stacks = self.sampler.stop()
+        profile_store.add(self.view, self.profile, stacks, time.perf_counter() - self.started_at)
+
+
+class _ProfiledStream:
+    """
+    Contenu d'une réponse en flux lu sous profilage
+
+    cProfile n'est actif que pendant la production de chaque morceau (pas
+    pendant son envoi) ; le profil est enregistré à la fin du flux ou à la
+    fermeture de la réponse, même si le flux n'a jamais été lu.
+    """
+
+    def __init__(self, profiled: _ProfiledRequest, content, release):
+        self.profiled = profiled
+        self.content = iter(content)
+        self.release = release
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.profiled.resume()
+        try:
+            return next(self.content)
+        except StopIteration:
+            self.close()
+            raise
+        finally:
+            self.profiled.pause()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            close = getattr(self.content, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            try:
+                self.profiled.stop()
+            finally:
+                self.release()
+
+
+class ProfilerMiddleware:
+    """
+    Profile une fraction des requêtes vers les vues listées dans
+    SIGNVISION_PROFILING_VIEWS
+    """
+
+    # Un seul profil à la fois : borne le surcoût et évite les conflits
+    # entre profileurs (un seul outil actif par interpréteur en 3.12+)
+    _active = threading.Lock()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        streamed = False
+        try:
+            response = self.get_response(request)
+            profiled = getattr(request, '_signvision_profile', None)
+            if profiled is not None and response.streaming:
+                # Le travail se fait pendant la lecture du flux : le profil
+                # est poursuivi jusqu'à la fermeture de la réponse
+                profiled.pause()
+                response.streaming_content = _ProfiledStream(
+                    profiled, response.streaming_content, self._active.release
+                )
+                streamed = True
+        finally:
+            profiled = getattr(request, '_signvision_profile', None)
+            if profiled is not None and not streamed:
+                try:
+                    profiled.stop()
+                finally:
+                    self._active.release()
+
+        if profiled is not None:
+            response['X-SignVision-Profiled'] = profiled.view
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = self._profiled_view(request)
+        if view is None or not self._active.acquire(blocking=False):
+            return None
+
+        try:
+            profiled = _ProfiledRequest(
+                view, interval=getattr(settings, 'SIGNVISION_PROFILING_SAMPLE_INTERVAL_MS', 5) / 1000.0
+            )
+            profiled.start()
+        except Exception:
+            self._active.release()
+            raise
+        request._signvision_profile = profiled
+        return None
+
+    @staticmethod
+    def _profiled_view(request) -> Optional[str]:
+        """Nom de la vue à profiler pour cette requête, ou None"""
+        token = getattr(settings, 'SIGNVISION_PROFILING_TOKEN', '')
+        header = request.headers.get(PROFILE_HEADER)
+        forced = bool(token and header and hmac.compare_digest(header, token))
+
+        if not forced and not getattr(settings, 'SIGNVISION_PROFILING_ENABLED', False):
+            return None
+
+        match = request.resolver_match
+        view = match.url_name if match is not None else None
+        if view not in getattr(settings, 'SIGNVISION_PROFILING_VIEWS', DEFAULT_PROFILED_VIEWS):
+            return None
+
+        if forced or random.random() < getattr(settings, 'SIGNVISION_PROFILING_SAMPLE_RATE', 0.01):
+            return view
+        return None
+
+
+# Profils agrégés du processus
+profile_store = ProfileStore()
@@ -0,0 +1,152 @@
+"""
+Suivi de la région des mains pour réduire l'entrée du modèle
+Projet créé par Marino ATOHOUN
+
+Après une détection sur la frame complète, les frames suivantes d'un même
+flux sont analysées sur un recadrage autour des dernières détections (avec
+une marge), redimensionné à une taille d'entrée plus petite. Les boîtes sont
+ensuite replacées dans le repère de la frame complète.
+
+On revient à la frame complète quand le recadrage ne contient plus de
+détection assez confiante, ou périodiquement pour retrouver des mains
+sorties de la région.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+# Région (x0, y0, x1, y1) en pixels de la frame complète
+Region = Tuple[int, int, int, int]
+
+
+class ROITracker:
+    """
+    Région d'intérêt d'un flux caméra
+    """
+
+    def __init__(self, input_size: int = 320, padding: float = 0.5,
+                 refresh_interval: int = 10, min_confidence: float = 0.5,
+                 max_area_ratio: float = 0.6):
+        """
+        Args:
+            input_size: Taille d'entrée du modèle sur le recadrage (multiple de 32)
+            padding: Marge ajoutée de chaque côté, en proportion du plus grand
+                côté de la boîte englobante
+            refresh_interval: Nombre maximal de frames recadrées entre deux
+                analyses de la frame complète
+            min_confidence: Confiance minimale pour continuer le suivi
+            max_area_ratio: Au-delà de cette part de la frame, le recadrage
+                n'apporte rien et la frame complète est analysée
+        """
+        self.input_size = max(32, int(input_size) // 32 * 32)
+        self.padding = padding
+        self.refresh_interval = max(0, int(refresh_interval))
+        self.min_confidence = min_confidence
+        self.max_area_ratio = max_area_ratio
+
+        self._box = None
+        self._since_full = 0
+        self.full_frames = 0
+        self.roi_frames = 0
+        self.last_region = None
+
+    def reset(self):
+        """Oublie la région suivie : la prochaine frame sera analysée en entier"""
+        self._box = None
+
+    def region(self, frame_shape) -> Optional[Region]:
+        """
+        Calcule la région à analyser pour une frame
+
+        Returns:
+            La région recadrée, ou None pour analyser la frame complète
+        """
+        if self._box is None or self._since_full >= self.refresh_interval:
+            return None
+
+        height, width = frame_shape[:2]
+        x0, y0, x1, y1 = self._box
+        margin = self.padding * max(x1 - x0, y1 - y0)
+
+        region = (
+            max(0, int(x0 - margin)),
+            max(0, int(y0 - margin)),
+            min(width, int(np.ceil(x1 + margin))),
+            min(height, int(np.ceil(y1 + margin))),
+        )
+        area = (region[2] - region[0]) * (region[3] - region[1])
+        if area <= 0 or area > self.max_area_ratio * width * height:
+            return None
+        return region
+
+    def detect(self, frame: np.ndarray, infer: Callable[..., List[Dict]]) -> List[Dict]:
+        """
+        Exécute l'inférence sur la frame complète ou sur la région suivie
+
+        Args:
+            frame: Frame BGR décodée
+            infer: Fonction d'inférence acceptant (image, imgsz=None)
+
+        Returns:
+            Détections en coordonnées de la frame complète
+        """
+        region = self.region(frame.shape)
+        self.last_region = region
+
+        if region is None:
+            detections = infer(frame)
+            self.full_frames += 1
+            self._since_full = 0
+        else:
+            x0, y0, x1, y1 = region
+            crop = frame[y0:y1, x0:x1]
+            scale = min(1.0, self.input_size / float(max(crop.shape[:2])))
+            if scale < 1.0:
+                crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            detections = [
+                self._to_frame(detection, x0, y0, scale)
+                for detection in infer(np.ascontiguousarray(crop), imgsz=self.input_size)
+            ]
+            self.roi_frames += 1
+            self._since_full += 1
+
+        self._update(detections)
+        return detections
+
+    def get_stats(self) -> Dict:
+        total = self.full_frames + self.roi_frames
+        return {
+            'full_frames': self.full_frames,
+            'roi_frames': self.roi_frames,
+            'roi_ratio': round(self.roi_frames / total, 3) if total else 0,
+        }
+
+    def _update(self, detections: List[Dict]):
+        """Met à jour la boîte suivie à partir des détections de la frame"""
+        confident = [d for d in detections if d['confidence'] >= self.min_confidence]
+        if not confident:
+            self._box = None
+            return
+
+        self._box = (
+            min(d['bbox']['x'] for d in confident),
+            min(d['bbox']['y'] for d in confident),
+            max(d['bbox']['x'] + d['bbox']['width'] for d in confident),
+            max(d['bbox']['y'] + d['bbox']['height'] for d in confident),
+        )
+
+    @staticmethod
+    def _to_frame(detection: Dict, x0: int, y0: int, scale: float) -> Dict:
+        """Replace une détection du recadrage dans le repère de la frame"""
+        bbox = detection['bbox']
+        mapped = dict(detection)
+        mapped['bbox'] = {
+            'x': bbox['x'] / scale + x0,
+            'y': bbox['y'] / scale + y0,
+            'width': bbox['width'] / scale,
+            'height': bbox['height'] / scale,
+        }
+        return mapped
@@ -0,0 +1,17 @@
+"""
+Signaux de l'application translator
+Projet créé par Marino ATOHOUN
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .history import invalidate_history
+from .models import TranslationResult
+
+
+@receiver(post_save, sender=TranslationResult)
+@receiver(post_delete, sender=TranslationResult)
+def translation_result_changed(sender, **kwargs):
+    """Invalide le cache d'historique quand un résultat change"""
+    invalidate_history()
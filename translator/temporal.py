@@ -0,0 +1,235 @@
+"""
+Moteur temporel par session de caméra
+Projet créé par Marino ATOHOUN
+
+Chaque flux caméra garde un état entre deux frames :
+- une porte de mouvement compare une version réduite en niveaux de gris de
+  la frame à la dernière frame analysée et évite l'inférence quand la scène
+  n'a pas changé (les dernières détections sont alors réutilisées) ;
+- les votes de classe des dernières frames sont lissés sur une fenêtre
+  glissante ;
+- la transcription est construite au fil de l'eau à partir du signe lissé ;
+- si un ROITracker est fourni, l'inférence se limite à la région des mains.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from .ai_model import ImageSource, load_image
+from .roi import ROITracker
+
+
+class MotionGate:
+    """
+    Décide si une frame est assez différente de la dernière frame analysée
+    """
+
+    def __init__(self, threshold: float = 4.0, size=(64, 48), max_skipped: int = 15):
+        """
+        Args:
+            threshold: Différence absolue moyenne (0-255) à partir de laquelle
+                la scène est considérée comme modifiée
+            size: Résolution réduite utilisée pour la comparaison
+            max_skipped: Nombre maximal de frames consécutives sans inférence
+        """
+        self.threshold = threshold
+        self.size = size
+        self.max_skipped = max_skipped
+        self._reference = None
+        self._skipped = 0
+        self.last_score = None
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        """Retourne True si la frame doit passer par le modèle"""
+        small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), self.size, interpolation=cv2.INTER_AREA)
+
+        if self._reference is None:
+            self.last_score = None
+        else:
+            self.last_score = float(cv2.absdiff(small, self._reference).mean())
+            if self.last_score < self.threshold and self._skipped < self.max_skipped:
+                self._skipped += 1
+                return False
+
+        self._reference = small
+        self._skipped = 0
+        return True
+
+
+class VoteSmoother:
+    """
+    Lissage des classes détectées sur les dernières frames
+
+    Chaque frame vote pour sa détection la plus confiante (pondérée par la
+    confiance). Le signe lissé est la classe au score cumulé le plus élevé,
+    à condition qu'elle soit majoritaire dans la fenêtre.
+    """
+
+    def __init__(self, window: int = 5, min_confidence: float = 0.6):
+        self.window = max(1, int(window))
+        self.min_confidence = min_confidence
+        self._votes = deque(maxlen=self.window)
+
+    def update(self, detections: List[Dict]) -> Optional[str]:
+        """Ajoute le vote d'une frame et retourne le signe lissé (ou None)"""
+        best = max(detections, key=lambda d: d['confidence'], default=None)
+        if best is not None and best['confidence'] > self.min_confidence:
+            self._votes.append((best['class'], best['confidence']))
+        else:
+            self._votes.append(None)
+        return self.current()
+
+    def current(self) -> Optional[str]:
+        scores = {}
+        counts = {}
+        for vote in self._votes:
+            if vote is None:
+                continue
+            sign, confidence = vote
+            scores[sign] = scores.get(sign, 0.0) + confidence
+            counts[sign] = counts.get(sign, 0) + 1
+
+        if not scores:
+            return None
+        winner = max(scores, key=scores.get)
+        return winner if counts[winner] * 2 > len(self._votes) else None
+
+    def is_idle(self) -> bool:
+        """Vrai quand aucune frame de la fenêtre ne contient de signe"""
+        return len(self._votes) == self.window and all(vote is None for vote in self._votes)
+
+
+class CameraSession:
+    """
+    État temporel d'un flux caméra
+    """
+
+    def __init__(self, translate: Callable[[str], str], motion_threshold: float = 4.0,
+                 max_skipped: int = 15, smoothing_window: int = 5, max_words: int = 50,
+                 roi: Optional[ROITracker] = None):
+        """
+        Args:
+            translate: Fonction de traduction d'une classe de signe
+            motion_threshold: Seuil de la porte de mouvement
+            max_skipped: Frames consécutives maximales sans inférence
+            smoothing_window: Taille de la fenêtre de lissage (en frames)
+            max_words: Longueur maximale de la transcription conservée
+            roi: Suivi de la région des mains (None pour toujours analyser
+                la frame complète)
+        """
+        self.translate = translate
+        self.roi = roi
+        self.gate = MotionGate(threshold=motion_threshold, max_skipped=max_skipped)
+        self.smoother = VoteSmoother(window=smoothing_window)
+        self.transcript = deque(maxlen=max_words)
+        self.last_detections = []
+        self._last_committed = None
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.inferences = 0
+        self.last_seen = time.monotonic()
+
+    def process(self, frame: ImageSource, infer: Callable[..., List[Dict]]) -> Dict:
+        """
+        Traite une frame du flux
+
+        Args:
+            frame: Frame encodée ou déjà décodée
+            infer: Fonction d'inférence sur une image BGR ; avec un ROITracker,
+                elle doit accepter l'argument imgsz
+
+        Returns:
+            dict: Détections, signe lissé, transcription et statistiques
+        """
+        image = load_image(frame)
+
+        # Une session ne traite qu'une frame à la fois pour garder l'ordre
+        with self._lock:
+            self.last_seen = time.monotonic()
+            self.frames += 1
+
+            inferred = self.gate.should_infer(image)
+            if inferred:
+                self.inferences += 1
+                if self.roi is not None:
+                    self.last_detections = self.roi.detect(image, infer)
+                else:
+                    self.last_detections = infer(image)
+
+            current_sign = self.smoother.update(self.last_detections)
+            if current_sign is not None and current_sign != self._last_committed:
+                self.transcript.append(self.translate(current_sign))
+                self._last_committed = current_sign
+            elif self.smoother.is_idle():
+                # Après une pause, le même signe peut être répété
+                self._last_committed = None
+
+            stats = {
+                'frames': self.frames,
+                'inferences': self.inferences,
+                'inference_ratio': round(self.inferences / self.frames, 3),
+            }
+            if self.roi is not None:
+                stats.update(self.roi.get_stats())
+
+            return {
+                'detections': self.last_detections,
+                'current_sign': self.translate(current_sign) if current_sign else None,
+                'transcript': " ".join(self.transcript),
+                'inference_skipped': not inferred,
+                'motion_score': self.gate.last_score,
+                'roi': list(self.roi.last_region) if self.roi is not None and self.roi.last_region else None,
+                'session': stats,
+            }
+
+
+class SessionRegistry:
+    """
+    Sessions caméra actives, indexées par l'identifiant fourni par le client
+    """
+
+    def __init__(self, factory: Callable[[], CameraSession], ttl: float = 120.0, max_sessions: int = 1000):
+        """
+        Args:
+            factory: Crée une nouvelle session
+            ttl: Durée d'inactivité (s) après laquelle une session est oubliée
+            max_sessions: Nombre maximal de sessions gardées en mémoire
+        """
+        self.factory = factory
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> CameraSession:
+        """Retourne la session associée à l'identifiant, en la créant si besoin"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                self._evict()
+                session = self._sessions[session_id] = self.factory()
+            return session
+
+    def discard(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict(self):
+        """Supprime les sessions expirées, puis les plus anciennes si la limite est atteinte"""
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_seen > self.ttl:
+                del self._sessions[session_id]
+
+        if len(self._sessions) >= self.max_sessions:
+            oldest = sorted(self._sessions, key=lambda key: self._sessions[key].last_seen)
+            for session_id in oldest[:len(self._sessions) - self.max_sessions + 1]:
+                del self._sessions[session_id]
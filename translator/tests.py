@@ -1,3 +1,1386 @@
-from django.test import TestCase
+"""
+Tests de l'application translator
+Projet créé par Marino ATOHOUN
+"""
+
+import functools
+import io
+import hashlib
+import json
+import marshal
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import cv2
+import numpy as np
+from asgiref.testing import ApplicationCommunicator
+from django.core.management import call_command
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .ai_model import TRANSLATION_MAP, YOLOv8SignDetector
+from .backends import TOLERANCES, compare_detections, get_backend
+from .batch import BatchError, analyze_image_batch, collect_batch_items
+from .batching import MicroBatchScheduler, scheduler
+from .cache import result_cache
+from .capture import CaptureAdvisor
+from .derivatives import build_derivatives
+from .download import DownloadError, check_url
+from .metrics import MetricsRegistry, metrics
+from .models import PackedDetections, ProcessingJob, SignDetection, TranslationResult, UploadSession, UploadedFile
+from . import chunked, processing
+from .pipeline import Pipeline, Stage, pipeline_stats
+from .profiling import StackSampler, profile_store
+from .websocket import LatestFrameSlot, websocket_application
+from .jobs import job_queue
+from .management.commands._benchmark_suite import compare_reports, make_jpeg, run_benchmarks
+from .management.commands._benchmark_support import FakeResults, StubSignDetector, stub_pipeline
+from .inference_server import InferenceServer, RemoteSignDetector
+from .roi import ROITracker
+from .temporal import CameraSession
+from .video import VideoInferenceEngine, merge_segments, plan_segments, segment_pool
+
+
+class LazyModelLoadingTests(SimpleTestCase):
+    """Le modèle et torch ne doivent pas être chargés à l'import"""
+
+    def test_views_import_does_not_load_torch(self):
+        code = (
+            "import django, sys; django.setup(); import translator.views; "
+            "print(any(m in sys.modules for m in ('torch', 'ultralytics')))"
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE='signvision.settings'),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        self.assertEqual(output.strip().splitlines()[-1], 'False')
+
+    def test_detector_does_not_load_model_on_init(self):
+        detector = YOLOv8SignDetector('/chemin/inexistant/best.pt')
+        self.assertIsNone(detector.model)
+        self.assertFalse(detector.get_model_info()['loaded'])
+
+    def test_missing_model_raises_on_inference(self):
+        detector = YOLOv8SignDetector('/chemin/inexistant/best.pt')
+        with self.assertRaises(Exception):
+            detector.detect_signs_batch([b'\x00'])
+
+    @override_settings(SIGNVISION_MODEL_RETRY_DELAY=10, SIGNVISION_MODEL_RETRY_MAX_DELAY=15)
+    def test_failed_load_is_retried_with_backoff(self):
+        detector = YOLOv8SignDetector('/chemin/inexistant/best.pt')
+        model = object()
+        outcomes = iter([None, None, model])
+
+        def load_model():
+            detector.model = next(outcomes)
+
+        now = [1000.0]
+        with mock.patch.object(detector, 'load_model', side_effect=load_model) as load, \
+                mock.patch('translator.ai_model.time.monotonic', side_effect=lambda: now[0]):
+            with self.assertRaises(Exception):
+                detector.get_model()
+            # Pendant l'attente, pas de nouvel essai
+            now[0] += 9
+            with self.assertRaises(Exception):
+                detector.get_model()
+            self.assertEqual(load.call_count, 1)
+
+            now[0] += 1
+            with self.assertRaises(Exception):
+                detector.get_model()
+            # Délai doublé mais plafonné à 15 s
+            now[0] += 14
+            with self.assertRaises(Exception):
+                detector.get_model()
+            now[0] += 1
+            self.assertIs(detector.get_model(), model)
+            self.assertEqual(load.call_count, 3)
+
+
+class InferenceServerTests(SimpleTestCase):
+    """Le client distant doit se comporter comme le détecteur local"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.socket_path = os.path.join(tempfile.mkdtemp(), 'inference.sock')
+        cls.server = InferenceServer(
+            cls.socket_path, replicas=1,
+            detector_path='translator.management.commands._benchmark_support.StubSignDetector'
+        )
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_remote_batch_matches_local_detector(self):
+        images = [np.full((48, 64, 3), 1, np.uint8), np.full((32, 32, 3), 3, np.uint8)]
+        remote = RemoteSignDetector(self.socket_path, '/chemin/inexistant/best.pt')
+        self.assertEqual(
+            remote.detect_signs_batch(images),
+            StubSignDetector().detect_signs_batch(images)
+        )
+        self.assertEqual(remote.translate_signs_to_text(remote.detect_signs_image(images[1])), 'Oui')
+
+
+class BackendTests(SimpleTestCase):
+    """Sélection des backends et comparaison des détections"""
+
+    def test_backend_weights_paths(self):
+        self.assertEqual(get_backend('onnx', '/m/best.pt').weights_path(), '/m/best.onnx')
+        self.assertEqual(get_backend('onnx', '/m/best.pt', int8=True).weights_path(), '/m/best_int8.onnx')
+        self.assertEqual(get_backend('openvino', '/m/best.pt').weights_path(), '/m/best_openvino_model')
+        with self.assertRaises(ValueError):
+            get_backend('torch', '/m/best.pt', int8=True)
+
+    def test_model_version_includes_backend(self):
+        detector = YOLOv8SignDetector('/chemin/inexistant/best.pt', backend='onnx', int8=True)
+        self.assertEqual(detector.model_version, 'unknown-onnx-int8')
+
+    def test_compare_detections_tolerance(self):
+        reference = [{'class': 'oui', 'confidence': 0.9, 'bbox': {'x': 0, 'y': 0, 'width': 100, 'height': 100}}]
+        close = [{'class': 'oui', 'confidence': 0.89, 'bbox': {'x': 1, 'y': 1, 'width': 100, 'height': 100}}]
+        shifted = [{'class': 'oui', 'confidence': 0.9, 'bbox': {'x': 30, 'y': 0, 'width': 100, 'height': 100}}]
+        self.assertTrue(compare_detections(reference, close, TOLERANCES['fp32'])['within_tolerance'])
+        self.assertFalse(compare_detections(reference, shifted, TOLERANCES['fp32'])['within_tolerance'])
+        self.assertFalse(compare_detections(reference, [], TOLERANCES['int8'])['within_tolerance'])
+
+
+class PostProcessingTests(SimpleTestCase):
+    """Post-traitement vectorisé des résultats YOLOv8"""
+
+    def setUp(self):
+        self.detector = YOLOv8SignDetector('/chemin/inexistant/best.pt')
+        self.results = [
+            FakeResults([[10, 20, 50, 80], [0, 0, 5, 5]], [0.9, 0.4], [3, 99]),
+            FakeResults([], [], []),
+            FakeResults([[1, 2, 3, 4]], [0.7], [0]),
+        ]
+
+    def test_result_list_is_not_dropped(self):
+        detections = self.detector._process_results(self.results)
+        self.assertEqual([d['class'] for d in detections], ['oui', '99', 'bonjour'])
+        self.assertEqual(detections[0]['bbox'], {'x': 10.0, 'y': 20.0, 'width': 40.0, 'height': 60.0})
+        self.assertAlmostEqual(detections[0]['confidence'], 0.9, places=6)
+        self.assertTrue(all(d['frame'] == 0 for d in detections))
+
+    def test_batch_is_split_per_image(self):
+        arrays = self.detector._results_to_arrays(self.results)
+        per_image = arrays.to_dicts(self.detector.class_lookup, num_images=3)
+        self.assertEqual([len(d) for d in per_image], [2, 0, 1])
+        self.assertEqual(per_image[2][0]['class'], 'bonjour')
+
+
+class CameraWebSocketTests(SimpleTestCase):
+    """Canal WebSocket de la caméra"""
+
+    def _communicator(self, path='/ws/camera/'):
+        return ApplicationCommunicator(websocket_application, {
+            'type': 'websocket', 'path': path, 'headers': [],
+        })
+
+    async def test_frame_round_trip(self):
+        detections = [{'class': 'merci', 'confidence': 0.8, 'frame': 0,
+                       'bbox': {'x': 10.0, 'y': 10.0, 'width': 20.0, 'height': 20.0}}]
+        with mock.patch.object(scheduler, 'detect_signs_image', return_value=detections):
+            communicator = self._communicator()
+            await communicator.send_input({'type': 'websocket.connect'})
+            self.assertEqual((await communicator.receive_output(1))['type'], 'websocket.accept')
+
+            frame = cv2.imencode('.jpg', np.zeros((48, 64, 3), np.uint8))[1].tobytes()
+            await communicator.send_input({'type': 'websocket.receive', 'bytes': frame})
+            message = await communicator.receive_output(2)
+            payload = json.loads(message['text'])
+            self.assertTrue(payload['success'])
+            self.assertEqual(payload['data']['translated_text'], 'Merci')
+            self.assertIn('interval_ms', payload['data']['capture_hints'])
+
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(1)
+
+    async def test_stale_frames_are_dropped(self):
+        slot = LatestFrameSlot()
+        for frame in (b'1', b'2', b'3'):
+            slot.put(frame)
+        self.assertEqual(await slot.get(), b'3')
+        self.assertEqual((slot.received, slot.dropped), (3, 2))
+
+    async def test_unknown_path_is_closed(self):
+        communicator = self._communicator('/ws/inconnu/')
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await communicator.receive_output(1))['code'], 4404)
+
+
+class CameraSessionTests(SimpleTestCase):
+    """Porte de mouvement, lissage et transcription d'une session caméra"""
+
+    def setUp(self):
+        self.session = CameraSession(translate=TRANSLATION_MAP.get, motion_threshold=4.0, smoothing_window=3)
+        self.calls = 0
+
+    def _infer(self, sign):
+        def infer(image):
+            self.calls += 1
+            return [{'class': sign, 'confidence': 0.9, 'bbox': {}, 'frame': 0}]
+        return infer
+
+    def test_static_frames_skip_inference(self):
+        frame = np.full((48, 64, 3), 100, np.uint8)
+        for _ in range(5):
+            data = self.session.process(frame, self._infer('oui'))
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(data['inference_skipped'])
+        self.assertEqual(data['transcript'], 'Oui')
+
+        data = self.session.process(np.full((48, 64, 3), 200, np.uint8), self._infer('non'))
+        self.assertEqual(self.calls, 2)
+        self.assertFalse(data['inference_skipped'])
+
+    def test_transcript_needs_a_stable_sign(self):
+        frames = [np.full((48, 64, 3), value, np.uint8) for value in (0, 60, 120, 180, 240)]
+        signs = ['oui', 'non', 'oui', 'oui', 'merci']
+        for frame, sign in zip(frames, signs):
+            data = self.session.process(frame, self._infer(sign))
+        self.assertEqual(data['transcript'], 'Oui')
+        self.assertEqual(self.calls, 5)
+
+
+class ROITrackerTests(SimpleTestCase):
+    """Recadrage autour des mains et retour à la frame complète"""
+
+    def setUp(self):
+        self.tracker = ROITracker(input_size=320, padding=0.5, refresh_interval=3, min_confidence=0.5)
+        self.frame = np.zeros((640, 960, 3), np.uint8)
+        self.inputs = []
+
+    def _infer(self, bbox, confidence=0.9):
+        def infer(image, imgsz=None):
+            self.inputs.append((image.shape[:2], imgsz))
+            return [{'class': 'oui', 'confidence': confidence, 'frame': 0,
+                     'bbox': dict(zip(('x', 'y', 'width', 'height'), bbox))}]
+        return infer
+
+    def test_crop_is_resized_and_boxes_mapped_back(self):
+        self.tracker.detect(self.frame, self._infer((100, 100, 200, 200)))
+        self.assertEqual(self.inputs[-1], ((640, 960), None))
+
+        # Région (0, 0, 400, 400) réduite à 320 px : facteur 0,8
+        detections = self.tracker.detect(self.frame, self._infer((80, 80, 160, 160)))
+        self.assertEqual(self.inputs[-1], ((320, 320), 320))
+        self.assertEqual(self.tracker.last_region, (0, 0, 400, 400))
+        self.assertEqual(
+            detections[0]['bbox'],
+            {'x': 100.0, 'y': 100.0, 'width': 200.0, 'height': 200.0}
+        )
+
+    def test_low_confidence_and_refresh_fall_back_to_full_frame(self):
+        self.tracker.detect(self.frame, self._infer((300, 200, 40, 40)))
+        self.tracker.detect(self.frame, self._infer((20, 20, 40, 40), confidence=0.2))
+        self.tracker.detect(self.frame, self._infer((300, 200, 40, 40)))
+        self.assertEqual([size for _, size in self.inputs], [None, 320, None])
+
+        for _ in range(4):
+            self.tracker.detect(self.frame, self._infer((20, 20, 40, 40)))
+        self.assertEqual([size for _, size in self.inputs[3:]], [320, 320, 320, None])
+        self.assertEqual(self.tracker.get_stats()['full_frames'], 3)
+
+
+class CaptureAdvisorTests(SimpleTestCase):
+    """Consignes de capture selon la charge"""
+
+    def setUp(self):
+        self.advisor = CaptureAdvisor(target_latency_ms=100, min_interval_ms=200,
+                                      max_interval_ms=2000, batch_size=8, smoothing=0.5)
+
+    def test_idle_server_keeps_full_quality(self):
+        self.advisor.observe(0.02)
+        hints = self.advisor.hints(queue_depth=0)
+        self.assertEqual(hints, {'max_dimension': 960, 'jpeg_quality': 0.85, 'interval_ms': 200, 'load': 0})
+
+    def test_load_reduces_resolution_and_rate(self):
+        self.advisor.observe(0.1)
+        self.advisor.observe(0.3)
+        self.assertAlmostEqual(self.advisor.latency, 0.2)
+
+        hints = self.advisor.hints(queue_depth=8)
+        self.assertEqual(hints['load'], 2)
+        self.assertEqual(hints['max_dimension'], 480)
+        self.assertEqual(hints['interval_ms'], 800)
+
+        self.assertEqual(self.advisor.hints(queue_depth=200)['interval_ms'], 2000)
+
+
+class BenchmarkSuiteTests(TestCase):
+    """La suite de benchmarks produit un rapport JSON comparable"""
+
+    def test_report_is_json_and_comparable(self):
+        report = run_benchmarks(sizes=[5], repeat=1, requests=1, isolate_db=False)
+        report = json.loads(json.dumps(report))
+
+        keys = {(entry['benchmark'], entry.get('variant')) for entry in report['results']}
+        self.assertEqual(keys, {
+            ('process_results', None), ('translate_signs_to_text', None),
+            ('process_camera', 'stateless'), ('process_camera', 'session'),
+            ('upload_file', 'miss'), ('upload_file', 'cached'),
+            ('save_translation_result', 'rows'), ('save_translation_result', 'packed'),
+        })
+
+        rows = compare_reports(report, report)
+        self.assertEqual(len(rows), len(report['results']))
+        self.assertFalse(any(row['regression'] for row in rows))
+
+    def test_failed_inference_fails_the_benchmark(self):
+        # process_file_with_ai intercepte l'erreur : la vue répond success=True sans détection
+        with mock.patch.object(StubSignDetector, 'detect_signs_batch', side_effect=RuntimeError('panne')):
+            with self.assertRaisesMessage(AssertionError, 'Requête en échec'):
+                run_benchmarks(sizes=[5], repeat=1, requests=1, isolate_db=False)
+
+
+class MetricsTests(TestCase):
+    """Histogrammes par étape et export Prometheus"""
+
+    def test_quantiles_and_disabled_registry(self):
+        registry = MetricsRegistry()
+        for value in range(1, 101):
+            registry.observe('inference', value / 1000)
+        quantiles = registry.stage_quantiles('inference')
+        self.assertEqual((quantiles[0.5], quantiles[0.95], quantiles[0.99]), (0.051, 0.096, 0.1))
+        self.assertIn('signvision_stage_duration_seconds_bucket{stage="inference",le="0.05"} 50', registry.render())
+
+        disabled = MetricsRegistry(enabled=False)
+        with disabled.timer('inference'):
+            pass
+        self.assertIsNone(disabled.stage_quantiles('inference'))
+
+    def test_endpoint_reports_stages_and_requests(self):
+        metrics.reset()
+        with stub_pipeline():
+            frame = SimpleUploadedFile('frame.jpg', make_jpeg(), 'image/jpeg')
+            self.client.post('/process_camera/', {'camera_frame': frame})
+            self.client.post('/process_camera/', {})
+
+        response = self.client.get('/api/metrics/')
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        # Le détecteur factice remplace inférence et post-traitement
+        for stage in ('decode', 'queue_wait', 'translate'):
+            self.assertIn(f'signvision_stage_duration_seconds_count{{stage="{stage}"}}', text)
+        self.assertIn('signvision_requests_total{view="process_camera"} 2', text)
+        self.assertIn('signvision_request_errors_total{view="process_camera"} 1', text)
+        self.assertIn('signvision_inference_queue_depth 0', text)
+
+
+@override_settings(SIGNVISION_PROFILING_TOKEN='jeton', SIGNVISION_PROFILING_ENABLED=False)
+class ProfilingTests(TestCase):
+    """Profilage à la demande et téléchargement des profils"""
+
+    def setUp(self):
+        profile_store.clear()
+
+    def _post_frame(self, **headers):
+        frame = SimpleUploadedFile('frame.jpg', make_jpeg(), 'image/jpeg')
+        return self.client.post('/process_camera/', {'camera_frame': frame}, **headers)
+
+    def test_header_forces_profiling(self):
+        with stub_pipeline():
+            self.assertFalse(self._post_frame().has_header('X-SignVision-Profiled'))
+            self.assertFalse(self._post_frame(HTTP_X_SIGNVISION_PROFILE='faux').has_header('X-SignVision-Profiled'))
+            response = self._post_frame(HTTP_X_SIGNVISION_PROFILE='jeton')
+        self.assertEqual(response['X-SignVision-Profiled'], 'process_camera')
+        self.assertEqual(profile_store.views(), ['process_camera'])
+
+    def test_profiles_are_downloadable_by_staff_only(self):
+        with stub_pipeline(), override_settings(SIGNVISION_PROFILING_ENABLED=True, SIGNVISION_PROFILING_SAMPLE_RATE=1.0):
+            self._post_frame()
+            self._post_frame()
+
+        self.assertEqual(self.client.get('/api/profiles/').status_code, 403)
+
+        with override_settings(DEBUG=True):
+            summary = self.client.get('/api/profiles/').json()['data']
+            self.assertEqual(summary['process_camera']['requests'], 2)
+
+            response = self.client.get(summary['process_camera']['downloads']['pstats'])
+            with tempfile.NamedTemporaryFile(suffix='.pstats') as dump:
+                dump.write(response.content)
+                dump.flush()
+                self.assertGreater(pstats.Stats(dump.name).total_calls, 0)
+
+            collapsed = self.client.get('/api/profiles/process_camera.collapsed')
+            self.assertEqual(collapsed.status_code, 200)
+            self.assertTrue(collapsed['Content-Type'].startswith('text/plain'))
+            self.assertEqual(self.client.get('/api/profiles/upload_file.pstats').status_code, 404)
+
+    def test_sampler_follows_threads_started_later(self):
+        sampler = StackSampler({}, thread_prefix='signvision-')
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait, name='signvision-pipeline-infer-0')
+        thread.start()
+        try:
+            sampler.sample()
+        finally:
+            stop.set()
+            thread.join()
+        self.assertTrue(any(stack.startswith('signvision-pipeline-infer-0;') for stack in sampler.stacks))
+
+    def test_streamed_response_is_profiled_while_consumed(self):
+        with stub_pipeline():
+            response = self.client.post(
+                '/api/batch/', {'images': SimpleUploadedFile('a.jpg', make_jpeg(1, (48, 64)), 'image/jpeg')},
+                HTTP_X_SIGNVISION_PROFILE='jeton'
+            )
+            self.assertEqual(response['X-SignVision-Profiled'], 'process_batch')
+            # Rien n'est enregistré avant la lecture du flux
+            self.assertEqual(profile_store.views(), [])
+            lines = b''.join(response.streaming_content).splitlines()
+            response.close()
+
+        self.assertEqual(json.loads(lines[-1])['type'], 'done')
+        functions = {name for _, _, name in marshal.loads(profile_store.pstats_bytes('process_batch'))}
+        self.assertIn('analyze_image_batch', functions)
+
+        # Le verrou est libéré : une nouvelle requête peut être profilée
+        with stub_pipeline():
+            self.assertEqual(self._post_frame(HTTP_X_SIGNVISION_PROFILE='jeton')['X-SignVision-Profiled'], 'process_camera')
+
+
+def reference_translation(detections):
+    """Traduction historique (listes Python), référence du traducteur incrémental"""
+    if not detections:
+        return "Aucun signe détecté"
+    frame_signs = {}
+    for detection in detections:
+        frame_signs.setdefault(detection['frame'], []).append(detection)
+    signs = []
+    for frame in sorted(frame_signs):
+        best = max(frame_signs[frame], key=lambda x: x['confidence'])
+        if best['confidence'] > 0.6:
+            signs.append(best['class'])
+    filtered = [sign for i, sign in enumerate(signs) if i == 0 or sign != signs[i - 1]]
+    return " ".join(TRANSLATION_MAP.get(sign, sign) for sign in filtered)
+
+
+class StreamingTranslatorTests(SimpleTestCase):
+    """Le traducteur incrémental donne le même texte que la version historique"""
+
+    def setUp(self):
+        self.detector = YOLOv8SignDetector('/chemin/inexistant/best.pt')
+
+    def _detections(self, seed, count=400):
+        rng = np.random.default_rng(seed)
+        classes = self.detector.sign_classes[:4] + ['inconnu']
+        frames = np.sort(rng.integers(0, count // 3, size=count))
+        return [
+            {
+                'class': classes[rng.integers(len(classes))],
+                # Confiances arrondies : nombreuses égalités dans une frame
+                'confidence': float(rng.choice([0.5, 0.61, 0.7, 0.9])),
+                'bbox': {}, 'frame': int(frame),
+            }
+            for frame in frames
+        ]
+
+    def test_matches_reference_in_one_call(self):
+        for seed in range(5):
+            detections = self._detections(seed)
+            np.random.default_rng(seed).shuffle(detections)
+            self.assertEqual(self.detector.translate_signs_to_text(detections), reference_translation(detections))
+        self.assertEqual(self.detector.translate_signs_to_text([]), "Aucun signe détecté")
+
+    def test_matches_reference_chunk_by_chunk(self):
+        for seed in range(5):
+            detections = self._detections(seed)
+            translator = self.detector.streaming_translator()
+            # Des morceaux de tailles variées coupent des frames en deux
+            for start in range(0, len(detections), 7 + seed):
+                translator.feed(detections[start:start + 7 + seed])
+            self.assertEqual(translator.finish(), reference_translation(detections))
+
+    def test_rejects_frames_going_backwards(self):
+        translator = self.detector.streaming_translator()
+        translator.feed([{'class': 'oui', 'confidence': 0.9, 'frame': 5}])
+        with self.assertRaises(ValueError):
+            translator.feed([{'class': 'non', 'confidence': 0.9, 'frame': 4}])
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    # Redirections de test vers la vidéo : même hôte ou via « localhost »
+    REDIRECTS = {
+        '/redirect-relative': '/video.avi',
+        '/redirect-localhost': 'http://localhost:{port}/video.avi',
+    }
+
+    def do_GET(self):
+        if self.path in self.REDIRECTS:
+            self.send_response(302)
+            self.send_header('Location', self.REDIRECTS[self.path].format(port=self.server.server_address[1]))
+            self.end_headers()
+            return
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+# Le serveur de test écoute sur 127.0.0.1, refusé par défaut (SSRF)
+@override_settings(SIGNVISION_URL_ALLOW_PRIVATE_NETWORKS=True)
+class RemoteVideoTests(SimpleTestCase):
+    """process_url télécharge la vidéo en flux depuis un serveur HTTP local"""
+
+    FRAMES = 24
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp(prefix='signvision-remote-')
+        writer = cv2.VideoWriter(
+            os.path.join(cls.directory, 'video.avi'), cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48)
+        )
+        for index in range(cls.FRAMES):
+            # Le stub choisit la classe d'après le pixel (0, 0)
+            writer.write(np.full((48, 64, 3), 60 * (index // 8), dtype=np.uint8))
+        writer.release()
+
+        handler = functools.partial(_QuietHandler, directory=cls.directory)
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def _events(self, url):
+        response = self.client.post('/process_url/', {'video_url': url})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    @override_settings(SIGNVISION_VIDEO_BATCH_SIZE=4, SIGNVISION_VIDEO_TARGET_FPS=None,
+                       SIGNVISION_URL_CHUNK_SIZE=1024)
+    def test_streams_every_detection(self):
+        with stub_pipeline() as detector:
+            events = self._events(f'{self.base_url}/video.avi')
+
+        self.assertEqual(events[0]['type'], 'start')
+        batches = [event for event in events if event['type'] == 'detections']
+        self.assertEqual(len(batches), self.FRAMES // 4)
+        frames = [d['frame'] for event in batches for d in event['detections']]
+        self.assertEqual(frames, list(range(self.FRAMES)))
+
+        result = events[-1]
+        self.assertEqual(result['type'], 'result')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['detections_count'], self.FRAMES)
+        detections = [d for event in batches for d in event['detections']]
+        self.assertEqual(result['translated_text'], detector.translate_signs_to_text(detections))
+        self.assertTrue(result['translated_text'].startswith(batches[-1]['partial_text']))
+
+    @override_settings(SIGNVISION_URL_MAX_BYTES=2048)
+    def test_rejects_oversized_video(self):
+        with stub_pipeline():
+            events = self._events(f'{self.base_url}/video.avi')
+        self.assertEqual(events[-1]['type'], 'error')
+        self.assertIn('volumineuse', events[-1]['error'])
+
+    def test_reports_http_errors(self):
+        with stub_pipeline():
+            events = self._events(f'{self.base_url}/absente.avi')
+        self.assertEqual([event['type'] for event in events], ['error'])
+        self.assertIn('404', events[0]['error'])
+
+    @override_settings(SIGNVISION_URL_ALLOW_PRIVATE_NETWORKS=False)
+    def test_refuses_private_addresses(self):
+        with stub_pipeline():
+            events = self._events(f'{self.base_url}/video.avi')
+        self.assertEqual([event['type'] for event in events], ['error'])
+        self.assertIn('Adresse non autorisée', events[0]['error'])
+
+        for url in ('http://localhost/', 'http://10.1.2.3/', 'http://169.254.169.254/latest/meta-data/',
+                    'http://[::1]/', 'http://[::ffff:127.0.0.1]/', 'http://0.0.0.0/', 'file:///etc/passwd'):
+            with self.assertRaises(DownloadError, msg=url):
+                check_url(url)
+        check_url('http://127.0.0.1/', allow_private=True)
+
+    @override_settings(SIGNVISION_URL_ALLOWED_HOSTS=['127.0.0.1'])
+    def test_redirects_are_checked(self):
+        with stub_pipeline():
+            self.assertEqual(self._events(f'{self.base_url}/redirect-relative')[-1]['type'], 'result')
+            events = self._events(f'{self.base_url}/redirect-localhost')
+        self.assertEqual([event['type'] for event in events], ['error'])
+        self.assertIn('Hôte non autorisé: localhost', events[0]['error'])
+
+
+class ChunkedUploadTests(TestCase):
+    """Upload en morceaux : reprise, empreinte incrémentale et validation"""
+
+    def _create(self, content, name='video.avi'):
+        response = self.client.post(
+            '/api/uploads/', json.dumps({'filename': name, 'size': len(content)}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['data']
+
+    def _send(self, upload, offset, chunk):
+        return self.client.patch(
+            upload['upload_url'], chunk, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    @override_settings(SIGNVISION_ASYNC_UPLOADS=False)
+    def test_resumes_and_commits(self):
+        content = make_jpeg(3)
+        with stub_pipeline():
+            upload = self._create(content, 'photo.jpg')
+            self.assertEqual(self._send(upload, 0, content[:1000])['Upload-Offset'], '1000')
+
+            # Morceau renvoyé après une coupure : l'offset est refusé et corrigé
+            response = self._send(upload, 0, content[:1000])
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()['offset'], 1000)
+
+            # Commit prématuré refusé
+            self.assertEqual(self.client.post(upload['commit_url']).status_code, 409)
+
+            # Reprise par un autre worker : l'empreinte est reconstruite depuis le disque
+            chunked._forget_hash_state(upload['upload_id'])
+            self.assertEqual(self._send(upload, 1000, content[1000:]).json()['data']['offset'], len(content))
+            self.assertEqual(self.client.get(upload['upload_url']).json()['data']['offset'], len(content))
+
+            result = self.client.post(upload['commit_url']).json()
+            self.assertTrue(result['success'], result)
+            self.assertEqual(len(result['data']['detections']), 1)
+
+            file_instance = UploadedFile.objects.get()
+            self.assertEqual(file_instance.content_hash, hashlib.sha256(content).hexdigest())
+            self.assertEqual(file_instance.file.read(), content)
+            file_instance.file.close()
+            self.assertEqual(UploadSession.objects.get().status, UploadSession.COMMITTED)
+            self.assertFalse(os.listdir(chunked.upload_directory()))
+
+            # Une session validée n'accepte plus de morceaux ; une validation
+            # répétée renvoie le résultat de la première sans retraitement
+            self.assertEqual(self._send(upload, len(content), b'x').status_code, 409)
+            repeated = self.client.post(upload['commit_url']).json()
+            self.assertEqual(repeated['data']['result_id'], file_instance.translations.get().id)
+            self.assertEqual(repeated['data']['detections'], result['data']['detections'])
+            self.assertEqual(UploadedFile.objects.count(), 1)
+
+    def _complete(self, content, name='photo.jpg'):
+        upload = self._create(content, name)
+        self.assertEqual(self._send(upload, 0, content).status_code, 200)
+        return upload
+
+    def test_concurrent_commit_is_refused(self):
+        with stub_pipeline():
+            upload = self._complete(make_jpeg(3))
+            session = UploadSession.objects.get()
+            partial_file, _ = chunked.finish_session(session)
+            partial_file.close()
+            self.assertEqual(UploadSession.objects.get().status, UploadSession.COMMITTING)
+
+            # Seconde validation pendant le traitement de la première
+            with self.assertRaisesMessage(chunked.ChunkedUploadError, 'Validation déjà en cours'):
+                chunked.finish_session(UploadSession.objects.get())
+            response = self.client.post(upload['commit_url'])
+            self.assertEqual(response.status_code, 409)
+            self.assertFalse(UploadedFile.objects.exists())
+
+    def test_repeated_async_commit_returns_the_same_job(self):
+        with stub_pipeline(), mock.patch.object(job_queue, 'enqueue'):
+            upload = self._complete(make_jpeg(3))
+            first = self.client.post(upload['commit_url'])
+            second = self.client.post(upload['commit_url'])
+        self.assertEqual((first.status_code, second.status_code), (202, 202))
+        self.assertEqual(first.json()['data']['job_id'], second.json()['data']['job_id'])
+        self.assertEqual((UploadedFile.objects.count(), ProcessingJob.objects.count()), (1, 1))
+
+    @override_settings(SIGNVISION_ASYNC_UPLOADS=False)
+    def test_failed_commit_reopens_or_deletes_the_session(self):
+        content = make_jpeg(3)
+        with stub_pipeline():
+            # Échec avant le déplacement du fichier partiel : nouvel essai possible
+            upload = self._complete(content)
+            with mock.patch('translator.views._start_processing', side_effect=RuntimeError('panne')):
+                self.assertFalse(self.client.post(upload['commit_url']).json()['success'])
+            self.assertEqual(UploadSession.objects.get().status, UploadSession.OPEN)
+            self.assertTrue(self.client.post(upload['commit_url']).json()['success'])
+            self.assertEqual(UploadSession.objects.get().status, UploadSession.COMMITTED)
+
+            # Échec après le déplacement : la session, inutilisable, est supprimée
+            upload = self._complete(content)
+
+            def moved_then_failed(request, uploaded_file, *args):
+                os.remove(uploaded_file.temporary_file_path())
+                raise RuntimeError('panne')
+
+            with mock.patch('translator.views._start_processing', side_effect=moved_then_failed):
+                self.assertFalse(self.client.post(upload['commit_url']).json()['success'])
+            self.assertFalse(UploadSession.objects.filter(pk=upload['upload_id']).exists())
+            self.assertEqual(self.client.post(upload['commit_url']).status_code, 404)
+
+    def test_rejects_invalid_requests(self):
+        response = self.client.post('/api/uploads/', {'filename': 'notes.txt', 'size': 10})
+        self.assertEqual(response.status_code, 400)
+
+        with stub_pipeline(), override_settings(SIGNVISION_CHUNKED_UPLOAD_MAX_CHUNK=16):
+            upload = self._create(b'x' * 64)
+            self.assertEqual(self._send(upload, 0, b'x' * 32).status_code, 413)
+            self.assertEqual(self._send(upload, 0, b'x' * 16).status_code, 200)
+            # Au-delà de la taille annoncée
+            self.assertEqual(self._send(upload, 16, b'x' * 16).status_code, 200)
+            self.assertEqual(self._send(upload, 32, b'x' * 16).status_code, 200)
+            self.assertEqual(self._send(upload, 48, b'x' * 16).status_code, 200)
+            self.assertEqual(self._send(upload, 64, b'x').status_code, 413)
+
+
+def make_rotated_jpeg(width=1600, height=1200, orientation=6):
+    """JPEG paysage dont l'EXIF demande une rotation (portrait une fois orienté)"""
+    from PIL import Image
+
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (7, 0, 0)).save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class ImageDerivativeTests(TestCase):
+    """Les images reçoivent un dérivé orienté et une vignette à l'upload"""
+
+    def test_derivatives_apply_exif_orientation(self):
+        from PIL import Image
+
+        derivatives = build_derivatives(io.BytesIO(make_rotated_jpeg()), max_size=640, thumbnail_size=160)
+        self.assertEqual(derivatives.original_size, (1200, 1600))
+        self.assertEqual(Image.open(io.BytesIO(derivatives.derivative)).size, (480, 640))
+        self.assertEqual(Image.open(io.BytesIO(derivatives.thumbnail)).size, (120, 160))
+        self.assertAlmostEqual(derivatives.scale, 2.5)
+
+    @override_settings(SIGNVISION_ASYNC_UPLOADS=False)
+    def test_upload_infers_on_original_and_reprocesses_derivative(self):
+        upload = SimpleUploadedFile('photo.jpg', make_rotated_jpeg(), content_type='image/jpeg')
+        with stub_pipeline():
+            # Première analyse sur l'original, pas sur le JPEG recompressé
+            with mock.patch('translator.processing.scheduler.detect_signs_image',
+                            wraps=scheduler.detect_signs_image) as detect:
+                result = self.client.post('/upload/', {'media_file': upload}).json()
+            self.assertTrue(result['success'], result)
+            file_instance = UploadedFile.objects.get()
+            detect.assert_called_once_with(file_instance.file.path)
+
+            # Le stub renvoie une boîte couvrant l'image orientée
+            bbox = result['data']['detections'][0]['bbox']
+            self.assertEqual((bbox['width'], bbox['height']), (1200.0, 1600.0))
+
+            self.assertTrue(file_instance.derivative and file_instance.thumbnail)
+            history = self.client.get('/api/history/').json()['data']
+            self.assertEqual(history[0]['thumbnail_url'], file_instance.thumbnail.url)
+
+            # Nouveau modèle : le fichier est retraité depuis son dérivé
+            with mock.patch('translator.processing.scheduler.detect_signs_image',
+                            wraps=scheduler.detect_signs_image) as detect:
+                call_command('reprocess', '--all', '--workers', '1', stdout=io.StringIO())
+            detect.assert_called_once_with(file_instance.derivative.path)
+            self.assertEqual(file_instance.translations.count(), 2)
+
+
+class SegmentedVideoTests(SimpleTestCase):
+    """L'analyse par segments parallèles donne le résultat séquentiel"""
+
+    FRAMES = 45
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp(prefix='signvision-segments-')
+        cls.video_path = os.path.join(cls.directory, 'video.avi')
+        writer = cv2.VideoWriter(cls.video_path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+        for index in range(cls.FRAMES):
+            writer.write(np.full((48, 64, 3), 30 * (index // 6), dtype=np.uint8))
+        writer.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        segment_pool.shutdown()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_plan_and_merge(self):
+        self.assertEqual(plan_segments(1000, 4, 300), [(0, 334), (334, 668), (668, None)])
+        self.assertEqual(plan_segments(100, 4, 300), [(0, None)])
+        merged = merge_segments([
+            (10, None, [{'frame': 10}, {'frame': 11}]),
+            (0, 10, [{'frame': 8}, {'frame': 9}]),
+        ])
+        self.assertEqual([d['frame'] for d in merged], [8, 9, 10, 11])
+
+    def test_segments_do_not_overlap(self):
+        detector = StubSignDetector('/benchmark/best.pt')
+        engine = VideoInferenceEngine(detector, batch_size=4)
+        first = engine.detect_range(self.video_path, end_frame=20, translate=False)
+        second = engine.detect_range(self.video_path, start_frame=20, translate=False)
+        self.assertEqual([d['frame'] for d in first['detections']], list(range(20)))
+        self.assertEqual([d['frame'] for d in second['detections']], list(range(20, self.FRAMES)))
+
+    def test_segments_are_not_translated(self):
+        detector = StubSignDetector('/benchmark/best.pt')
+        for pipelined in (True, False):
+            engine = VideoInferenceEngine(detector, batch_size=4, pipelined=pipelined)
+            with mock.patch.object(detector, 'streaming_translator') as streaming, \
+                    mock.patch.object(detector, 'translate_signs_to_text') as translate:
+                result = engine.detect_range(self.video_path, start_frame=10, end_frame=20, translate=False)
+            streaming.assert_not_called()
+            translate.assert_not_called()
+            self.assertIsNone(result['translated_text'])
+            self.assertEqual(len(result['detections']), 10)
+
+    def test_parallel_matches_sequential(self):
+        detector = StubSignDetector('/benchmark/best.pt')
+        sequential = VideoInferenceEngine(detector, batch_size=4, frame_stride=2).detect(self.video_path)
+
+        progress = []
+        parallel = VideoInferenceEngine(
+            detector, batch_size=4, frame_stride=2, workers=3, min_segment_frames=10
+        ).detect(self.video_path, lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(parallel, sequential)
+        self.assertEqual([d['frame'] for d in parallel], list(range(0, self.FRAMES, 2)))
+        self.assertEqual(len(progress), 3)
+        self.assertEqual(progress[-1], (self.FRAMES, self.FRAMES))
+        self.assertEqual(
+            detector.translate_signs_to_text(parallel), detector.translate_signs_to_text(sequential)
+        )
+
+
+class PipelineTests(SimpleTestCase):
+    """Pipeline d'étapes : résultat identique, goulot et erreurs"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp(prefix='signvision-pipeline-')
+        cls.video_path = os.path.join(cls.directory, 'video.avi')
+        writer = cv2.VideoWriter(cls.video_path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+        for index in range(20):
+            writer.write(np.full((48, 64, 3), 30 * (index // 4), dtype=np.uint8))
+        writer.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_video_pipeline_matches_sequential(self):
+        detector = StubSignDetector('/benchmark/best.pt')
+        sequential = VideoInferenceEngine(detector, batch_size=3).analyze(self.video_path)
+
+        runs = pipeline_stats.get_stats()['runs']
+        metrics.reset()
+        progress = []
+        # Frames réduites de moitié pour le modèle, boîtes remises à l'échelle
+        pipelined = VideoInferenceEngine(
+            detector, batch_size=3, pipelined=True, preprocess_size=32, queue_size=2
+        ).analyze(
+            self.video_path,
+            lambda done, total: progress.append((done, total, threading.current_thread()))
+        )
+
+        self.assertEqual(pipelined['detections'], sequential['detections'])
+        self.assertEqual(pipelined['translated_text'], sequential['translated_text'])
+        self.assertEqual(progress[-1][:2], (20, 20))
+        self.assertEqual(len(progress), 7)
+        # Progression signalée depuis le thread appelant (écritures en base)
+        self.assertEqual({thread for _, _, thread in progress}, {threading.current_thread()})
+
+        stats = pipelined['pipeline']
+        self.assertEqual(set(stats['stages']), {'decode', 'preprocess', 'infer', 'postprocess'})
+        self.assertEqual(stats['stages']['infer']['items'], 20)
+        self.assertEqual(pipeline_stats.get_stats()['runs'], runs + 1)
+
+        # Temps par passage : famille distincte des durées par élément
+        text = metrics.render()
+        self.assertIn('signvision_pipeline_stage_busy_seconds_count{stage="infer"} 1', text)
+        self.assertNotIn('stage="pipeline_', text)
+
+    def test_slow_stage_is_reported_as_bottleneck(self):
+        def slow(item):
+            threading.Event().wait(0.02)
+            return item
+
+        pipeline = Pipeline('source', [
+            Stage('fast', lambda item: item * 2),
+            Stage('slow', slow),
+        ], queue_size=1)
+        self.assertEqual(list(pipeline.run(range(10))), [i * 2 for i in range(10)])
+
+        stats = pipeline.get_stats()
+        self.assertEqual(stats['bottleneck'], 'slow')
+        # Les étapes en amont attendent que l'étape lente libère la file
+        self.assertGreater(stats['stages']['fast']['output_wait_s'], 0.05)
+        self.assertGreater(stats['stages']['slow']['utilization'], stats['stages']['fast']['utilization'])
+
+    def test_stage_error_stops_pipeline(self):
+        def fail(item):
+            if item == 3:
+                raise ValueError('frame illisible')
+            return item
+
+        pipeline = Pipeline('source', [Stage('check', fail)], queue_size=1)
+        with self.assertRaisesMessage(ValueError, 'frame illisible'):
+            list(pipeline.run(range(100)))
+        self.assertFalse(any(t.name.startswith('signvision-pipeline') for t in threading.enumerate()))
+
+
+def make_zip(entries) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@override_settings(SIGNVISION_BATCH_IN_FLIGHT=2)
+class BatchTests(TestCase):
+    """Lots d'images : une ligne NDJSON par image, enregistrement groupé"""
+
+    def post_batch(self, images=(), archive=None):
+        data = {'images': [SimpleUploadedFile(name, content, content_type='image/jpeg') for name, content in images]}
+        if archive is not None:
+            data['archive'] = SimpleUploadedFile('lot.zip', archive, content_type='application/zip')
+        response = self.client.post('/api/batch/', data)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_images_and_zip_are_persisted_at_the_end(self):
+        archive = make_zip([
+            ('lot/c.jpg', make_jpeg(3, (48, 64))),
+            ('lot/d.png', cv2.imencode('.png', np.full((48, 64, 3), 4, dtype=np.uint8))[1].tobytes()),
+            ('lot/e.jpg', make_jpeg(5, (48, 64))),
+            ('lot/notes.txt', b'pas une image'),
+            ('__MACOSX/lot/._c.jpg', b'metadonnees'),
+        ])
+        with stub_pipeline() as detector, \
+                mock.patch('translator.batch.save_translation_results',
+                           wraps=processing.save_translation_results) as save:
+            events = self.post_batch([('a.jpg', make_jpeg(1, (48, 64))), ('b.jpg', make_jpeg(2, (48, 64)))], archive)
+
+            self.assertEqual(events[0], {'type': 'start', 'files': 5})
+            results = events[1:-1]
+            self.assertEqual(sorted(event['index'] for event in results), list(range(5)))
+            self.assertEqual(sorted(event['name'] for event in results), ['a.jpg', 'b.jpg', 'c.jpg', 'd.png', 'e.jpg'])
+            for event in results:
+                self.assertEqual(event['type'], 'result')
+                self.assertEqual(event['translated_text'], detector.translate_signs_to_text(event['detections']))
+
+            done = events[-1]
+            self.assertEqual((done['type'], done['processed'], done['cached'], done['failed']), ('done', 5, 0, 0))
+            save.assert_called_once()
+            self.assertEqual(TranslationResult.objects.count(), 5)
+            self.assertEqual(SignDetection.objects.count(), 5)
+            self.assertEqual(
+                sorted(result['result_id'] for result in done['results']),
+                sorted(TranslationResult.objects.values_list('id', flat=True))
+            )
+
+            # Même archive renvoyée : tout vient du cache, rien n'est ré-enregistré
+            events = self.post_batch(archive=archive)
+            self.assertTrue(all(event['cached'] for event in events[1:-1]))
+            self.assertEqual((events[-1]['processed'], events[-1]['cached']), (0, 3))
+            self.assertEqual(UploadedFile.objects.count(), 5)
+
+    def test_unreadable_image_does_not_stop_the_batch(self):
+        with stub_pipeline():
+            events = self.post_batch([('ok.jpg', make_jpeg(1, (48, 64))), ('broken.jpg', b'pas du jpeg')])
+
+        by_name = {event['name']: event for event in events[1:-1]}
+        self.assertTrue(by_name['ok.jpg']['success'])
+        self.assertEqual((by_name['broken.jpg']['type'], by_name['broken.jpg']['success']), ('error', False))
+        self.assertEqual((events[-1]['processed'], events[-1]['failed']), (1, 1))
+        # Le résultat en erreur est enregistré sans version, comme pour /upload/
+        self.assertEqual(TranslationResult.objects.filter(model_version='').count(), 1)
+
+    def test_invalid_batches_are_rejected(self):
+        response = self.client.post('/api/batch/', {
+            'images': SimpleUploadedFile('clip.mp4', b'video', content_type='video/mp4')
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+
+        with override_settings(SIGNVISION_BATCH_MAX_FILES=1):
+            response = self.client.post('/api/batch/', {'archive': SimpleUploadedFile(
+                'lot.zip', make_zip([('a.jpg', b'1'), ('b.jpg', b'2')]), content_type='application/zip'
+            )})
+        self.assertEqual(response.status_code, 413)
+
+    def test_total_uncompressed_size_is_capped(self):
+        archive = make_zip([('a.jpg', make_jpeg(1, (48, 64))), ('b.jpg', make_jpeg(2, (48, 64)))])
+        with override_settings(SIGNVISION_BATCH_MAX_TOTAL_BYTES=len(make_jpeg(1, (48, 64))) + 1):
+            response = self.client.post('/api/batch/', {
+                'archive': SimpleUploadedFile('lot.zip', archive, content_type='application/zip')
+            })
+        self.assertEqual(response.status_code, 413)
+
+    def test_duplicates_in_a_batch_are_stored_and_analyzed_once(self):
+        image = make_jpeg(1, (48, 64))
+        with stub_pipeline(), mock.patch.object(scheduler, 'submit', wraps=scheduler.submit) as submit:
+            events = self.post_batch([('a.jpg', image), ('copie.jpg', image), ('b.jpg', make_jpeg(120, (48, 64)))])
+            stored = stored_files()
+
+        self.assertEqual((events[-1]['processed'], events[-1]['failed']), (3, 0))
+        self.assertEqual(submit.call_count, 2)
+        first, copy = UploadedFile.objects.filter(original_name__in=['a.jpg', 'copie.jpg']).order_by('original_name')
+        self.assertEqual((first.file.name, first.thumbnail.name), (copy.file.name, copy.thumbnail.name))
+        # Original, dérivé et vignette pour chacun des deux contenus
+        self.assertEqual(len(stored), 6)
+
+    def test_failed_save_and_disconnect_leave_no_files(self):
+        image = make_jpeg(1, (48, 64))
+        with stub_pipeline():
+            # Contenu déjà en base : ses fichiers sont partagés et conservés
+            self.post_batch([('ancien.jpg', image)])
+            kept = stored_files()
+
+            with mock.patch('translator.batch.save_translation_results', side_effect=RuntimeError('base')):
+                events = self.post_batch([('a.jpg', image), ('b.jpg', make_jpeg(120, (48, 64)))])
+            self.assertEqual((events[-1]['type'], events[-1]['success']), ('error', False))
+            self.assertEqual(stored_files(), kept)
+
+            # Client déconnecté après le premier résultat
+            archive = make_zip([(f'{index}.jpg', make_jpeg(60 * index + 30, (48, 64))) for index in range(4)])
+            items = collect_batch_items([], [SimpleUploadedFile('lot.zip', archive)])
+            events = analyze_image_batch(items)
+            next(events)
+            self.assertEqual(next(events)['type'], 'result')
+            self.assertNotEqual(stored_files(), kept)
+            events.close()
+            self.assertEqual(stored_files(), kept)
+            self.assertIsNone(items[0].archive.fp)
+
+        self.assertEqual(UploadedFile.objects.count(), 1)
+
+    def test_archives_are_closed(self):
+        archive = make_zip([('a.jpg', make_jpeg(1, (48, 64)))])
+        items = collect_batch_items([], [SimpleUploadedFile('lot.zip', archive)])
+        with stub_pipeline():
+            list(analyze_image_batch(items))
+        self.assertIsNone(items[0].archive.fp)
+
+        # Archive sans image, ou lot refusé : fermées tout de suite
+        empty = make_zip([('a.txt', b'')])
+        with mock.patch('translator.batch.zipfile.ZipFile.close', autospec=True) as close:
+            self.assertEqual(collect_batch_items([], [SimpleUploadedFile('vide.zip', empty)]), [])
+            self.assertEqual(close.call_count, 1)
+            with override_settings(SIGNVISION_BATCH_MAX_FILES=0):
+                with self.assertRaises(BatchError):
+                    collect_batch_items([], [SimpleUploadedFile('lot.zip', archive)])
+            self.assertEqual(close.call_count, 2)
+
+
+def stored_files():
+    """Chemins des fichiers présents sous MEDIA_ROOT"""
+    return sorted(
+        os.path.relpath(os.path.join(root, name), settings.MEDIA_ROOT)
+        for root, _, names in os.walk(settings.MEDIA_ROOT) for name in names
+    )
+
+
+class RecordingDetector:
+    """Détecteur factice qui enregistre la taille de chaque passe"""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    def detect_signs_batch(self, images, imgsz=None):
+        self.calls.append(len(images))
+        if self.error is not None:
+            raise self.error
+        return [[{'class': 'A', 'confidence': 0.9, 'value': int(image[0, 0, 0])}] for image in images]
+
+
+class MicroBatchSchedulerTests(SimpleTestCase):
+    """Regroupement des appels concurrents en passes du modèle"""
+
+    @staticmethod
+    def image(value):
+        return np.full((4, 4, 3), value, dtype=np.uint8)
+
+    def test_concurrent_submits_share_one_pass(self):
+        detector = RecordingDetector()
+        batcher = MicroBatchScheduler(detector, max_batch_size=8, max_wait_ms=300)
+        barrier = threading.Barrier(4)
+        results = {}
+
+        def submit(value):
+            barrier.wait()
+            results[value] = batcher.detect_signs_image(self.image(value))
+
+        threads = [threading.Thread(target=submit, args=(value,)) for value in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(detector.calls, [4])
+        # Chaque appelant reçoit les détections de sa propre image
+        self.assertEqual({value: result[0]['value'] for value, result in results.items()}, {v: v for v in range(4)})
+        self.assertEqual(batcher.get_stats()['batch_size_histogram'], {4: 1})
+
+    def test_max_batch_size_is_respected(self):
+        detector = RecordingDetector()
+        batcher = MicroBatchScheduler(detector, max_batch_size=2, max_wait_ms=50)
+        futures = [batcher.submit(self.image(value)) for value in range(5)]
+
+        self.assertEqual([future.result(timeout=5)[0]['value'] for future in futures], list(range(5)))
+        self.assertEqual(detector.calls, [2, 2, 1])
+        self.assertEqual(batcher.get_stats()['largest_batch'], 2)
+
+    def test_errors_reach_every_future(self):
+        error = RuntimeError('modèle indisponible')
+        batcher = MicroBatchScheduler(RecordingDetector(error), max_batch_size=4, max_wait_ms=100)
+        futures = [batcher.submit(self.image(value)) for value in range(3)]
+
+        for future in futures:
+            self.assertIs(future.exception(timeout=5), error)
+        self.assertEqual(batcher.get_stats()['errors'], 3)
+
+
+@override_settings(SIGNVISION_ASYNC_UPLOADS=True)
+class AsyncJobTests(TestCase):
+    """Uploads asynchrones : création du job, états et suivi"""
+
+    def submit(self, name='photo.jpg', content=None):
+        upload = SimpleUploadedFile(name, content or make_jpeg(7, (48, 64)), content_type='image/jpeg')
+        with mock.patch.object(job_queue, 'enqueue') as enqueue, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/upload/', {'media_file': upload})
+        self.assertEqual(response.status_code, 202)
+        data = response.json()['data']
+        job = ProcessingJob.objects.get(pk=data['job_id'])
+        # Le job n'est confié au pool qu'après la validation de la transaction
+        enqueue.assert_called_once_with(job)
+        return job, data
+
+    def status(self, job):
+        return self.client.get(f'/api/jobs/{job.pk}/').json()['data']
+
+    def test_job_runs_to_done(self):
+        with stub_pipeline() as detector:
+            job, data = self.submit()
+            self.assertEqual(data['status_url'], f'/api/jobs/{job.pk}/')
+            self.assertEqual(self.status(job)['status'], ProcessingJob.PENDING)
+
+            observed = []
+
+            def inspect(file_instance, progress_callback=None):
+                observed.append(self.status(job)['status'])
+                return processing.run_inference(file_instance, progress_callback)
+
+            with mock.patch('translator.jobs.run_inference', side_effect=inspect):
+                job_queue.run_job(job)
+
+            status = self.status(job)
+            self.assertEqual(observed, [ProcessingJob.RUNNING])
+            self.assertEqual(status['status'], ProcessingJob.DONE)
+            self.assertEqual(status['progress']['percent'], 100.0)
+            self.assertIsNone(status['error'])
+            self.assertEqual(status['result']['result_id'], TranslationResult.objects.get().id)
+            self.assertEqual(
+                status['result']['translated_text'],
+                detector.translate_signs_to_text(status['result']['detections'])
+            )
+
+    def test_worker_error_is_reported(self):
+        with stub_pipeline():
+            job, _ = self.submit()
+            with mock.patch('translator.jobs.run_inference', side_effect=RuntimeError('modèle indisponible')):
+                job_queue.run_job(job)
+
+        status = self.status(job)
+        self.assertEqual(status['status'], ProcessingJob.FAILED)
+        self.assertEqual(status['error'], 'modèle indisponible')
+        self.assertIsNone(status['result'])
+        self.assertFalse(TranslationResult.objects.exists())
+
+    def test_unknown_job_is_404(self):
+        response = self.client.get('/api/jobs/00000000-0000-0000-0000-000000000000/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.json()['success'])
+
+
+class ContentDeduplicationTests(TestCase):
+    """Cache des résultats par empreinte et déduplication sur le disque"""
+
+    def upload(self, content):
+        upload = SimpleUploadedFile('photo.jpg', content, content_type='image/jpeg')
+        return self.client.post('/upload/', {'media_file': upload})
+
+    @override_settings(SIGNVISION_ASYNC_UPLOADS=False)
+    def test_identical_upload_is_served_from_cache(self):
+        content = make_jpeg(11, (48, 64))
+        with stub_pipeline() as detector, \
+                mock.patch.object(detector, 'detect_signs_batch', wraps=detector.detect_signs_batch) as detect:
+            first = self.upload(content).json()['data']
+            second = self.upload(content).json()['data']
+            self.assertTrue(second['cached'])
+            self.assertEqual(second['translated_text'], first['translated_text'])
+
+            # Niveau mémoire vidé : le résultat est retrouvé en base
+            result_cache.clear()
+            db_hits = result_cache.get_stats()['db_hits']
+            third = self.upload(content).json()['data']
+            self.assertTrue(third['cached'])
+            self.assertEqual(result_cache.get_stats()['db_hits'], db_hits + 1)
+
+        self.assertEqual(detect.call_count, 1)
+        self.assertEqual(UploadedFile.objects.count(), 1)
+        self.assertEqual(third['result_id'], TranslationResult.objects.get().id)
+
+    @override_settings(SIGNVISION_ASYNC_UPLOADS=True)
+    def test_duplicate_content_reuses_stored_file(self):
+        content = make_jpeg(12, (48, 64))
+        with stub_pipeline(), mock.patch.object(job_queue, 'enqueue'):
+            self.assertEqual(self.upload(content).status_code, 202)
+            self.assertEqual(self.upload(content).status_code, 202)
+
+            first, second = UploadedFile.objects.order_by('uploaded_at', 'pk')
+            self.assertEqual(first.content_hash, second.content_hash)
+            self.assertEqual(second.file.name, first.file.name)
+            self.assertEqual(second.derivative.name, first.derivative.name)
+            self.assertEqual(os.listdir(os.path.dirname(first.file.path)), [os.path.basename(first.file.name)])
+
+
+class DetectionStorageTests(TestCase):
+    """Stockage des détections en lignes ou sous forme compacte"""
+
+    @staticmethod
+    def detections(count):
+        return [
+            {
+                'class': ('A', 'B', 'C')[index % 3],
+                'confidence': 0.5 + index % 4 * 0.125,
+                'bbox': {'x': float(index), 'y': 2.0, 'width': 10.5, 'height': 20.25},
+                'frame': index // 2,
+            }
+            for index in range(count)
+        ]
+
+    def save(self, detections):
+        file_instance = UploadedFile(file_type='video', original_name='clip.mp4', content_hash='c' * 64)
+        file_instance.file.name = 'uploads/clip.mp4'
+        return processing.save_translation_result(file_instance, {
+            'detections': detections,
+            'translated_text': 'A B C',
+            'confidence_score': 62.5,
+            'processing_time': 1.0,
+        })
+
+    def test_pack_round_trip(self):
+        detections = self.detections(7)
+        packed = PackedDetections.pack(None, detections)
+        self.assertEqual(packed.count, 7)
+        self.assertEqual(packed.class_names, ['A', 'B', 'C'])
+        self.assertEqual(packed.unpack(), detections)
+        self.assertEqual(PackedDetections.pack(None, []).unpack(), [])
+
+    def test_storage_mode_follows_threshold(self):
+        with override_settings(SIGNVISION_DETECTION_STORAGE='auto', SIGNVISION_PACKED_DETECTIONS_THRESHOLD=5):
+            self.assertEqual(processing.detection_storage_mode(5), 'rows')
+            self.assertEqual(processing.detection_storage_mode(6), 'packed')
+        with override_settings(SIGNVISION_DETECTION_STORAGE='packed'):
+            self.assertEqual(processing.detection_storage_mode(1), 'packed')
+
+    @override_settings(SIGNVISION_DETECTION_STORAGE='auto', SIGNVISION_PACKED_DETECTIONS_THRESHOLD=5)
+    def test_packed_results_are_not_duplicated_in_json(self):
+        detections = self.detections(8)
+        packed_result = self.save(detections)
+        packed_result.refresh_from_db()
+        self.assertEqual(packed_result.detected_signs, [])
+        self.assertFalse(SignDetection.objects.filter(translation_result=packed_result).exists())
+        self.assertEqual(processing.serialize_result(packed_result)['detections'], detections)
+
+        rows_result = self.save(self.detections(3))
+        rows_result.refresh_from_db()
+        self.assertEqual(rows_result.detected_signs, self.detections(3))
+        self.assertEqual(rows_result.detections.count(), 3)
+        self.assertFalse(PackedDetections.objects.filter(translation_result=rows_result).exists())
+
+
+class HistoryTests(TestCase):
+    """Historique : requête unique, pagination par curseur, ETag et invalidation"""
+
+    def setUp(self):
+        cache.clear()
+        for index in range(12):
+            self.add_result(index)
+
+    def add_result(self, index, detections_count=2):
+        file_instance = UploadedFile(file_type='image', original_name=f'photo{index}.jpg', content_hash=f'{index:064d}')
+        file_instance.file.name = f'uploads/photo{index}.jpg'
+        detections = [
+            {'class': 'A', 'confidence': 0.9, 'bbox': {'x': 0, 'y': 0, 'width': 1, 'height': 1}, 'frame': 0}
+        ] * detections_count
+        return processing.save_translation_result(file_instance, {
+            'detections': detections, 'translated_text': 'a', 'confidence_score': 90.0, 'processing_time': 0.1,
+        })
+
+    def test_recent_results_use_one_query(self):
+        # Un résultat compact : son nombre de détections vient de PackedDetections
+        with override_settings(SIGNVISION_DETECTION_STORAGE='packed'):
+            self.add_result(99, detections_count=5)
+
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/recent_results/').json()['data']
+        self.assertEqual(len(data), 10)
+        self.assertEqual(data[0]['file_name'], 'photo99.jpg')
+        self.assertEqual([item['detections_count'] for item in data[:2]], [5, 2])
+
+    def test_cursor_pagination(self):
+        names, cursor = [], None
+        while True:
+            params = {'limit': 5, **({'cursor': cursor} if cursor else {})}
+            page = self.client.get('/api/history/', params).json()
+            names.extend(item['file_name'] for item in page['data'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(names, [f'photo{index}.jpg' for index in reversed(range(12))])
+        self.assertEqual(self.client.get('/api/history/', {'cursor': '!!'}).status_code, 400)
+
+    def test_etag_and_invalidation(self):
+        response = self.client.get('/api/history/')
+        etag = response['ETag']
+
+        # Page inchangée : 304 sans requête SQL
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Un nouveau résultat change la version de l'historique (signal post_save)
+        self.add_result(42)
+        response = self.client.get('/api/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['data'][0]['file_name'], 'photo42.jpg')
 
-# Create your tests here.
@@ -0,0 +1,165 @@
+"""
+Traduction incrémentale des détections en texte
+Projet créé par Marino ATOHOUN
+
+Même règle que la traduction historique :
+- pour chaque frame, la détection la plus confiante (la première en cas
+  d'égalité) est retenue si sa confiance dépasse le seuil ;
+- les signes identiques consécutifs sont fusionnés ;
+- chaque signe est traduit en français.
+
+Les détections arrivent par morceaux (par exemple lot par lot pendant une
+vidéo). Le meilleur signe de chaque frame est calculé avec NumPy ; seule la
+dernière frame d'un morceau reste en attente, car elle peut se poursuivre
+dans le morceau suivant.
+"""
+
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+EMPTY_TEXT = "Aucun signe détecté"
+
+
+class SignVocabulary:
+    """
+    Table précalculée indice de classe -> nom et traduction
+    """
+
+    def __init__(self, class_names: Sequence[str], translate: Callable[[str], str]):
+        self.names = list(class_names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.words = [translate(name) for name in self.names]
+        self.translate = translate
+
+    def __len__(self):
+        return len(self.names)
+
+
+class StreamingTranslator:
+    """
+    Traduit un flux de détections morceau par morceau
+
+    Les numéros de frame doivent être croissants d'un morceau à l'autre
+    (une frame peut s'étendre sur deux morceaux consécutifs) ; à l'intérieur
+    d'un morceau, l'ordre est libre.
+    """
+
+    def __init__(self, vocabulary: SignVocabulary, threshold: float = 0.6):
+        """
+        Args:
+            vocabulary: Classes connues et leur traduction
+            threshold: Confiance minimale (stricte) du meilleur signe d'une frame
+        """
+        self.vocabulary = vocabulary
+        self.threshold = threshold
+        self._extra = {}
+        self._extra_words = []
+        self._sign_ids = []
+        self._pending = None
+        self._seen = 0
+
+    def feed(self, detections: List[Dict]):
+        """Ajoute un morceau de détections au format dict de l'API"""
+        count = len(detections)
+        if not count:
+            return
+        frames = np.fromiter((d['frame'] for d in detections), dtype=np.int64, count=count)
+        confidences = np.fromiter((d['confidence'] for d in detections), dtype=np.float64, count=count)
+        class_ids = np.fromiter((self._class_id(d['class']) for d in detections), dtype=np.int64, count=count)
+        self._feed(frames, class_ids, confidences)
+
+    def feed_arrays(self, frames: np.ndarray, class_ids: np.ndarray, confidences: np.ndarray):
+        """
+        Ajoute un morceau sous forme de colonnes (voir DetectionArrays)
+
+        Les indices de classe sont ceux du vocabulaire ; un indice inconnu du
+        vocabulaire est traité comme la classe nommée par cet indice.
+        """
+        class_ids = np.asarray(class_ids, dtype=np.int64)
+        unknown = (class_ids < 0) | (class_ids >= len(self.vocabulary))
+        if unknown.any():
+            class_ids = class_ids.copy()
+            for i in np.flatnonzero(unknown):
+                class_ids[i] = self._class_id(str(class_ids[i]))
+        self._feed(
+            np.asarray(frames, dtype=np.int64), class_ids, np.asarray(confidences, dtype=np.float64)
+        )
+
+    def text(self) -> str:
+        """Traduction des frames déjà terminées (sans la frame en attente)"""
+        return " ".join(self._word(sign_id) for sign_id in self._sign_ids)
+
+    def finish(self) -> str:
+        """Termine le flux et retourne la traduction complète"""
+        if self._pending is not None:
+            _, class_id, confidence = self._pending
+            self._pending = None
+            if confidence > self.threshold:
+                self._append(np.array([class_id], dtype=np.int64))
+
+        if not self._seen:
+            return EMPTY_TEXT
+        return self.text()
+
+    def _feed(self, frames: np.ndarray, class_ids: np.ndarray, confidences: np.ndarray):
+        if not len(frames):
+            return
+        self._seen += len(frames)
+
+        if self._pending is not None:
+            pending_frame, pending_class, pending_confidence = self._pending
+            if frames.min() < pending_frame:
+                raise ValueError("Les frames doivent être croissantes d'un morceau à l'autre")
+            # Le meilleur candidat de la frame en attente précède le morceau :
+            # il l'emporte en cas d'égalité, comme dans la liste complète
+            frames = np.concatenate(([pending_frame], frames))
+            class_ids = np.concatenate(([pending_class], class_ids))
+            confidences = np.concatenate(([pending_confidence], confidences))
+
+        # Tri stable par frame, inutile dans le cas courant d'un flux ordonné :
+        # l'ordre d'arrivée est conservé à l'intérieur d'une frame
+        if (frames[1:] < frames[:-1]).any():
+            order = np.argsort(frames, kind='stable')
+            frames, class_ids, confidences = frames[order], class_ids[order], confidences[order]
+
+        # Meilleure détection de chaque frame : la première qui atteint
+        # la confiance maximale de sa frame
+        starts = np.flatnonzero(np.r_[True, frames[1:] != frames[:-1]])
+        counts = np.diff(np.r_[starts, len(frames)])
+        group_max = np.maximum.reduceat(confidences, starts)
+        candidates = np.where(
+            confidences == np.repeat(group_max, counts), np.arange(len(frames)), len(frames)
+        )
+        best = np.minimum.reduceat(candidates, starts)
+
+        last = best[-1]
+        self._pending = (int(frames[last]), int(class_ids[last]), float(confidences[last]))
+
+        best = best[:-1]
+        self._append(class_ids[best][confidences[best] > self.threshold])
+
+    def _append(self, sign_ids: np.ndarray):
+        """Ajoute une séquence de signes en fusionnant les doublons consécutifs"""
+        if not len(sign_ids):
+            return
+        keep = np.r_[True, sign_ids[1:] != sign_ids[:-1]]
+        if self._sign_ids and sign_ids[0] == self._sign_ids[-1]:
+            keep[0] = False
+        self._sign_ids.extend(sign_ids[keep].tolist())
+
+    def _class_id(self, name: str) -> int:
+        class_id = self.vocabulary.index.get(name)
+        if class_id is None:
+            # Classe hors vocabulaire : indice attribué à la volée
+            class_id = self._extra.get(name)
+            if class_id is None:
+                class_id = self._extra[name] = len(self.vocabulary) + len(self._extra_words)
+                self._extra_words.append(self.vocabulary.translate(name))
+        return class_id
+
+    def _word(self, sign_id: int) -> str:
+        if sign_id < len(self.vocabulary):
+            return self.vocabulary.words[sign_id]
+        return self._extra_words[sign_id - len(self.vocabulary)]
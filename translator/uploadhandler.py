@@ -0,0 +1,57 @@
+"""
+Gestionnaires d'upload calculant l'empreinte SHA-256 à la volée
+Projet créé par Marino ATOHOUN
+
+L'empreinte est mise à jour à chaque morceau reçu, pendant le streaming de
+la requête. Elle est ensuite exposée sur le fichier uploadé
+(attribut `content_hash`) sans relecture du contenu.
+"""
+
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+def compute_content_hash(uploaded_file) -> str:
+    """
+    Retourne l'empreinte SHA-256 d'un fichier uploadé
+
+    Utilise l'empreinte calculée pendant l'upload si elle existe, sinon
+    relit le fichier morceau par morceau.
+    """
+    content_hash = getattr(uploaded_file, 'content_hash', None)
+    if content_hash:
+        return content_hash
+
+    sha256 = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        sha256.update(chunk)
+    uploaded_file.seek(0)
+    uploaded_file.content_hash = sha256.hexdigest()
+    return uploaded_file.content_hash
+
+
+class ContentHashMixin:
+    """Calcule l'empreinte SHA-256 des morceaux reçus par le gestionnaire"""
+
+    def new_file(self, *args, **kwargs):
+        self._sha256 = hashlib.sha256()
+        return super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self._sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.content_hash = self._sha256.hexdigest()
+        return uploaded_file
+
+
+class HashingMemoryFileUploadHandler(ContentHashMixin, MemoryFileUploadHandler):
+    """Upload en mémoire avec calcul de l'empreinte"""
+
+
+class HashingTemporaryFileUploadHandler(ContentHashMixin, TemporaryFileUploadHandler):
+    """Upload en fichier temporaire avec calcul de l'empreinte"""
@@ -9,10 +9,20 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('upload/', views.upload_file, name='upload_file'),
+    path('api/uploads/', views.create_upload, name='create_upload'),
+    path('api/uploads/<uuid:upload_id>/', views.upload_session, name='upload_session'),
+    path('api/uploads/<uuid:upload_id>/commit/', views.commit_upload, name='commit_upload'),
     path('process_camera/', views.process_camera, name='process_camera'),
     path('process_url/', views.process_url, name='process_url'),
+    path('api/batch/', views.process_batch, name='process_batch'),
+    path('api/jobs/<uuid:job_id>/', views.job_status, name='job_status'),
     path('api/model_info/', views.get_model_info, name='model_info'),
+    path('api/inference_stats/', views.get_inference_stats, name='inference_stats'),
+    path('api/metrics/', views.get_metrics, name='metrics'),
+    path('api/profiles/', views.list_profiles, name='list_profiles'),
+    path('api/profiles/<slug:view_name>.<slug:fmt>', views.download_profile, name='download_profile'),
     path('api/recent_results/', views.get_recent_results, name='recent_results'),
+    path('api/history/', views.get_history, name='history'),
     path('about/', views.about, name='about'),
     path('documentation/', views.documentation, name='documentation'),
     path('contact/', views.contact, name='contact'),
@@ -0,0 +1,442 @@
+"""
+Moteur d'inférence vidéo en flux pour SignVision AI
+Projet créé par Marino ATOHOUN
+
+Les frames sont décodées à la demande avec OpenCV, échantillonnées selon un
+pas ou une cadence cible, puis envoyées au modèle par lots. Seul le lot en
+cours est gardé en mémoire, quelle que soit la durée de la vidéo.
+
+Les vidéos longues peuvent être découpées en segments de frames consécutives,
+décodés et analysés en parallèle par un pool de processus (chacun avec sa
+copie du modèle). Les détections des segments sont réassemblées dans l'ordre
+des frames : le résultat est celui d'une analyse séquentielle.
+"""
+
+import io
+import math
+import multiprocessing
+import os
+import threading
+from importlib import import_module
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+def compute_frame_stride(source_fps: float, frame_stride: int = 1, target_fps: Optional[float] = None) -> int:
+    """
+    Calcule le pas d'échantillonnage des frames
+
+    Args:
+        source_fps: Cadence native de la vidéo (0 si inconnue)
+        frame_stride: Pas fixe, utilisé si aucune cadence cible n'est donnée
+        target_fps: Cadence d'analyse souhaitée
+
+    Returns:
+        Nombre de frames entre deux frames analysées (au moins 1)
+    """
+    if target_fps and source_fps and source_fps > 0:
+        return max(1, int(round(source_fps / float(target_fps))))
+    return max(1, int(frame_stride or 1))
+
+
+# Chemin, URL ou flux binaire lisible (par exemple une vidéo en cours de téléchargement)
+VideoSource = Union[str, io.BufferedIOBase]
+
+
+def open_video(source: VideoSource) -> cv2.VideoCapture:
+    """
+    Ouvre une vidéo avec OpenCV
+
+    Les flux binaires sont lus par le backend FFmpeg, qui décode les frames
+    à mesure que les octets deviennent disponibles.
+    """
+    if isinstance(source, io.BufferedIOBase):
+        return cv2.VideoCapture(source, cv2.CAP_FFMPEG, [])
+    return cv2.VideoCapture(source)
+
+
+def count_video_frames(video_path: VideoSource) -> int:
+    """Retourne le nombre de frames annoncé par le conteneur (0 si inconnu)"""
+    if not isinstance(video_path, str):
+        # Compter les frames d'un flux consommerait ses octets
+        return 0
+    capture = cv2.VideoCapture(video_path)
+    try:
+        return max(0, int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0))
+    finally:
+        capture.release()
+
+
+def iter_video_frames(video_path: VideoSource, frame_stride: int = 1,
+                      target_fps: Optional[float] = None, start_frame: int = 0,
+                      end_frame: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Générateur paresseux des frames d'une vidéo
+
+    Les frames ignorées sont seulement avancées (grab) sans être décodées.
+    L'échantillonnage suit les numéros de frame absolus : un segment retient
+    les mêmes frames qu'une lecture complète.
+
+    Args:
+        video_path: Chemin, URL ou flux binaire de la vidéo
+        frame_stride: Analyse une frame sur `frame_stride`
+        target_fps: Cadence d'analyse souhaitée (prioritaire sur frame_stride)
+        start_frame: Première frame lue (chemins uniquement)
+        end_frame: Frame à laquelle s'arrêter (exclue), None pour la fin
+
+    Yields:
+        Tuples (numéro de frame, image BGR)
+    """
+    capture = open_video(video_path)
+    if not capture.isOpened():
+        capture.release()
+        raise ValueError(f"Impossible d'ouvrir la vidéo: {video_path}")
+
+    try:
+        stride = compute_frame_stride(capture.get(cv2.CAP_PROP_FPS), frame_stride, target_fps)
+        frame_number = 0
+        if start_frame:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            frame_number = start_frame
+        while end_frame is None or frame_number < end_frame:
+            if frame_number % stride:
+                if not capture.grab():
+                    break
+            else:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield frame_number, frame
+            frame_number += 1
+    finally:
+        capture.release()
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[List]:
+    """Regroupe un itérable en listes d'au plus `batch_size` éléments"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def plan_segments(total_frames: int, workers: int, min_segment_frames: int) -> List[Tuple[int, Optional[int]]]:
+    """
+    Découpe une vidéo en segments de frames consécutives
+
+    Le nombre de segments est limité par le nombre de processus et par la
+    taille minimale d'un segment. Le dernier segment va jusqu'à la fin réelle
+    de la vidéo (le nombre de frames annoncé par le conteneur est approximatif).
+
+    Returns:
+        Liste de (première frame, frame de fin exclue ou None)
+    """
+    count = max(1, min(int(workers), total_frames // max(1, int(min_segment_frames))))
+    size = math.ceil(total_frames / count) if total_frames else 0
+    segments = [(start, start + size) for start in range(0, size * count, size)] if size else [(0, None)]
+    segments[-1] = (segments[-1][0], None)
+    return segments
+
+
+def merge_segments(results: Iterable[Tuple[int, Optional[int], List[Dict]]]) -> List[Dict]:
+    """
+    Réassemble les détections des segments dans l'ordre des frames
+
+    iter_video_frames numérote les frames à partir de `start_frame` et
+    s'arrête à `end_frame` : les segments ne se recouvrent pas, il suffit de
+    les concaténer dans l'ordre.
+    """
+    detections = []
+    for _, _, segment_detections in sorted(results, key=lambda result: result[0]):
+        detections.extend(segment_detections)
+    return detections
+
+
+# --- Processus de segments ---------------------------------------------------
+
+_segment_detector = None
+
+
+def _init_segment_worker(worker_spec: Tuple[str, str, str, bool], threads: int):
+    """Initialise un processus de segments : configure Django et crée le détecteur"""
+    global _segment_detector
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'signvision.settings')
+    import django
+    django.setup()
+
+    # Un processus par cœur : pas de parallélisme interne concurrent
+    if threads:
+        cv2.setNumThreads(threads)
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    detector_path, model_path, backend, int8 = worker_spec
+    module_name, class_name = detector_path.rsplit('.', 1)
+    detector_class = getattr(import_module(module_name), class_name)
+    _segment_detector = detector_class(model_path, backend=backend, int8=int8)
+
+
+def _detect_segment(video_path: str, start: int, end: Optional[int], options: Dict) -> Tuple[int, Optional[int], List[Dict]]:
+    """Détecte les signes d'un segment dans un processus du pool"""
+    engine = VideoInferenceEngine(_segment_detector, **options)
+    # La traduction est calculée sur la vidéo entière, après réassemblage
+    result = engine.detect_range(video_path, start_frame=start, end_frame=end, translate=False)
+    return start, end, result['detections']
+
+
+class SegmentPool:
+    """
+    Pool de processus partagé pour l'analyse des segments vidéo
+
+    Le pool est créé au premier besoin (démarrage 'spawn', sûr avec les
+    threads du serveur) et recréé si le détecteur change.
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def get(self, worker_spec: Tuple, workers: int, threads: int):
+        key = (worker_spec, workers, threads)
+        with self._lock:
+            if self._pool is None or self._key != key:
+                self._close()
+                context = multiprocessing.get_context('spawn')
+                self._pool = context.Pool(
+                    processes=workers, initializer=_init_segment_worker, initargs=(worker_spec, threads)
+                )
+                self._key = key
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._key = None
+
+
+# Pool global, partagé par toutes les analyses du processus
+segment_pool = SegmentPool()
+
+
+def resolve_video_workers(workers: int, threads_per_worker: int) -> int:
+    """
+    Nombre de processus de segments ; 0 = un par groupe de
+    `threads_per_worker` cœurs (chaque processus charge sa copie du modèle)
+    """
+    if workers:
+        return max(1, int(workers))
+    return max(1, (os.cpu_count() or 1) // max(1, int(threads_per_worker)))
+
+
+class VideoInferenceEngine:
+    """
+    Exécute le détecteur sur une vidéo, lot par lot
+    """
+
+    def __init__(self, detector, batch_size: int = 8, frame_stride: int = 1,
+                 target_fps: Optional[float] = None, workers: int = 1,
+                 threads_per_worker: int = 1, min_segment_frames: int = 300,
+                 pipelined: bool = False, preprocess_size: int = 640, queue_size: int = 4):
+        """
+        Initialise le moteur vidéo
+
+        Args:
+            detector: Détecteur exposant detect_signs_batch
+            batch_size: Nombre de frames par passe du modèle
+            frame_stride: Analyse une frame sur `frame_stride`
+            target_fps: Cadence d'analyse souhaitée
+            workers: Processus analysant des segments en parallèle (1 = pas
+                de découpage)
+            threads_per_worker: Threads torch/OpenCV par processus
+            min_segment_frames: Taille minimale d'un segment ; une vidéo plus
+                courte que deux segments est analysée sans découpage
+            pipelined: Décodage, prétraitement, inférence et traduction
+                dans des threads reliés par des files bornées
+                (voir translator.pipeline)
+            preprocess_size: Plus grand côté des frames envoyées au modèle
+                en mode pipeline (0 = inchangé)
+            queue_size: Capacité des files entre étapes du pipeline
+        """
+        self.detector = detector
+        self.batch_size = max(1, int(batch_size))
+        self.frame_stride = max(1, int(frame_stride or 1))
+        self.target_fps = target_fps
+        self.workers = max(1, int(workers))
+        self.threads_per_worker = max(1, int(threads_per_worker))
+        self.min_segment_frames = max(1, int(min_segment_frames))
+        self.pipelined = pipelined
+        self.preprocess_size = preprocess_size
+        self.queue_size = queue_size
+
+    @classmethod
+    def from_settings(cls, detector) -> 'VideoInferenceEngine':
+        """Construit un moteur à partir des paramètres SIGNVISION_VIDEO_*"""
+        from django.conf import settings
+
+        threads_per_worker = getattr(settings, 'SIGNVISION_VIDEO_THREADS_PER_WORKER', 1)
+        return cls(
+            detector,
+            batch_size=getattr(settings, 'SIGNVISION_VIDEO_BATCH_SIZE', 8),
+            frame_stride=getattr(settings, 'SIGNVISION_VIDEO_FRAME_STRIDE', 1),
+            target_fps=getattr(settings, 'SIGNVISION_VIDEO_TARGET_FPS', None),
+            workers=resolve_video_workers(getattr(settings, 'SIGNVISION_VIDEO_WORKERS', 2), threads_per_worker),
+            threads_per_worker=threads_per_worker,
+            min_segment_frames=getattr(settings, 'SIGNVISION_VIDEO_MIN_SEGMENT_FRAMES', 300),
+            pipelined=getattr(settings, 'SIGNVISION_VIDEO_PIPELINE', True),
+            preprocess_size=getattr(settings, 'SIGNVISION_VIDEO_PREPROCESS_SIZE', 640),
+            queue_size=getattr(settings, 'SIGNVISION_VIDEO_PIPELINE_QUEUE_SIZE', 4),
+        )
+
+    def stream(self, video_path: VideoSource,
+               progress_callback: Optional[Callable[[int, int], None]] = None,
+               start_frame: int = 0, end_frame: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        Détecte les signes lot par lot
+
+        Args:
+            video_path: Chemin, URL ou flux binaire de la vidéo
+            progress_callback: Appelé après chaque lot avec
+                (frames parcourues, frames totales) ; pour un flux, le
+                total n'est pas connu et vaut les frames parcourues
+            start_frame: Première frame du segment à analyser
+            end_frame: Fin (exclue) du segment, None pour la fin de la vidéo
+
+        Yields:
+            Détections d'un lot de frames, avec leur vrai numéro de frame
+        """
+        total_frames = count_video_frames(video_path) if progress_callback else 0
+        frames = iter_video_frames(video_path, self.frame_stride, self.target_fps, start_frame, end_frame)
+        for batch in iter_batches(frames, self.batch_size):
+            frame_numbers = [frame_number for frame_number, _ in batch]
+            results = self.detector.detect_signs_batch([frame for _, frame in batch])
+
+            detections = []
+            for frame_number, frame_detections in zip(frame_numbers, results):
+                for detection in frame_detections:
+                    detection['frame'] = frame_number
+                    detections.append(detection)
+
+            if progress_callback:
+                frames_done = frame_numbers[-1] + 1
+                progress_callback(frames_done, max(total_frames, frames_done))
+            yield detections
+
+    def detect(self, video_path: VideoSource,
+               progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+        """Détecte les signes sur toute la vidéo"""
+        return self.analyze(video_path, progress_callback)['detections']
+
+    def analyze(self, video_path: VideoSource,
+                progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Détecte les signes sur toute la vidéo et les traduit
+
+        Un fichier assez long est découpé en segments analysés en parallèle
+        si le moteur dispose de plusieurs processus et que le détecteur peut
+        être recréé dans un autre processus.
+
+        Returns:
+            dict: 'detections' (ordre des frames) et 'translated_text' ;
+                'pipeline' contient les statistiques par étape en mode pipeline
+        """
+        worker_spec = getattr(self.detector, 'worker_spec', lambda: None)()
+        if self.workers > 1 and worker_spec is not None and isinstance(video_path, str):
+            total_frames = count_video_frames(video_path)
+            if total_frames >= 2 * self.min_segment_frames:
+                detections = self.detect_parallel(video_path, worker_spec, total_frames, progress_callback)
+                return {
+                    'detections': detections,
+                    'translated_text': self.detector.translate_signs_to_text(detections),
+                }
+
+        return self.detect_range(video_path, progress_callback)
+
+    def detect_range(self, video_path: VideoSource,
+                     progress_callback: Optional[Callable[[int, int], None]] = None,
+                     start_frame: int = 0, end_frame: Optional[int] = None,
+                     translate: bool = True) -> Dict:
+        """
+        Analyse séquentielle d'une vidéo ou d'un segment (dans ce processus)
+
+        Avec translate=False (segments), 'translated_text' vaut None.
+        """
+        if self.pipelined:
+            from .pipeline import run_video_pipeline
+
+            result = run_video_pipeline(
+                self.detector,
+                iter_video_frames(video_path, self.frame_stride, self.target_fps, start_frame, end_frame),
+                batch_size=self.batch_size,
+                preprocess_size=self.preprocess_size,
+                queue_size=self.queue_size,
+                total_frames=count_video_frames(video_path) if progress_callback else 0,
+                progress_callback=progress_callback,
+                translate=translate,
+            )
+            return {
+                'detections': result['detections'],
+                'translated_text': result['translated_text'],
+                'pipeline': result['stats'],
+            }
+
+        detections = []
+        for batch_detections in self.stream(video_path, progress_callback, start_frame, end_frame):
+            detections.extend(batch_detections)
+        return {
+            'detections': detections,
+            'translated_text': self.detector.translate_signs_to_text(detections) if translate else None,
+        }
+
+    def detect_parallel(self, video_path: str, worker_spec: Tuple, total_frames: int,
+                        progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+        """
+        Analyse les segments de la vidéo dans le pool de processus
+
+        Args:
+            video_path: Chemin de la vidéo (lisible par chaque processus)
+            worker_spec: Arguments de recréation du détecteur (voir
+                YOLOv8SignDetector.worker_spec)
+            total_frames: Nombre de frames annoncé par le conteneur
+            progress_callback: Appelé à la fin de chaque segment
+        """
+        segments = plan_segments(total_frames, self.workers, self.min_segment_frames)
+        pool = segment_pool.get(worker_spec, self.workers, self.threads_per_worker)
+        options = {
+            'batch_size': self.batch_size,
+            'frame_stride': self.frame_stride,
+            'target_fps': self.target_fps,
+            'pipelined': self.pipelined,
+            'preprocess_size': self.preprocess_size,
+            'queue_size': self.queue_size,
+        }
+        tasks = [(video_path, start, end, options) for start, end in segments]
+
+        results = []
+        frames_done = 0
+        for start, end, detections in pool.imap_unordered(_detect_segment_task, tasks):
+            results.append((start, end, detections))
+            frames_done += (end if end is not None else total_frames) - start
+            if progress_callback:
+                progress_callback(min(frames_done, total_frames), total_frames)
+        return merge_segments(results)
+
+
+def _detect_segment_task(task: Tuple) -> Tuple[int, Optional[int], List[Dict]]:
+    return _detect_segment(*task)
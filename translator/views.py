@@ -4,21 +4,38 @@ Projet créé par Marino ATOHOUN
 """
 
 import os
-import time
 import json
+import hashlib
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
 from django.contrib import messages
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
+from django.urls import reverse
+from django.db import transaction
 from PIL import Image
-import tempfile
 
-from .models import UploadedFile, TranslationResult, SignDetection
+from .models import TranslationResult, ProcessingJob, UploadSession
+from . import chunked
+from .batch import BatchError, analyze_image_batch, collect_batch_items
 from .ai_model import detector
+from .batching import scheduler
+from .jobs import job_queue
+from .cache import result_cache
+from .metrics import metrics
+from .pipeline import pipeline_stats
+from .profiling import profile_store
+from .history import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, get_cached_history_page, get_history_page, get_history_version
+)
+from .processing import (
+    analyze_camera_frame, analyze_remote_video, camera_sessions, process_file_with_ai, save_translation_result, serialize_result,
+    store_uploaded_file
+)
+from .uploadhandler import compute_content_hash
 
 
 def index(request):
@@ -33,6 +50,7 @@ def index(request):
     return render(request, 'index.html', context)
 
 
+@metrics.track_view('upload_file')
 @require_http_methods(["POST"])
 def upload_file(request):
     """Gère l'upload et le traitement des fichiers"""
@@ -58,53 +76,254 @@ def upload_file(request):
         # Détermine le type de fichier
         file_type = 'image' if file_ext in ['.jpg', '.jpeg', '.png'] else 'video'
         
-        # Sauvegarde le fichier
-        file_instance = UploadedFile.objects.create(
-            file=uploaded_file,
-            file_type=file_type,
-            original_name=uploaded_file.name
-        )
-        
-        # Traitement avec le modèle IA
-        result_data = process_file_with_ai(file_instance)
+        content_hash = compute_content_hash(uploaded_file)
+        response, _ = _start_processing(request, uploaded_file, file_type, content_hash)
+        return response
         
-        # Sauvegarde les résultats
-        translation_result = TranslationResult.objects.create(
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'Erreur lors du traitement: {str(e)}'
+        })
+
+
+def _start_processing(request, uploaded_file, file_type, content_hash):
+    """
+    Enregistre un fichier reçu et lance son traitement
+    
+    Commun à l'upload classique et à la validation d'un upload en morceaux.
+    
+    Returns:
+        tuple: (réponse JSON, UploadedFile créé ou None si le résultat
+            était en cache)
+    """
+    # Un contenu déjà traité par la même version du modèle n'est pas réanalysé
+    cached_result = result_cache.get(content_hash, detector.model_version)
+    if cached_result is not None:
+        return JsonResponse({
+            'success': True,
+            'data': dict(cached_result, cached=True)
+        }), None
+    
+    # Traitement asynchrone : le worker web rend la main immédiatement
+    if getattr(settings, 'SIGNVISION_ASYNC_UPLOADS', True):
+        # Sauvegarde le fichier (dédupliqué sur le disque)
+        file_instance = store_uploaded_file(uploaded_file, file_type, content_hash)
+        job = ProcessingJob.objects.create(
             uploaded_file=file_instance,
-            detected_signs=result_data['detections'],
-            translated_text=result_data['translated_text'],
-            confidence_score=result_data['confidence_score'],
-            processing_time=result_data['processing_time']
+            frames_total=1 if file_type == 'image' else 0
         )
+        transaction.on_commit(lambda: job_queue.enqueue(job))
         
-        # Sauvegarde les détections individuelles
-        for detection in result_data['detections']:
-            SignDetection.objects.create(
-                translation_result=translation_result,
-                sign_class=detection['class'],
-                confidence=detection['confidence'],
-                bbox_x=detection['bbox']['x'],
-                bbox_y=detection['bbox']['y'],
-                bbox_width=detection['bbox']['width'],
-                bbox_height=detection['bbox']['height'],
-                frame_number=detection.get('frame', 0)
-            )
+        return _job_response(job), file_instance
+    
+    # Le fichier est écrit sur le disque ; sa ligne en base est créée
+    # avec les résultats, dans la même transaction
+    file_instance = store_uploaded_file(uploaded_file, file_type, content_hash, commit=False)
+    
+    # Traitement avec le modèle IA
+    result_data = process_file_with_ai(file_instance)
+    
+    # Sauvegarde les résultats
+    save_translation_result(file_instance, result_data)
+    
+    messages.success(request, f'Fichier {uploaded_file.name} traité avec succès!')
+    
+    return JsonResponse({
+        'success': True,
+        'data': {
+            'translated_text': result_data['translated_text'],
+            'confidence_score': result_data['confidence_score'],
+            'processing_time': result_data['processing_time'],
+            'detections': result_data['detections']
+        }
+    }), file_instance
+
+
+def _job_response(job):
+    """Réponse 202 d'un traitement asynchrone, suivi par polling"""
+    return JsonResponse({
+        'success': True,
+        'data': {
+            'job_id': str(job.id),
+            'status': job.status,
+            'status_url': reverse('job_status', args=[job.id])
+        }
+    }, status=202)
+
+
+def _committed_upload_response(session):
+    """
+    Réponse d'une validation répétée : le traitement ou le résultat de la
+    première validation, sans retraiter le fichier
+    """
+    file_instance = session.uploaded_file
+    if file_instance is not None:
+        job = file_instance.jobs.first()
+        if job is not None:
+            return _job_response(job)
+        translation_result = file_instance.translations.first()
+        if translation_result is not None:
+            return JsonResponse({
+                'success': True,
+                'data': serialize_result(translation_result)
+            })
+    
+    # Résultat servi par le cache lors de la première validation
+    cached_result = result_cache.get(session.content_hash, detector.model_version) if session.content_hash else None
+    if cached_result is not None:
+        return JsonResponse({
+            'success': True,
+            'data': dict(cached_result, cached=True)
+        })
+    return _chunked_upload_error(chunked.ChunkedUploadError('Upload déjà validé', status=409, offset=session.offset))
+
+
+def _upload_session_data(session):
+    return {
+        'upload_id': str(session.pk),
+        'original_name': session.original_name,
+        'size': session.size,
+        'offset': session.offset,
+        'status': session.status,
+        'upload_url': reverse('upload_session', args=[session.pk]),
+        'commit_url': reverse('commit_upload', args=[session.pk]),
+    }
+
+
+def _chunked_upload_error(error):
+    response = JsonResponse({
+        'success': False,
+        'error': str(error),
+        'offset': error.offset
+    }, status=error.status)
+    if error.offset is not None:
+        response['Upload-Offset'] = str(error.offset)
+    return response
+
+
+@require_http_methods(["POST"])
+def create_upload(request):
+    """
+    Ouvre un upload en morceaux
+    
+    Paramètres (formulaire ou JSON) : `filename` et `size` en octets.
+    """
+    try:
+        if request.content_type == 'application/json':
+            params = json.loads(request.body or b'{}')
+        else:
+            params = request.POST
         
-        file_instance.processed = True
-        file_instance.save()
+        try:
+            size = int(params.get('size', 0))
+        except (TypeError, ValueError):
+            size = 0
         
-        messages.success(request, f'Fichier {uploaded_file.name} traité avec succès!')
+        session = chunked.create_session(str(params.get('filename', '')), size)
         
+        data = _upload_session_data(session)
+        data['chunk_size'] = getattr(settings, 'SIGNVISION_CHUNKED_UPLOAD_CHUNK_SIZE', 4 * 1024 * 1024)
         return JsonResponse({
             'success': True,
-            'data': {
-                'translated_text': result_data['translated_text'],
-                'confidence_score': result_data['confidence_score'],
-                'processing_time': result_data['processing_time'],
-                'detections': result_data['detections']
-            }
+            'data': data
+        }, status=201)
+        
+    except chunked.ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'Erreur lors de la création de l\'upload: {str(e)}'
         })
+
+
+@metrics.track_view('upload_chunk')
+@require_http_methods(["GET", "HEAD", "PATCH", "PUT"])
+def upload_session(request, upload_id):
+    """
+    État d'un upload en morceaux (GET) ou envoi d'un morceau (PATCH/PUT)
+    
+    Un morceau est le corps brut de la requête ; l'en-tête Upload-Offset
+    indique sa position dans le fichier. La réponse et l'en-tête
+    Upload-Offset donnent l'offset à utiliser pour le morceau suivant.
+    """
+    try:
+        session = UploadSession.objects.filter(pk=upload_id).first()
+        if session is None:
+            return JsonResponse({
+                'success': False,
+                'error': 'Upload introuvable'
+            }, status=404)
+        
+        if request.method in ('PATCH', 'PUT'):
+            try:
+                offset = int(request.headers.get('Upload-Offset', ''))
+                length = int(request.headers.get('Content-Length', ''))
+            except ValueError:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'En-têtes Upload-Offset et Content-Length requis'
+                }, status=400)
+            
+            # Lecture en flux du corps : il n'est jamais chargé en entier
+            session = chunked.append_chunk(session, offset, request, length)
+        
+        response = JsonResponse({
+            'success': True,
+            'data': _upload_session_data(session)
+        })
+        response['Upload-Offset'] = str(session.offset)
+        response['Cache-Control'] = 'no-store'
+        return response
+        
+    except chunked.ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'Erreur lors de l\'upload: {str(e)}'
+        })
+
+
+@metrics.track_view('commit_upload')
+@require_http_methods(["POST"])
+def commit_upload(request, upload_id):
+    """
+    Valide un upload en morceaux complet et lance son traitement
+
+    Une validation répétée renvoie le traitement (ou le résultat) de la
+    première ; une validation concurrente reçoit 409.
+    """
+    try:
+        session = UploadSession.objects.filter(pk=upload_id).first()
+        if session is None:
+            return JsonResponse({
+                'success': False,
+                'error': 'Upload introuvable'
+            }, status=404)
+        
+        try:
+            partial_file, content_hash = chunked.finish_session(session)
+        except chunked.ChunkedUploadError:
+            if session.status == UploadSession.COMMITTED:
+                return _committed_upload_response(session)
+            raise
         
+        try:
+            with partial_file:
+                response, file_instance = _start_processing(
+                    request, partial_file, session.file_type, content_hash
+                )
+        except Exception:
+            # Session rouverte (ou supprimée si le fichier a été déplacé)
+            chunked.abort_session(session)
+            raise
+        chunked.close_session(session, file_instance)
+        return response
+        
+    except chunked.ChunkedUploadError as e:
+        return _chunked_upload_error(e)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -112,6 +331,7 @@ def upload_file(request):
         })
 
 
+@metrics.track_view('process_camera')
 @require_http_methods(["POST"])
 def process_camera(request):
     """Traite les frames de la caméra en temps réel"""
@@ -124,38 +344,19 @@ def process_camera(request):
         
         camera_frame = request.FILES['camera_frame']
         
-        # Sauvegarde temporaire de la frame
-        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-            for chunk in camera_frame.chunks():
-                temp_file.write(chunk)
-            temp_file_path = temp_file.name
+        # La frame est décodée directement depuis le tampon de la requête,
+        # sans écriture sur disque
+        frame_bytes = camera_frame.read()
         
-        try:
-            # Traitement avec le modèle IA
-            start_time = time.time()
-            detections = detector.detect_signs_image(temp_file_path)
-            translated_text = detector.translate_signs_to_text(detections)
-            processing_time = time.time() - start_time
-            
-            # Calcul de la confiance moyenne
-            confidence_score = 0
-            if detections:
-                confidence_score = sum(d['confidence'] for d in detections) / len(detections) * 100
-            
-            return JsonResponse({
-                'success': True,
-                'data': {
-                    'translated_text': translated_text,
-                    'confidence_score': round(confidence_score, 2),
-                    'processing_time': round(processing_time, 2),
-                    'detections': detections
-                }
-            })
-            
-        finally:
-            # Nettoyage du fichier temporaire
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+        # Session caméra optionnelle : porte de mouvement, lissage et transcription
+        session_id = request.POST.get('camera_session', '')[:64]
+        session = camera_sessions.get(session_id) if session_id else None
+        
+        # Traitement avec le modèle IA
+        return JsonResponse({
+            'success': True,
+            'data': analyze_camera_frame(frame_bytes, session)
+        })
         
     except Exception as e:
         return JsonResponse({
@@ -164,9 +365,25 @@ def process_camera(request):
         })
 
 
+def _ndjson_lines(events):
+    """Lignes NDJSON d'un flux d'événements, fermé avec la réponse (client déconnecté)"""
+    try:
+        for event in events:
+            yield json.dumps(event) + '\n'
+    finally:
+        events.close()
+
+
+@metrics.track_view('process_url')
 @require_http_methods(["POST"])
 def process_url(request):
-    """Traite une vidéo depuis une URL"""
+    """
+    Traite une vidéo depuis une URL
+
+    La réponse est un flux NDJSON (un objet JSON par ligne) : 'start', puis
+    les détections de chaque lot de frames au fil du téléchargement, puis
+    'result' (traduction complète) ou 'error'.
+    """
     try:
         video_url = request.POST.get('video_url', '').strip()
         
@@ -183,29 +400,16 @@ def process_url(request):
                 'error': 'URL invalide'
             })
         
-        # Simulation du téléchargement et traitement
-        # Dans un environnement réel, on téléchargerait la vidéo
-        start_time = time.time()
-        
-        # Simulation de détections pour une vidéo
-        detections = detector.detect_signs_video(video_url)
-        translated_text = detector.translate_signs_to_text(detections)
-        processing_time = time.time() - start_time
-        
-        # Calcul de la confiance moyenne
-        confidence_score = 0
-        if detections:
-            confidence_score = sum(d['confidence'] for d in detections) / len(detections) * 100
-        
-        return JsonResponse({
-            'success': True,
-            'data': {
-                'translated_text': translated_text,
-                'confidence_score': round(confidence_score, 2),
-                'processing_time': round(processing_time, 2),
-                'detections': detections[:10]  # Limite à 10 détections pour l'affichage
-            }
-        })
+        # Téléchargement, décodage et inférence en parallèle ; les
+        # détections sont envoyées au client au fil de l'eau
+        events = analyze_remote_video(video_url)
+        response = StreamingHttpResponse(
+            _ndjson_lines(events),
+            content_type='application/x-ndjson'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
         
     except Exception as e:
         return JsonResponse({
@@ -214,48 +418,79 @@ def process_url(request):
         })
 
 
-def process_file_with_ai(file_instance):
+@metrics.track_view('process_batch')
+@require_http_methods(["POST"])
+def process_batch(request):
     """
-    Traite un fichier avec le modèle IA
-    
-    Args:
-        file_instance: Instance du modèle UploadedFile
-        
-    Returns:
-        dict: Résultats du traitement
+    Traite un lot d'images (champ `images`) et/ou d'archives ZIP (champ `archive`)
+
+    La réponse est un flux NDJSON : 'start', puis une ligne par image dès
+    que son résultat est prêt, puis 'done' une fois tous les résultats
+    enregistrés.
     """
-    start_time = time.time()
-    
-    file_path = file_instance.file.path
-    
     try:
-        if file_instance.file_type == 'image':
-            detections = detector.detect_signs_image(file_path)
-        else:  # video
-            detections = detector.detect_signs_video(file_path)
-        
-        translated_text = detector.translate_signs_to_text(detections)
-        processing_time = time.time() - start_time
-        
-        # Calcul de la confiance moyenne
-        confidence_score = 0
-        if detections:
-            confidence_score = sum(d['confidence'] for d in detections) / len(detections) * 100
-        
-        return {
-            'detections': detections,
-            'translated_text': translated_text,
-            'confidence_score': round(confidence_score, 2),
-            'processing_time': round(processing_time, 2)
+        items = collect_batch_items(request.FILES.getlist('images'), request.FILES.getlist('archive'))
+        if not items:
+            return JsonResponse({
+                'success': False,
+                'error': 'Aucune image fournie'
+            })
+
+        events = analyze_image_batch(items)
+        response = StreamingHttpResponse(
+            _ndjson_lines(events),
+            content_type='application/x-ndjson'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    except BatchError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=e.status)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'Erreur lors du traitement du lot: {str(e)}'
+        })
+
+
+def job_status(request, job_id):
+    """Retourne l'état, la progression et le résultat d'un traitement asynchrone"""
+    try:
+        job = ProcessingJob.objects.select_related('translation_result').filter(pk=job_id).first()
+        if job is None:
+            return JsonResponse({
+                'success': False,
+                'error': 'Traitement introuvable'
+            }, status=404)
+        
+        data = {
+            'job_id': str(job.id),
+            'status': job.status,
+            'progress': {
+                'frames_done': job.frames_done,
+                'frames_total': job.frames_total,
+                'percent': round(job.progress * 100, 1)
+            },
+            'result': None,
+            'error': job.error or None
         }
+        if job.status == ProcessingJob.DONE and job.translation_result:
+            data['result'] = serialize_result(job.translation_result)
+        
+        return JsonResponse({
+            'success': True,
+            'data': data
+        })
         
     except Exception as e:
-        return {
-            'detections': [],
-            'translated_text': f'Erreur lors du traitement: {str(e)}',
-            'confidence_score': 0,
-            'processing_time': time.time() - start_time
-        }
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
 
 
 def get_model_info(request):
@@ -273,23 +508,92 @@ def get_model_info(request):
         })
 
 
+def get_inference_stats(request):
+    """Retourne les statistiques de micro-batching, du cache de résultats et du pipeline vidéo"""
+    try:
+        return JsonResponse({
+            'success': True,
+            'data': dict(
+                scheduler.get_stats(),
+                result_cache=result_cache.get_stats(),
+                video_pipeline=pipeline_stats.get_stats(),
+            )
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+
+
+def get_metrics(request):
+    """Expose les métriques de performance au format texte de Prometheus"""
+    if not metrics.enabled:
+        return HttpResponse('Métriques désactivées (SIGNVISION_METRICS_ENABLED)\n',
+                            status=404, content_type='text/plain; charset=utf-8')
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _profiles_allowed(request) -> bool:
+    """Profils réservés au personnel (ou à tous en mode DEBUG)"""
+    return settings.DEBUG or (request.user.is_authenticated and request.user.is_staff)
+
+
+def _profiles_forbidden():
+    return JsonResponse({
+        'success': False,
+        'error': 'Accès réservé au personnel'
+    }, status=403)
+
+
+def list_profiles(request):
+    """Résumé des profils collectés par le middleware de profilage"""
+    if not _profiles_allowed(request):
+        return _profiles_forbidden()
+
+    summary = profile_store.summary()
+    for view_name, entry in summary.items():
+        entry['downloads'] = {
+            fmt: reverse('download_profile', args=[view_name, fmt]) for fmt in ('pstats', 'collapsed')
+        }
+    return JsonResponse({
+        'success': True,
+        'data': summary
+    })
+
+
+def download_profile(request, view_name, fmt):
+    """Télécharge le profil agrégé d'une vue (pstats ou piles repliées)"""
+    if not _profiles_allowed(request):
+        return _profiles_forbidden()
+
+    if fmt == 'pstats':
+        content = profile_store.pstats_bytes(view_name)
+        content_type = 'application/octet-stream'
+    elif fmt == 'collapsed':
+        content = profile_store.collapsed(view_name)
+        content_type = 'text/plain; charset=utf-8'
+    else:
+        return JsonResponse({
+            'success': False,
+            'error': f'Format inconnu: {fmt}'
+        }, status=400)
+
+    if content is None:
+        return JsonResponse({
+            'success': False,
+            'error': f'Aucun profil pour la vue {view_name}'
+        }, status=404)
+
+    response = HttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{view_name}.{fmt}"'
+    return response
+
+
 def get_recent_results(request):
     """Retourne les résultats récents de traduction"""
     try:
-        results = TranslationResult.objects.select_related('uploaded_file')[:10]
-        
-        data = []
-        for result in results:
-            data.append({
-                'id': result.id,
-                'file_name': result.uploaded_file.original_name,
-                'file_type': result.uploaded_file.file_type,
-                'translated_text': result.translated_text,
-                'confidence_score': result.confidence_score,
-                'processing_time': result.processing_time,
-                'created_at': result.created_at.isoformat(),
-                'detections_count': result.detections.count()
-            })
+        data, _ = get_history_page(limit=10)
         
         return JsonResponse({
             'success': True,
@@ -303,6 +607,49 @@ def get_recent_results(request):
         })
 
 
+def _history_params(request):
+    """Lit le curseur et la taille de page de la requête d'historique"""
+    cursor = request.GET.get('cursor') or None
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    return cursor, max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _history_etag(request):
+    """ETag calculé sans requête SQL : version de l'historique et paramètres"""
+    cursor, limit = _history_params(request)
+    raw = f"{get_history_version()}:{cursor or ''}:{limit}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_history_etag)
+def get_history(request):
+    """Historique paginé par curseur, servi depuis le cache (ETag / 304)"""
+    try:
+        cursor, limit = _history_params(request)
+        page = get_cached_history_page(cursor, limit, get_history_version())
+        
+        return JsonResponse({
+            'success': True,
+            'data': page['results'],
+            'next_cursor': page['next_cursor']
+        })
+        
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+
+
 def about(request):
     """Page à propos"""
     context = {
@@ -0,0 +1,124 @@
+"""
+Canal WebSocket pour la détection en direct depuis la caméra
+Projet créé par Marino ATOHOUN
+
+Application ASGI brute (sans dépendance supplémentaire) : le client envoie
+des frames JPEG en messages binaires sur une connexion persistante et le
+serveur renvoie les détections en JSON. Si l'inférence prend du retard,
+seule la frame la plus récente est gardée : les frames périmées sont
+abandonnées au lieu de s'accumuler.
+"""
+
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http.request import validate_host
+
+from .processing import analyze_camera_frame, new_camera_session
+
+
+CAMERA_PATH = '/ws/camera/'
+
+
+class LatestFrameSlot:
+    """
+    Emplacement d'une seule frame : une nouvelle frame remplace celle qui
+    n'a pas encore été traitée
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._event = asyncio.Event()
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame: bytes):
+        self.received += 1
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = frame
+        self._event.set()
+
+    async def get(self) -> bytes:
+        await self._event.wait()
+        frame, self._frame = self._frame, None
+        self._event.clear()
+        return frame
+
+    def close(self):
+        """Réveille le consommateur en attente sans frame"""
+        self._event.set()
+
+
+def _origin_allowed(scope) -> bool:
+    """Refuse les connexions provenant d'une origine hors ALLOWED_HOSTS"""
+    headers = dict(scope.get('headers') or [])
+    origin = headers.get(b'origin')
+    if not origin:
+        return True
+    host = urlsplit(origin.decode('latin1')).hostname or ''
+    allowed_hosts = settings.ALLOWED_HOSTS or (['localhost', '127.0.0.1', '[::1]'] if settings.DEBUG else [])
+    return validate_host(host, allowed_hosts)
+
+
+async def camera_consumer(scope, receive, send):
+    """Boucle d'une connexion caméra"""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if not _origin_allowed(scope):
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+    await send({'type': 'websocket.accept'})
+
+    slot = LatestFrameSlot()
+    closed = asyncio.Event()
+
+    async def receive_frames():
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] == 'websocket.receive' and message.get('bytes'):
+                slot.put(message['bytes'])
+        closed.set()
+        slot.close()
+
+    receiver = asyncio.ensure_future(receive_frames())
+    analyze = sync_to_async(analyze_camera_frame, thread_sensitive=False)
+    # Une session temporelle par connexion
+    session = new_camera_session()
+
+    try:
+        while not closed.is_set():
+            frame = await slot.get()
+            if frame is None:
+                continue
+            try:
+                payload = {'success': True, 'data': await analyze(frame, session)}
+            except Exception as e:
+                payload = {
+                    'success': False,
+                    'error': f'Erreur lors du traitement de la caméra: {str(e)}'
+                }
+            payload['frames_received'] = slot.received
+            payload['frames_dropped'] = slot.dropped
+
+            if closed.is_set():
+                break
+            await send({'type': 'websocket.send', 'text': json.dumps(payload)})
+    finally:
+        receiver.cancel()
+
+
+async def websocket_application(scope, receive, send):
+    """Routeur des connexions WebSocket"""
+    if scope['path'] == CAMERA_PATH:
+        await camera_consumer(scope, receive, send)
+        return
+
+    await receive()
+    await send({'type': 'websocket.close', 'code': 4404})